@@ -2,45 +2,32 @@
 Git automation service for PackUpdate Python
 """
 import os
-import subprocess
 import json
 import shutil
 from datetime import datetime
 from urllib.parse import urlparse
-import requests
+from ..utils.command_runner import run_command, CommandError
+from ..utils.events import span
 from ..utils.logger import log, write_log
-
-def normalize_bitbucket_endpoint(endpoint):
-    """Normalize Bitbucket server endpoint (remove trailing slash and /rest/api paths)"""
-    return endpoint.rstrip('/').replace('/rest/api/1.0', '').replace('/rest/api', '')
+from .bitbucket_client import (
+    DEFAULT_SSH_PORT, get_bitbucket_client, server_hostname
+)
+from .mirror_service import CLONE_MODES, DEFAULT_CLONE_MODE, clone_workspace
+from .npm_cache import install_dependencies
+from .workspace_cache import (
+    DEFAULT_WORKSPACE_BUDGET_MB, acquire_workspace, evict_workspaces, install_is_current, is_reusable,
+    refresh_workspace, release_workspace
+)
 
 def get_bitbucket_ssh_info(base_url, repository, token):
     """Get SSH port and hostname from Bitbucket repository info"""
     try:
-        api_url = get_bitbucket_api_url(base_url, repository).replace('/pull-requests', '')
-        headers = {'Authorization': f'Bearer {token}'}
-        response = requests.get(api_url, headers=headers)
-        
-        if response.ok:
-            repo_info = response.json()
-            ssh_clone_url = None
-            for link in repo_info.get('links', {}).get('clone', []):
-                if link.get('name') == 'ssh':
-                    ssh_clone_url = link.get('href')
-                    break
-            
-            if ssh_clone_url:
-                # Parse SSH URL: ssh://git@hostname:port/path.git
-                import re
-                match = re.match(r'ssh://git@([^:]+):(\d+)/', ssh_clone_url)
-                if match:
-                    return {'hostname': match.group(1), 'port': int(match.group(2))}
+        return get_bitbucket_client(base_url, token).get_ssh_info(repository)
     except Exception as error:
         log(f"⚠️  Could not detect SSH info from API, using defaults: {error}")
     
     # Fallback to defaults
-    hostname = base_url.replace('https://', '').replace('http://', '').split('/')[0]
-    return {'hostname': hostname, 'port': 7999}
+    return {'hostname': server_hostname(base_url), 'port': DEFAULT_SSH_PORT}
 
 def get_bitbucket_clone_url(base_url, repository, token=None):
     """Get Bitbucket clone URL - use SSH with auto-detected port"""
@@ -49,19 +36,14 @@ def get_bitbucket_clone_url(base_url, repository, token=None):
         return f"ssh://git@{ssh_info['hostname']}:{ssh_info['port']}/{repository.lower()}.git"
     
     # Fallback without token
-    hostname = base_url.replace('https://', '').replace('http://', '').split('/')[0]
-    return f"ssh://git@{hostname}:7999/{repository.lower()}.git"
-
-def get_bitbucket_api_url(base_url, repository):
-    """Get Bitbucket API URL from base server URL"""
-    normalized_url = normalize_bitbucket_endpoint(base_url)
-    workspace, repo = repository.split('/')
-    return f"{normalized_url}/rest/api/1.0/projects/{workspace}/repos/{repo}/pull-requests"
+    return f"ssh://git@{server_hostname(base_url)}:{DEFAULT_SSH_PORT}/{repository.lower()}.git"
 
 def create_automation_config(cli_args):
     """Create automation configuration from CLI args"""
     timestamp = datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
     repo_name = cli_args['repository'].replace('/', '_') if cli_args['repository'] else 'unknown'
+    reuse_workspace = bool(cli_args.get('reuse_workspaces'))
+    workspace_root = os.path.abspath(cli_args['workspace_dir'])
     
     return {
         'platform': cli_args['platform'],
@@ -71,8 +53,12 @@ def create_automation_config(cli_args):
         'base_branch': cli_args['base_branch'] or 'develop',
         'feature_branch': cli_args['feature_branch'] or f"feature/package-updates-{timestamp}",
         'ticket_no': cli_args['ticket_no'],
-        'workspace_dir': os.path.abspath(os.path.join(cli_args['workspace_dir'], f"{repo_name}_{timestamp}")),
+        'workspace_root': workspace_root,
+        'workspace_dir': os.path.join(workspace_root, repo_name if reuse_workspace else f"{repo_name}_{timestamp}"),
+        'reuse_workspace': reuse_workspace,
+        'workspace_budget': (cli_args.get('workspace_budget') or DEFAULT_WORKSPACE_BUDGET_MB) * 1024 * 1024,
         'project_path': cli_args['project_path'],
+        'clone_mode': cli_args.get('clone_mode') or DEFAULT_CLONE_MODE,
         'reviewers': cli_args['reviewers'].split(',') if cli_args['reviewers'] else []
     }
 
@@ -89,17 +75,15 @@ def validate_automation_config(config):
             raise ValueError("Bitbucket endpoint is required (--endpoint or PACKUPDATE_BITBUCKET_ENDPOINT)")
         if not config['token']:
             raise ValueError("Bitbucket token is required (--token or PACKUPDATE_BITBUCKET_TOKEN)")
+    
+    if config['clone_mode'] not in CLONE_MODES:
+        raise ValueError(f"Unknown clone mode: {config['clone_mode']} (expected {', '.join(CLONE_MODES)})")
 
 def setup_workspace(config):
     """Setup workspace and clone repository"""
     try:
         log(f"🏗️  Setting up workspace: {config['workspace_dir']}")
         
-        # Clean and create workspace directory
-        if os.path.exists(config['workspace_dir']):
-            shutil.rmtree(config['workspace_dir'])
-        os.makedirs(config['workspace_dir'], exist_ok=True)
-        
         # Determine clone URL based on platform
         if config['platform'] == 'bitbucket-server':
             clone_url = get_bitbucket_clone_url(config['endpoint'], config['repository'], config['token'])
@@ -110,31 +94,54 @@ def setup_workspace(config):
         else:
             raise ValueError(f"Unsupported platform: {config['platform']}")
         
-        log(f"📥 Cloning repository: {clone_url}")
-        subprocess.run(['git', 'clone', clone_url, '.'], cwd=config['workspace_dir'], check=True, capture_output=True)
+        # Reuse the workspace kept from an earlier run if there is one
+        reused = False
+        if config['reuse_workspace']:
+            acquire_workspace(config['workspace_dir'])
+            if is_reusable(config['workspace_dir']):
+                try:
+                    refresh_workspace(config['workspace_dir'], clone_url)
+                    reused = True
+                except CommandError as error:
+                    log(f"⚠️  Could not reuse workspace, cloning again: {error}")
+        
+        if not reused:
+            # Clean and create workspace directory
+            if os.path.exists(config['workspace_dir']):
+                shutil.rmtree(config['workspace_dir'])
+            os.makedirs(config['workspace_dir'], exist_ok=True)
+            
+            log(f"📥 Cloning repository: {clone_url} ({config['clone_mode']})")
+            clone_workspace(clone_url, config['workspace_dir'], config['base_branch'], config['clone_mode'])
         
         # Check if base branch exists, fallback to master
         actual_base_branch = config['base_branch']
         try:
-            subprocess.run(['git', 'show-ref', '--verify', '--quiet', f"refs/remotes/origin/{config['base_branch']}"], 
-                         cwd=config['workspace_dir'], check=True, capture_output=True)
-        except subprocess.CalledProcessError:
+            run_command(['git', 'show-ref', '--verify', '--quiet', f"refs/remotes/origin/{config['base_branch']}"],
+                        config['workspace_dir']).check()
+        except CommandError:
             log(f"⚠️  Base branch '{config['base_branch']}' not found, trying 'master'")
             actual_base_branch = 'master'
             try:
-                subprocess.run(['git', 'show-ref', '--verify', '--quiet', 'refs/remotes/origin/master'], 
-                             cwd=config['workspace_dir'], check=True, capture_output=True)
-            except subprocess.CalledProcessError:
+                run_command(['git', 'show-ref', '--verify', '--quiet', 'refs/remotes/origin/master'],
+                            config['workspace_dir']).check()
+            except CommandError:
                 raise ValueError("Neither 'develop' nor 'master' branch found")
         
         # Create and checkout feature branch
         log(f"🌿 Creating feature branch: {config['feature_branch']} from {actual_base_branch}")
-        subprocess.run(['git', 'checkout', '-b', config['feature_branch'], f"origin/{actual_base_branch}"], 
-                      cwd=config['workspace_dir'], check=True, capture_output=True)
+        with span('git', step='checkout', branch=config['feature_branch']):
+            run_command(['git', 'checkout', '-B', config['feature_branch'], f"origin/{actual_base_branch}"],
+                        config['workspace_dir']).check()
         
         # Install dependencies to ensure npm outdated works correctly
-        log("📦 Installing dependencies...")
-        subprocess.run(['npm', 'install'], cwd=config['workspace_dir'], check=True, capture_output=True)
+        if reused and install_is_current(config['workspace_dir']):
+            log("📦 Dependencies unchanged since the last run, skipping install")
+        else:
+            # npm ci into a fresh clone; in a reused workspace npm install only changes what differs
+            log("📦 Installing dependencies...")
+            with span('install', project=config['workspace_dir'], incremental=reused) as install_event:
+                install_event['command'] = install_dependencies(config['workspace_dir'])
         
         return {'success': True, 'message': f"Workspace setup complete: {config['workspace_dir']}", 'branch_created': True}
         
@@ -148,9 +155,11 @@ def generate_pr_description(config, update_results, report_data):
     # Aggregate all update results
     all_updated = []
     all_failed = []
+    all_errors = {}
     for result in update_results:
         all_updated.extend(result.get('updated', []))
         all_failed.extend(result.get('failed', []))
+        all_errors.update(result.get('errors', {}))
     
     description = f"""# Package Updates{ticket_link}
 ## Summary
@@ -171,6 +180,11 @@ def generate_pr_description(config, update_results, report_data):
         description += "\n## ❌ Failed Updates\n"
         for pkg in all_failed:
             description += f"- `{pkg}`\n"
+        details = [(pkg, all_errors[pkg]) for pkg in all_failed if all_errors.get(pkg)]
+        if details:
+            description += "\n### Failure Details\n"
+            for pkg, error in details:
+                description += f"\n**{pkg}**\n```\n{error}\n```\n"
 
     # Add security report summary
     if report_data.get('security'):
@@ -201,7 +215,8 @@ def commit_and_push(config, update_results):
             return {'success': False, 'message': "No packages were updated - no changes to commit"}
         
         # Stage all changes
-        subprocess.run(['git', 'add', '.'], cwd=config['workspace_dir'], check=True, capture_output=True)
+        with span('git', step='add'):
+            run_command(['git', 'add', '.'], config['workspace_dir']).check()
         
         # Create commit message
         ticket_prefix = f"{config['ticket_no']}: " if config['ticket_no'] else ''
@@ -211,14 +226,16 @@ Updated packages:
 {chr(10).join([f"- {pkg}: {old_ver} → {new_ver}" for pkg, old_ver, new_ver in all_updated])}"""
         
         # Commit changes
-        subprocess.run(['git', 'commit', '-m', commit_message], cwd=config['workspace_dir'], check=True, capture_output=True)
+        with span('git', step='commit', packages=len(all_updated)):
+            run_command(['git', 'commit', '-m', commit_message], config['workspace_dir']).check()
         
         # Push feature branch
         log(f"📤 Pushing feature branch: {config['feature_branch']}")
-        subprocess.run(['git', 'push', 'origin', config['feature_branch']], cwd=config['workspace_dir'], check=True, capture_output=True)
+        with span('git', step='push', branch=config['feature_branch']):
+            run_command(['git', 'push', 'origin', config['feature_branch']], config['workspace_dir']).check()
         
         # Get commit hash
-        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=config['workspace_dir'], capture_output=True, text=True)
+        result = run_command(['git', 'rev-parse', 'HEAD'], config['workspace_dir'], capture_stdout=True)
         commit_hash = result.stdout.strip()
         
         return {'success': True, 'message': "Changes committed and pushed successfully", 'commit_hash': commit_hash}
@@ -230,7 +247,6 @@ def create_bitbucket_pr(config, pr_data):
     """Create pull request via Bitbucket API"""
     try:
         workspace, repo = config['repository'].split('/')
-        api_url = get_bitbucket_api_url(config['endpoint'], config['repository'])
         
         payload = {
             'title': pr_data['title'],
@@ -252,15 +268,8 @@ def create_bitbucket_pr(config, pr_data):
             'reviewers': [{'user': {'name': username}} for username in pr_data['reviewers']]
         }
         
-        headers = {
-            'Authorization': f'Bearer {config["token"]}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(api_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        pr_response = response.json()
+        pr_response = get_bitbucket_client(config['endpoint'], config['token']).create_pull_request(
+            config['repository'], payload)
         if pr_response.get('id'):
             pr_url = f"{config['endpoint']}/projects/{workspace}/repos/{repo}/pull-requests/{pr_response['id']}"
             return {'success': True, 'message': "Pull request created successfully", 'pr_url': pr_url}
@@ -290,7 +299,10 @@ def create_pull_request(config, update_results, report_data):
         log(f"📋 Creating pull request: {pr_data['title']}")
         
         if config['platform'] == 'bitbucket-server':
-            return create_bitbucket_pr(config, pr_data)
+            with span('git', step='pull_request', platform=config['platform']) as pr_event:
+                pr_result = create_bitbucket_pr(config, pr_data)
+                pr_event.update(status='ok' if pr_result['success'] else 'failed', url=pr_result.get('pr_url'))
+            return pr_result
         else:
             # For GitHub/GitLab, provide manual instructions
             log(f"⚠️  Automated PR creation not yet implemented for {config['platform']}")
@@ -305,9 +317,12 @@ def create_pull_request(config, update_results, report_data):
         return {'success': False, 'message': f"PR creation failed: {error}"}
 
 def cleanup_workspace(config):
-    """Cleanup workspace"""
+    """Cleanup workspace (kept for the next run with --reuse-workspaces, evicting the least recently used)"""
     try:
-        if os.path.exists(config['workspace_dir']):
+        if config['reuse_workspace']:
+            release_workspace(config['workspace_dir'], installed=config.get('dependencies_current', False))
+            evict_workspaces(config['workspace_root'], config['workspace_budget'])
+        elif os.path.exists(config['workspace_dir']):
             shutil.rmtree(config['workspace_dir'])
             log(f"🧹 Cleaned up workspace: {config['workspace_dir']}")
     except Exception as error:
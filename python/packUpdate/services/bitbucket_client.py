@@ -0,0 +1,162 @@
+"""
+Bitbucket Server REST API access
+
+One keep-alive HTTP session per server, with timeouts and exponential
+backoff on rate limiting (429) and server errors (5xx). Repository metadata
+is cached for PACKUPDATE_BITBUCKET_TTL seconds and the SSH host/port is
+discovered once per server, so a fleet of repositories on the same server
+costs one lookup instead of one per clone.
+"""
+import os
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from ..utils.logger import write_log
+
+REQUEST_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 8
+DEFAULT_SSH_PORT = 7999
+DEFAULT_METADATA_TTL = int(os.getenv('PACKUPDATE_BITBUCKET_TTL', '600'))
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A POST the server may already have processed (e.g. a 500 after creating the
+# pull request) is not repeated; these statuses mean it was not
+POST_RETRY_STATUSES = (429, 503)
+SSH_CLONE_PATTERN = re.compile(r'ssh://git@([^:/]+):(\d+)/')
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def normalize_bitbucket_endpoint(endpoint):
+    """Normalize Bitbucket server endpoint (remove trailing slash and /rest/api paths)"""
+    return endpoint.rstrip('/').replace('/rest/api/1.0', '').replace('/rest/api', '')
+
+
+def server_hostname(base_url):
+    return base_url.replace('https://', '').replace('http://', '').split('/')[0].split(':')[0]
+
+
+def never_sent(error):
+    """True if a failed request never reached the server, so repeating it cannot act twice."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def retry_delay(attempt, response=None, backoff=BACKOFF_BASE):
+    """Seconds to wait before retry number attempt (0-based): Retry-After if given, else exponential."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(int(retry_after), BACKOFF_MAX)
+    return min(backoff * (2 ** attempt), BACKOFF_MAX)
+
+
+class BitbucketClient:
+    """Pooled, retrying Bitbucket Server client with cached repository metadata."""
+
+    def __init__(self, base_url, token, ttl=DEFAULT_METADATA_TTL, pool_size=DEFAULT_POOL_SIZE,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_BASE, timeout=REQUEST_TIMEOUT):
+        self.base_url = normalize_bitbucket_endpoint(base_url)
+        self.ttl = ttl
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        self.stats = {'requests': 0, 'retries': 0, 'cache_hits': 0}
+        self._repositories = {}
+        self._ssh_info = None
+        self._lock = threading.Lock()
+
+    def request(self, method, path, **kwargs):
+        """Send a request to /rest/api/1.0/<path>, retrying rate limits, server errors and failed connections."""
+        url = f"{self.base_url}/rest/api/1.0/{path.lstrip('/')}"
+        retry_statuses = POST_RETRY_STATUSES if method.upper() == 'POST' else RETRY_STATUSES
+        attempt = 0
+        while True:
+            self._count('requests')
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # A POST whose connection dropped after sending may have been acted on
+                retryable = method.upper() != 'POST' or never_sent(error)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = retry_delay(attempt, backoff=self.backoff)
+                write_log(f"Bitbucket {method} {url} failed ({error}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = retry_delay(attempt, response, self.backoff)
+                write_log(f"Bitbucket {method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            self._count('retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def get_repository(self, repository):
+        """Repository metadata for PROJECT/repo, cached for ttl seconds."""
+        project, slug = repository.split('/')
+        with self._lock:
+            cached = self._repositories.get(repository.lower())
+            if cached and time.time() - cached[0] < self.ttl:
+                self.stats['cache_hits'] += 1
+                return cached[1]
+        metadata = self.request('GET', f"projects/{project}/repos/{slug}").json()
+        with self._lock:
+            self._repositories[repository.lower()] = (time.time(), metadata)
+        return metadata
+
+    def get_ssh_info(self, repository):
+        """SSH hostname and port of the server, discovered from a repository's clone links once per server."""
+        with self._lock:
+            if self._ssh_info:
+                self.stats['cache_hits'] += 1
+                return dict(self._ssh_info)
+        for link in self.get_repository(repository).get('links', {}).get('clone', []):
+            match = SSH_CLONE_PATTERN.match(link.get('href', '')) if link.get('name') == 'ssh' else None
+            if match:
+                with self._lock:
+                    self._ssh_info = {'hostname': match.group(1), 'port': int(match.group(2))}
+                    return dict(self._ssh_info)
+        raise ValueError(f"No SSH clone link for {repository}")
+
+    def create_pull_request(self, repository, payload):
+        """Open a pull request; returns the created pull request document."""
+        project, slug = repository.split('/')
+        return self.request('POST', f"projects/{project}/repos/{slug}/pull-requests", json=payload).json()
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def get_bitbucket_client(base_url, token):
+    """Shared client for a server and token, reused for the whole run."""
+    key = (normalize_bitbucket_endpoint(base_url), token)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = BitbucketClient(base_url, token)
+        return _clients[key]
+
+
+def reset_bitbucket_clients():
+    """Drop shared clients and their cached metadata."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -1,11 +1,12 @@
 """
 Package cleanup operations
 """
-import subprocess
 import json
 import os
 import shutil
+from ..utils.command_runner import run_command
 from ..utils.logger import log, write_log
+from .project_snapshot import get_snapshot
 
 def remove_unused_packages(project_path, quiet_mode):
     """Remove unused dependencies from project"""
@@ -13,10 +14,9 @@ def remove_unused_packages(project_path, quiet_mode):
     
     try:
         # Try to use depcheck
-        result = subprocess.run(['npx', 'depcheck', '--json'], 
-                              cwd=project_path, capture_output=True, text=True)
+        result = run_command(['npx', 'depcheck', '--json'], project_path, capture_stdout=True)
         
-        if result.returncode == 0:
+        if result.ok:
             depcheck_data = json.loads(result.stdout) if result.stdout.strip() else {}
             unused_packages = depcheck_data.get('dependencies', [])
             
@@ -33,15 +33,13 @@ def remove_unused_packages(project_path, quiet_mode):
             for pkg in unused_packages:
                 try:
                     log(f"🗑️  Removing {pkg}...")
-                    uninstall_result = subprocess.run(['npm', 'uninstall', pkg], 
-                                                    cwd=project_path, 
-                                                    capture_output=quiet_mode, text=True)
+                    uninstall_result = run_command(['npm', 'uninstall', pkg], project_path, quiet_mode)
                     
-                    if uninstall_result.returncode == 0:
+                    if uninstall_result.ok:
                         removed_packages.append(pkg)
                         write_log(f"SUCCESS: Removed unused package {pkg}")
                     else:
-                        write_log(f"ERROR: Failed to remove {pkg}")
+                        write_log(f"ERROR: Failed to remove {pkg}: npm {uninstall_result.describe()}")
                 except Exception as e:
                     write_log(f"ERROR: Failed to remove {pkg}: {e}")
             
@@ -63,8 +61,7 @@ def remove_unused_basic_analysis(project_path, quiet_mode):
         return []
     
     try:
-        with open(package_json_path, 'r') as f:
-            package_json = json.load(f)
+        package_json = get_snapshot(project_path).package_json()
         
         dependencies = list(package_json.get('dependencies', {}).keys())
         
@@ -105,18 +102,14 @@ def dedupe_packages(project_path, quiet_mode):
     try:
         # Run npm dedupe
         log("🔄 Running npm dedupe...")
-        result = subprocess.run(['npm', 'dedupe'], 
-                              cwd=project_path, 
-                              capture_output=quiet_mode, text=True)
+        result = run_command(['npm', 'dedupe'], project_path, quiet_mode)
         
-        if result.returncode == 0:
+        if result.ok:
             log("✅ Dependencies deduplicated successfully.")
             write_log("SUCCESS: npm dedupe completed")
             
             # Get dedupe statistics
-            audit_result = subprocess.run(['npm', 'ls', '--depth=0'], 
-                                        cwd=project_path, 
-                                        capture_output=True, text=True)
+            audit_result = run_command(['npm', 'ls', '--depth=0'], project_path, capture_stdout=True)
             
             # Count unique packages (simplified)
             lines = audit_result.stdout.split('\n') if audit_result.stdout else []
@@ -125,7 +118,7 @@ def dedupe_packages(project_path, quiet_mode):
             log(f"📦 {package_count} unique packages remaining.")
             return package_count
         else:
-            error_msg = "npm dedupe failed"
+            error_msg = f"npm dedupe failed: {result.describe()}"
             log(f"❌ {error_msg}")
             write_log(f"ERROR: {error_msg}")
             return 0
@@ -154,15 +147,13 @@ def cleanup_package_files(project_path, quiet_mode):
         
         # Fresh install
         log("📦 Running fresh npm install...")
-        result = subprocess.run(['npm', 'install'], 
-                              cwd=project_path, 
-                              capture_output=quiet_mode, text=True)
+        result = run_command(['npm', 'install'], project_path, quiet_mode)
         
-        if result.returncode == 0:
+        if result.ok:
             log("✅ Fresh installation completed.")
             write_log("SUCCESS: Package files cleaned and reinstalled")
         else:
-            raise Exception("npm install failed")
+            raise Exception(f"npm install failed: {result.describe()}")
     except Exception as e:
         error_msg = f"Cleanup failed: {e}"
         log(f"❌ {error_msg}")
@@ -0,0 +1,116 @@
+"""
+Dependency analysis and update planning
+"""
+from ..utils.logger import write_log
+
+
+def build_adjacency(outdated_packages, dependency_graph):
+    """Map every known package to the packages it requires."""
+    packages = (dependency_graph or {}).get('dependencies', {}) or {}
+    nodes = set(packages) | set(outdated_packages)
+    adjacency = {}
+    for name in nodes:
+        requires = (packages.get(name) or {}).get('requires', {}) or {}
+        adjacency[name] = [dep for dep in requires if dep in nodes and dep != name]
+    return adjacency
+
+
+def strongly_connected_components(adjacency, roots):
+    """Iterative Tarjan SCC over the nodes reachable from roots.
+
+    Components are returned dependencies-first: every component appears after
+    all components it can reach.
+    """
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in roots:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(adjacency.get(root, ())))]
+
+        while work:
+            node, neighbors = work[-1]
+            advanced = False
+            for neighbor in neighbors:
+                if neighbor not in index_of:
+                    index_of[neighbor] = lowlink[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(adjacency.get(neighbor, ()))))
+                    advanced = True
+                    break
+                if neighbor in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[neighbor])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def plan_update_levels(outdated_packages, dependency_graph):
+    """Group outdated packages into ordered levels of mutually independent packages.
+
+    A package is placed after every outdated package it depends on, directly or
+    through packages that are not being updated. Packages in a dependency cycle
+    share a level so they can be installed and verified together.
+    """
+    if not outdated_packages:
+        return []
+
+    adjacency = build_adjacency(outdated_packages, dependency_graph)
+    components = strongly_connected_components(adjacency, list(outdated_packages))
+
+    component_of = {}
+    for component_id, component in enumerate(components):
+        for member in component:
+            component_of[member] = component_id
+
+    # height = highest level of any outdated package at or below this component
+    height = [-1] * len(components)
+    level_of = {}
+    for component_id, component in enumerate(components):
+        below = -1
+        for member in component:
+            for dep in adjacency.get(member, ()):
+                dep_component = component_of[dep]
+                if dep_component != component_id and height[dep_component] > below:
+                    below = height[dep_component]
+
+        outdated_members = [member for member in component if member in outdated_packages]
+        if outdated_members:
+            height[component_id] = below + 1
+            for member in outdated_members:
+                level_of[member] = below + 1
+            if len(outdated_members) > 1:
+                write_log(f"Dependency cycle, updating together: {', '.join(sorted(outdated_members))}")
+        else:
+            height[component_id] = below
+
+    levels = [[] for _ in range(max(level_of.values()) + 1)]
+    for package in outdated_packages:
+        levels[level_of[package]].append(package)
+    return [level for level in levels if level]
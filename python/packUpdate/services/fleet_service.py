@@ -0,0 +1,141 @@
+"""
+Fleet automation: run the automation workflow for many repositories at once
+
+A manifest lists the repositories, either as JSON or as plain text with one
+repository per line::
+
+    [
+        "PROJ/web-app",
+        {"repository": "PROJ/api", "base_branch": "main", "reviewers": "alice,bob"},
+        {"repository": "org/tool", "platform": "github"}
+    ]
+
+Entries inherit every automation option from the command line and may
+override platform, endpoint, token, base_branch, feature_branch, ticket_no
+and reviewers. Repositories run concurrently, at most FLEET_WORKERS at a
+time and at most FLEET_HOST_LIMIT against the same git host, so one server
+is not flooded with clones and pushes. A repository that fails is recorded
+and the rest carry on.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+from ..utils.logger import repository_scope, write_log
+
+FLEET_WORKERS = int(os.getenv('PACKUPDATE_FLEET_WORKERS', '4'))
+FLEET_HOST_LIMIT = int(os.getenv('PACKUPDATE_FLEET_HOST_LIMIT', '2'))
+ENTRY_OVERRIDES = ('platform', 'endpoint', 'token', 'base_branch', 'feature_branch', 'ticket_no', 'reviewers')
+PLATFORM_HOSTS = {'github': 'github.com', 'gitlab': 'gitlab.com'}
+
+
+def set_fleet_limits(workers=None, per_host=None):
+    """Set the global and per-host repository concurrency"""
+    global FLEET_WORKERS, FLEET_HOST_LIMIT
+    if workers:
+        FLEET_WORKERS = max(1, int(workers))
+    if per_host:
+        FLEET_HOST_LIMIT = max(1, int(per_host))
+
+
+def load_fleet_manifest(path):
+    """Read a manifest into a list of entries ({'repository': ..., overrides})."""
+    with open(path, 'r') as f:
+        content = f.read()
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = [line.strip() for line in content.splitlines() if line.strip() and not line.strip().startswith('#')]
+    if isinstance(data, dict):
+        data = data.get('repositories', [])
+
+    entries = []
+    for item in data:
+        entry = {'repository': item} if isinstance(item, str) else dict(item)
+        if not entry.get('repository'):
+            raise ValueError(f"Fleet manifest entry without a repository: {item}")
+        if isinstance(entry.get('reviewers'), list):
+            entry['reviewers'] = ','.join(entry['reviewers'])
+        entries.append(entry)
+    return entries
+
+
+def repository_args(cli_args, entry):
+    """CLI arguments for one repository: the shared options plus the entry's overrides."""
+    args = dict(cli_args, repository=entry['repository'])
+    for key in ENTRY_OVERRIDES:
+        if entry.get(key) is not None:
+            args[key] = entry[key]
+    return args
+
+
+def repository_host(args):
+    """Git host a repository is cloned from and pushed to (the unit of the per-host limit)."""
+    if args.get('endpoint'):
+        return urlparse(args['endpoint']).hostname or args['endpoint']
+    return PLATFORM_HOSTS.get(args.get('platform'), args.get('platform') or 'unknown')
+
+
+def run_bounded(jobs, host_of, work, max_workers, per_host):
+    """Run work(job) for every job, at most max_workers at once and per_host per host.
+
+    Jobs start in order as capacity frees up; a job whose host is busy does
+    not hold a worker while it waits. Returns the results in job order; a job
+    that raises yields the exception instead of a result.
+    """
+    max_workers = max(1, max_workers)
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = {}
+    active_hosts = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for index in list(pending):
+                if len(running) >= max_workers:
+                    break
+                host = host_of(jobs[index])
+                if active_hosts.get(host, 0) >= per_host:
+                    continue
+                pending.remove(index)
+                active_hosts[host] = active_hosts.get(host, 0) + 1
+                running[executor.submit(work, jobs[index])] = (index, host)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, host = running.pop(future)
+                active_hosts[host] -= 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = e
+    return results
+
+
+def run_fleet(cli_args, entries, run_repository, max_workers=None, per_host=None, on_done=None):
+    """Run run_repository(args) for every manifest entry; returns one result dict per repository.
+
+    run_repository returns a summary dict (see execute_automation_workflow)
+    or raises; either way the result has repository, host, success, status,
+    updated, failed, pr_url, message and duration.
+    """
+    jobs = [repository_args(cli_args, entry) for entry in entries]
+
+    def work(args):
+        started = time.perf_counter()
+        try:
+            with repository_scope(args['repository']):
+                summary = run_repository(args) or {}
+            result = {'success': True, 'status': 'completed', 'updated': [], 'failed': [], 'pr_url': None,
+                      'message': ''}
+            result.update(summary)
+        except Exception as e:
+            write_log(f"ERROR: Fleet repository {args['repository']} failed: {e}")
+            result = {'success': False, 'status': 'error', 'updated': [], 'failed': [], 'pr_url': None,
+                      'message': str(e)}
+        result.update(repository=args['repository'], host=repository_host(args),
+                      duration=time.perf_counter() - started)
+        if on_done:
+            on_done(result)
+        return result
+
+    return run_bounded(jobs, repository_host, work, max_workers or FLEET_WORKERS, per_host or FLEET_HOST_LIMIT)
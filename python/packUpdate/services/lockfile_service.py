@@ -0,0 +1,182 @@
+"""
+In-process package-lock.json loader
+
+Builds the flat dependency graph used by update ordering and reporting straight
+from the lockfile, so a pass does not need to spawn ``npm ls``.
+
+Graph shape (compatible with the ``dependencies``/``requires`` keys the update
+order resolver already reads)::
+
+    {
+        'name': 'my-app',
+        'version': '1.0.0',
+        'source': 'lockfile' | 'npm-ls',
+        'requires': {<direct dependency>: <declared range>},
+        'dependencies': {
+            <package>: {'version': '1.2.3', 'requires': {<dependency>: <range>}},
+            ...
+        }
+    }
+"""
+import json
+import os
+from ..utils.logger import write_log
+from .project_snapshot import get_snapshot
+
+LOCKFILE_NAMES = ('npm-shrinkwrap.json', 'package-lock.json')
+EDGE_SECTIONS = ('dependencies', 'optionalDependencies', 'peerDependencies')
+
+
+def find_lockfile(project_path):
+    """Return the path of the lockfile npm would use, or None."""
+    for name in LOCKFILE_NAMES:
+        path = os.path.join(project_path, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_dependency_graph(project_path):
+    """Load the project's dependency graph from its lockfile (None if unavailable)."""
+    lockfile_path = find_lockfile(project_path)
+    if not lockfile_path:
+        return None
+
+    try:
+        with open(lockfile_path, 'r') as f:
+            lockfile = json.load(f)
+    except Exception as e:
+        write_log(f"ERROR: Could not read {lockfile_path}: {e}")
+        return None
+
+    if isinstance(lockfile.get('packages'), dict) and lockfile['packages']:
+        graph = graph_from_packages_section(lockfile)
+    elif isinstance(lockfile.get('dependencies'), dict):
+        graph = graph_from_dependencies_section(lockfile, project_path)
+    else:
+        return None
+
+    write_log(f"Loaded dependency graph from {os.path.basename(lockfile_path)} "
+              f"(lockfileVersion {lockfile.get('lockfileVersion', 1)}, {len(graph['dependencies'])} packages)")
+    return graph
+
+
+def package_name_from_location(location):
+    """Derive a package name from a lockfile v2/v3 location key."""
+    marker = 'node_modules/'
+    index = location.rfind(marker)
+    if index == -1:
+        return None
+    return location[index + len(marker):]
+
+
+def _collect_requires(entry):
+    requires = {}
+    for section in EDGE_SECTIONS:
+        requires.update(entry.get(section) or {})
+    return requires
+
+
+def graph_from_packages_section(lockfile):
+    """Build the graph from a lockfile v2/v3 ``packages`` section."""
+    packages = lockfile['packages']
+    root = packages.get('', {})
+    graph = {
+        'name': lockfile.get('name', root.get('name')),
+        'version': lockfile.get('version', root.get('version')),
+        'source': 'lockfile',
+        'requires': _collect_requires(root),
+        'dependencies': {}
+    }
+
+    # Shallowest location wins for each name, matching what Node resolves from the root
+    depth_by_name = {}
+    for location, entry in packages.items():
+        if not location or not isinstance(entry, dict):
+            continue
+        name = entry.get('name') if not location.startswith('node_modules/') else None
+        name = name or package_name_from_location(location)
+        if not name:
+            continue
+
+        if entry.get('link') and entry.get('resolved') in packages:
+            entry = dict(packages[entry['resolved']], **{k: v for k, v in entry.items() if k != 'link'})
+
+        depth = location.count('node_modules/')
+        if name in depth_by_name and depth_by_name[name] <= depth:
+            continue
+        depth_by_name[name] = depth
+        graph['dependencies'][name] = {
+            'version': entry.get('version'),
+            'requires': _collect_requires(entry)
+        }
+
+    return graph
+
+
+def graph_from_dependencies_section(lockfile, project_path):
+    """Build the graph from a legacy lockfile v1 ``dependencies`` section."""
+    graph = {
+        'name': lockfile.get('name'),
+        'version': lockfile.get('version'),
+        'source': 'lockfile',
+        'requires': _read_declared_dependencies(project_path),
+        'dependencies': {}
+    }
+
+    # Breadth-first so hoisted (top-level) entries take precedence over nested copies
+    queue = [lockfile['dependencies']]
+    while queue:
+        level = queue.pop(0)
+        for name, entry in level.items():
+            if not isinstance(entry, dict):
+                continue
+            if name not in graph['dependencies']:
+                graph['dependencies'][name] = {
+                    'version': entry.get('version'),
+                    'requires': dict(entry.get('requires') or {})
+                }
+            if entry.get('dependencies'):
+                queue.append(entry['dependencies'])
+
+    return graph
+
+
+def graph_from_npm_ls(tree):
+    """Flatten nested ``npm ls --json --all`` output into the graph shape."""
+    graph = {
+        'name': tree.get('name'),
+        'version': tree.get('version'),
+        'source': 'npm-ls',
+        'requires': {name: info.get('version') for name, info in (tree.get('dependencies') or {}).items()},
+        'dependencies': {}
+    }
+
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for name, info in (node.get('dependencies') or {}).items():
+            if not isinstance(info, dict):
+                continue
+            children = info.get('dependencies') or {}
+            existing = graph['dependencies'].get(name)
+            if existing is None:
+                graph['dependencies'][name] = {
+                    'version': info.get('version'),
+                    'requires': dict(info.get('requires') or {})
+                }
+                existing = graph['dependencies'][name]
+            for child_name, child in children.items():
+                existing['requires'].setdefault(child_name, child.get('version') if isinstance(child, dict) else None)
+            if children:
+                stack.append(info)
+
+    return graph
+
+
+def _read_declared_dependencies(project_path):
+    try:
+        package_data = get_snapshot(project_path).package_json()
+    except Exception:
+        return {}
+    return _collect_requires(package_data)
@@ -0,0 +1,130 @@
+"""
+Local git mirrors for automation workspaces
+
+Cloning a large repository from scratch for every automation run moves its
+whole history over the network each time. Instead a bare mirror of each
+repository is kept under the cache directory and refreshed with git fetch,
+and the workspace is cloned from it locally (objects are hard-linked, so
+this takes seconds). The workspace's origin then points back at the real
+remote for pushing. Creating or refreshing a mirror holds <mirror>.lock, so
+concurrent runs (threads or processes) never fetch into the same mirror at
+once.
+
+Clone modes (--clone-mode, PACKUPDATE_CLONE_MODE):
+
+- mirror (default): persistent bare mirror + local clone
+- blobless: partial clone of the base branch, file contents fetched on demand
+- shallow: depth-1 clone of the base branch
+- full: plain git clone, as before
+"""
+import os
+import re
+import shutil
+import threading
+from ..utils.command_runner import run_command, CommandError
+from ..utils.events import span
+from ..utils.fs import file_lock
+from ..utils.logger import log, write_log
+from .registry_service import get_cache_dir
+
+CLONE_MODES = ('mirror', 'blobless', 'shallow', 'full')
+DEFAULT_CLONE_MODE = os.getenv('PACKUPDATE_CLONE_MODE', 'mirror')
+
+_mirror_locks = {}
+_mirror_locks_lock = threading.Lock()
+
+
+def get_mirror_dir():
+    """Directory holding the bare mirrors (PACKUPDATE_MIRROR_DIR, else <cache dir>/mirrors)."""
+    return os.getenv('PACKUPDATE_MIRROR_DIR', os.path.join(get_cache_dir(), 'mirrors'))
+
+
+def mirror_path(clone_url):
+    """Mirror location for a clone URL, e.g. ssh://git@host:7999/proj/app.git -> <mirror dir>/host_7999_proj_app.git"""
+    name = re.sub(r'^[a-z+]+://', '', clone_url)
+    name = re.sub(r'^[^@/]+@', '', name)
+    name = re.sub(r'\.git$', '', name)
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_')
+    return os.path.join(get_mirror_dir(), f"{name}.git")
+
+
+def _mirror_lock(path):
+    with _mirror_locks_lock:
+        return _mirror_locks.setdefault(path, threading.Lock())
+
+
+def update_mirror(clone_url):
+    """Create or refresh the bare mirror of clone_url; returns its path.
+
+    A failed refresh (network, credentials, remote timeout) leaves the mirror
+    as it was and raises CommandError; a failed fetch does not damage a bare
+    repository, and keeping it saves downloading the whole history again.
+    Only a mirror that is not a usable repository is recreated, and one whose
+    creation fails is discarded (while still locked).
+    """
+    path = mirror_path(clone_url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _mirror_lock(path), file_lock(f"{path}.lock"):
+        if mirror_is_usable(path):
+            log(f"🔄 Refreshing mirror: {path}")
+            with span('git', step='fetch', target=clone_url):
+                run_command(['git', 'remote', 'set-url', 'origin', clone_url], path).check()
+                run_command(['git', 'fetch', '--prune', '--tags', 'origin'], path).check()
+            return path
+
+        log(f"📥 Creating mirror: {path}")
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        try:
+            with span('git', step='mirror', target=clone_url):
+                run_command(['git', 'clone', '--bare', clone_url, path], None).check()
+                # Keep branches up to date on fetch (a bare clone has no fetch refspec)
+                run_command(['git', 'config', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*'], path).check()
+        except CommandError as error:
+            write_log(f"ERROR: Creating the mirror for {clone_url} failed, discarding it: {error}")
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+    return path
+
+
+def mirror_is_usable(path):
+    """True if path holds a bare repository git can open."""
+    if not os.path.isdir(os.path.join(path, 'objects')):
+        return False
+    return run_command(['git', '--git-dir', path, 'rev-parse', '--git-dir'], None, capture_stdout=True).ok
+
+
+def remote_branch_exists(clone_url, branch):
+    return run_command(['git', 'ls-remote', '--exit-code', '--heads', clone_url, branch], None, capture_stdout=True).ok
+
+
+def clone_workspace(clone_url, workspace_dir, base_branch, mode=None):
+    """Clone clone_url into workspace_dir (which must be empty) using the given clone mode.
+
+    Partial modes fetch only base_branch, or master if base_branch does not
+    exist. If the mirror cannot be created or refreshed, or the workspace
+    cannot be cloned from it, a full clone is made instead.
+    """
+    mode = mode or DEFAULT_CLONE_MODE
+    if mode == 'mirror':
+        try:
+            mirror = update_mirror(clone_url)
+            with span('git', step='clone', target=clone_url, mode=mode):
+                run_command(['git', 'clone', '--no-checkout', mirror, '.'], workspace_dir).check()
+                run_command(['git', 'remote', 'set-url', 'origin', clone_url], workspace_dir).check()
+            return mode
+        except CommandError as error:
+            log(f"⚠️  Mirror unavailable, falling back to a full clone: {error}")
+            write_log(f"ERROR: Mirror for {clone_url} unavailable: {error}")
+            shutil.rmtree(workspace_dir)
+            os.makedirs(workspace_dir)
+            mode = 'full'
+
+    command = ['git', 'clone']
+    if mode in ('blobless', 'shallow'):
+        branch = base_branch if remote_branch_exists(clone_url, base_branch) else 'master'
+        command += ['--single-branch', '--branch', branch]
+        command += ['--filter=blob:none'] if mode == 'blobless' else ['--depth=1']
+    with span('git', step='clone', target=clone_url, mode=mode):
+        run_command(command + [clone_url, '.'], workspace_dir).check()
+    return mode
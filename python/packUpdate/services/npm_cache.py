@@ -0,0 +1,165 @@
+"""
+Shared npm cache for automation workspaces
+
+Automation and fleet runs point every npm command at one content-addressed
+cache (PACKUPDATE_NPM_CACHE_DIR, default <cache dir>/npm) so a package
+downloaded for one repository is reused by every other workspace. The initial
+workspace install prefers cached packages (--prefer-offline) and uses npm ci
+when the repository has a lockfile and no node_modules yet.
+
+After the run the size of the cache in use is reported; when the shared
+cache exceeds the budget (PACKUPDATE_NPM_CACHE_MB) the content least recently
+stored or revalidated according to the cache index (index-v5 entry times) is
+removed, and npm cache verify drops the index entries that pointed to it. A
+cache the user configured with npm_config_cache is reported but never pruned.
+"""
+import base64
+import json
+import os
+from ..utils.command_runner import run_command
+from ..utils.command_stats import format_bytes
+from ..utils.fs import directory_size
+from ..utils.logger import log, write_log
+from .registry_service import get_cache_dir
+
+NPM_CACHE_BUDGET_MB = int(os.getenv('PACKUPDATE_NPM_CACHE_MB', '4096'))
+# Prune to this fraction of the budget so the next runs do not prune again straight away
+PRUNE_TARGET = 0.8
+LOCKFILES = ('package-lock.json', 'npm-shrinkwrap.json')
+INSTALL_FLAGS = ['--prefer-offline', '--no-audit', '--no-fund']
+
+# (cache dir, configured by the user) once use_shared_npm_cache has run
+_active_cache = None
+
+
+def get_npm_cache_dir():
+    return os.getenv('PACKUPDATE_NPM_CACHE_DIR', os.path.join(get_cache_dir(), 'npm'))
+
+
+def use_shared_npm_cache():
+    """Point the npm commands of this process at the shared cache, unless npm_config_cache is already set."""
+    global _active_cache
+    configured = os.getenv('npm_config_cache') or os.getenv('NPM_CONFIG_CACHE')
+    if configured:
+        _active_cache = (configured, True)
+        write_log(f"Using configured npm cache: {configured}")
+        return configured
+    os.environ['npm_config_cache'] = get_npm_cache_dir()
+    _active_cache = (os.environ['npm_config_cache'], False)
+    write_log(f"Using shared npm cache: {os.environ['npm_config_cache']}")
+    return os.environ['npm_config_cache']
+
+
+def finish_npm_cache():
+    """Report the cache this run used and prune it if it is the shared one; None if none was set up."""
+    if _active_cache is None:
+        return None
+    cache_dir, configured = _active_cache
+    return prune_npm_cache(cache_dir, prune=not configured)
+
+
+def install_command(project_path):
+    """npm ci when there is a lockfile and no node_modules yet, else npm install (keeps node_modules)."""
+    has_lockfile = any(os.path.isfile(os.path.join(project_path, name)) for name in LOCKFILES)
+    has_modules = os.path.isdir(os.path.join(project_path, 'node_modules'))
+    return ['npm', 'ci' if has_lockfile and not has_modules else 'install'] + INSTALL_FLAGS
+
+
+def install_dependencies(project_path):
+    """Install a workspace's dependencies from the shared cache; falls back to npm install if npm ci fails."""
+    command = install_command(project_path)
+    result = run_command(command, project_path)
+    if result.ok or command[1] != 'ci':
+        result.check()
+        return command[1]
+    # e.g. a lockfile out of sync with package.json
+    log("⚠️  npm ci failed, running npm install instead")
+    write_log(f"npm ci failed in {project_path}: {result.tail(5)}")
+    run_command(['npm', 'install'] + INSTALL_FLAGS, project_path).check()
+    return 'install'
+
+
+def content_paths(cache_dir, integrity):
+    """Content files for an SRI string such as "sha512-<base64> sha1-<base64>"."""
+    paths = []
+    for token in (integrity or '').split():
+        algorithm, _, digest = token.partition('-')
+        try:
+            hex_digest = base64.b64decode(digest.split('?')[0]).hex()
+        except ValueError:
+            continue
+        paths.append(os.path.join(cache_dir, '_cacache', 'content-v2', algorithm,
+                                  hex_digest[:2], hex_digest[2:4], hex_digest[4:]))
+    return paths
+
+
+def content_last_used(cache_dir):
+    """Latest index entry time (ms) for each content file.
+
+    npm appends an index entry whenever it stores or revalidates something,
+    while existing content files are never rewritten, so their mtime only
+    says when the content was first downloaded.
+    """
+    last_used = {}
+    for root, _, names in os.walk(os.path.join(cache_dir, '_cacache', 'index-v5')):
+        for name in names:
+            try:
+                with open(os.path.join(root, name), 'r') as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                # <sha1 of the entry>\t<entry JSON>
+                try:
+                    entry = json.loads(line.split('\t', 1)[1])
+                except (IndexError, ValueError):
+                    continue
+                for path in content_paths(cache_dir, entry.get('integrity')):
+                    last_used[path] = max(last_used.get(path, 0), entry.get('time') or 0)
+    return last_used
+
+
+def prune_npm_cache(cache_dir=None, budget_bytes=None, prune=True):
+    """Report the cache size and prune it if over budget; returns (size before, size after) in bytes.
+
+    With prune False (a cache the user configured) an over-budget cache is only reported.
+    """
+    cache_dir = cache_dir or get_npm_cache_dir()
+    budget_bytes = budget_bytes if budget_bytes is not None else NPM_CACHE_BUDGET_MB * 1024 * 1024
+    if not os.path.isdir(cache_dir):
+        return 0, 0
+    size = directory_size(cache_dir)
+    log(f"📦 npm cache: {format_bytes(size)} in {cache_dir} (budget {format_bytes(budget_bytes)})")
+    if size <= budget_bytes:
+        return size, size
+    if not prune:
+        log("⚠️  npm cache is over budget; it was set with npm_config_cache, so it is left alone")
+        return size, size
+
+    # Content no index entry refers to any more goes first
+    last_used = content_last_used(cache_dir)
+    content = []
+    for root, _, names in os.walk(os.path.join(cache_dir, '_cacache', 'content-v2')):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            content.append((last_used.get(path, 0), path, stat.st_size))
+
+    remaining = size
+    target = budget_bytes * PRUNE_TARGET
+    for _, path, file_size in sorted(content):
+        if remaining <= target:
+            break
+        try:
+            os.remove(path)
+            remaining -= file_size
+        except OSError:
+            pass
+    # Drop index entries whose content is gone and collect anything unreferenced
+    run_command(['npm', 'cache', 'verify', '--cache', cache_dir], cache_dir, kind='npm cache verify')
+    pruned = directory_size(cache_dir)
+    log(f"🧹 Pruned npm cache to {format_bytes(pruned)}")
+    return size, pruned
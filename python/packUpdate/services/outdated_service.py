@@ -0,0 +1,115 @@
+"""
+Native outdated-package resolution
+
+Computes the same ``{name: {current, wanted, latest, dependent, location}}``
+structure as ``npm outdated --json`` from the lockfile, package.json and
+concurrently fetched registry metadata.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from ..utils.logger import write_log
+from ..utils.semver import VersionIndex, satisfies
+from .lockfile_service import load_dependency_graph
+from .registry_service import get_registry_client
+from .project_snapshot import get_snapshot
+
+DEFAULT_MAX_WORKERS = 16
+DEPENDENCY_SECTIONS = ('dependencies', 'devDependencies', 'optionalDependencies')
+NON_REGISTRY_PREFIXES = ('file:', 'link:', 'git', 'http:', 'https:', 'workspace:', 'portal:', 'patch:')
+
+
+def registry_target(declared):
+    """Map a declared dependency spec to (registry package override, range), or None if not from the registry."""
+    if declared.startswith('npm:'):
+        alias = declared[4:]
+        at = alias.rfind('@')
+        if at > 0:
+            return alias[:at], alias[at + 1:]
+        return alias, '*'
+    if declared.startswith(NON_REGISTRY_PREFIXES) or ('/' in declared and not declared.startswith('@')):
+        return None
+    return None, declared
+
+
+def read_declared_dependencies(project_path):
+    """Return (project name, {package: declared spec}) from package.json."""
+    package_data = get_snapshot(project_path).package_json()
+
+    declared = {}
+    for section in DEPENDENCY_SECTIONS:
+        declared.update(package_data.get(section) or {})
+    return package_data.get('name', os.path.basename(os.path.abspath(project_path))), declared
+
+
+def compute_outdated_entry(current, declared_range, packument):
+    """Compute current/wanted/latest for one package from its packument."""
+    dist_tags = packument.get('dist-tags', {})
+    latest = dist_tags.get('latest')
+    index = VersionIndex(packument.get('versions', {}).keys())
+
+    if declared_range in dist_tags:
+        wanted = dist_tags[declared_range]
+    elif latest and satisfies(latest, declared_range):
+        # npm prefers the latest tag whenever it satisfies the declared range
+        wanted = latest
+    else:
+        wanted = index.max_satisfying(declared_range)
+
+    wanted = wanted or current
+    latest = latest or wanted
+    entry = {'wanted': wanted, 'latest': latest}
+    if current:
+        entry['current'] = current
+    return entry
+
+
+def resolve_outdated_packages(project_path, max_workers=DEFAULT_MAX_WORKERS):
+    """Resolve outdated packages without npm; returns None when npm outdated must be used instead."""
+    graph = load_dependency_graph(project_path)
+    if graph is None:
+        return None
+    try:
+        project_name, declared = read_declared_dependencies(project_path)
+    except Exception as e:
+        write_log(f"ERROR: Could not read package.json: {e}")
+        return None
+
+    lookups = {}
+    for package, spec in declared.items():
+        target = registry_target(spec)
+        if target is None:
+            continue
+        registry_name, declared_range = target
+        lookups[package] = (registry_name or package, declared_range)
+
+    if not lookups:
+        return {}
+
+    client = get_registry_client(project_path)
+
+    def lookup(package):
+        return client.get_packument(lookups[package][0])
+
+    workers = max(1, min(max_workers, len(lookups)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {package: executor.submit(contextvars.copy_context().run, lookup, package) for package in lookups}
+
+    outdated = {}
+    for package in sorted(futures):
+        try:
+            packument = futures[package].result()
+        except Exception as e:
+            write_log(f"ERROR: Registry lookup failed for {package}: {e}")
+            return None
+
+        current = graph['dependencies'].get(package, {}).get('version')
+        entry = compute_outdated_entry(current, lookups[package][1], packument)
+        if current == entry['wanted'] == entry['latest']:
+            continue
+        entry['dependent'] = project_name
+        entry['location'] = os.path.join(project_path, 'node_modules', package)
+        outdated[package] = {key: entry[key] for key in ('current', 'wanted', 'latest', 'dependent', 'location') if key in entry}
+
+    write_log(f"Resolved outdated packages natively ({len(lookups)} registry lookups, {workers} workers)")
+    return outdated
@@ -1,41 +1,64 @@
 """
 Package management operations
 """
-import subprocess
 import json
 import os
+import re
 from ..utils.logger import log, write_log
+from ..utils.command_runner import run_command, format_tail, CommandError
+from ..utils.events import span
 from ..utils.version import is_minor_update
+from .lockfile_service import load_dependency_graph, graph_from_npm_ls
+from .outdated_service import resolve_outdated_packages
+from .project_snapshot import get_snapshot
+from .restore_service import create_restore_point
+from .verification_service import verify_project, describe_failure
 
 def get_outdated_packages(project_path, minor_only=False):
-    """Get outdated packages from npm"""
-    result = subprocess.run(['npm', 'outdated', '--json'], cwd=project_path, capture_output=True, text=True)
-    if result.returncode != 0 and result.stderr:
-        error_msg = f"Error running npm outdated: {result.stderr}"
+    """Get outdated packages, resolved natively or via npm outdated as a fallback"""
+    def discover():
+        with span('outdated'):
+            return resolve_all_outdated_packages(project_path)
+    
+    outdated_packages = get_snapshot(project_path).memoize('outdated', discover)
+    if outdated_packages is None:
+        return {}
+    
+    if minor_only:
+        filtered = {}
+        for package, details in outdated_packages.items():
+            if is_minor_update(details.get("current", ""), details.get("latest", "")):
+                filtered[package] = details
+        outdated_packages = filtered
+        write_log(f"Filtered to {len(outdated_packages)} minor updates only")
+    
+    write_log(f"Found {len(outdated_packages)} outdated packages: {list(outdated_packages.keys())}")
+    print_outdated_packages(outdated_packages)
+    return outdated_packages
+
+def resolve_all_outdated_packages(project_path):
+    """Resolve every outdated package (None if neither resolver succeeded)"""
+    outdated_packages = resolve_outdated_packages(project_path)
+    if outdated_packages is None:
+        outdated_packages = get_npm_outdated_packages(project_path)
+    return outdated_packages
+
+def get_npm_outdated_packages(project_path):
+    """Get outdated packages from npm outdated (None on failure)"""
+    result = run_command(['npm', 'outdated', '--json'], project_path, capture_stdout=True)
+    if result.status in ('timeout', 'cancelled') or (result.returncode != 0 and result.output):
+        error_msg = f"Error running npm outdated: {result.output or result.describe()}"
         print(error_msg)
         write_log(f"ERROR: {error_msg}")
-        return {}
+        return None
     
     try:
-        outdated_packages = json.loads(result.stdout) if result.stdout.strip() else {}
-        
-        if minor_only:
-            filtered = {}
-            for package, details in outdated_packages.items():
-                if is_minor_update(details.get("current", ""), details.get("latest", "")):
-                    filtered[package] = details
-            outdated_packages = filtered
-            write_log(f"Filtered to {len(outdated_packages)} minor updates only")
-        
-        write_log(f"Found {len(outdated_packages)} outdated packages: {list(outdated_packages.keys())}")
-        print_outdated_packages(outdated_packages)
+        return json.loads(result.stdout) if result.stdout.strip() else {}
     except Exception as e:
         error_msg = f"Error parsing npm outdated output: {e}"
         print(error_msg)
         write_log(f"ERROR: {error_msg}")
-        return {}
-    
-    return outdated_packages
+        return None
 
 def print_outdated_packages(outdated_packages):
     """Print the outdated packages in a formatted table."""
@@ -50,73 +73,142 @@ def print_outdated_packages(outdated_packages):
     log("-" * 70)
 
 def get_dependency_tree(project_path):
-    """Fetch the dependency tree using npm ls."""
+    """Load the dependency graph from the lockfile, falling back to npm ls."""
+    def load():
+        with span('tree'):
+            return load_dependency_tree(project_path)
+    
+    return get_snapshot(project_path).memoize('dependency_graph', load) or {}
+
+def load_dependency_tree(project_path):
+    """Read the dependency graph without consulting the snapshot (None if npm ls fails)."""
+    dependency_graph = load_dependency_graph(project_path)
+    if dependency_graph is not None:
+        return dependency_graph
+
+    write_log("No usable lockfile found, falling back to npm ls")
     try:
-        result = subprocess.run(['npm', 'ls', '--json'], cwd=project_path, capture_output=True, text=True)
+        result = run_command(['npm', 'ls', '--json', '--all'], project_path, capture_stdout=True)
         sanitized_output = sanitize_json_output(result.stdout)
         dependency_tree = json.loads(sanitized_output)
     except Exception as e:
         error_msg = f"Error parsing npm ls output: {e}"
         print(error_msg)
         write_log(f"ERROR: {error_msg}")
-        return {}
+        return None
     
-    return dependency_tree
+    return graph_from_npm_ls(dependency_tree)
 
 def sanitize_json_output(output):
     """Sanitize JSON output to replace JavaScript-style values with Python-compatible values."""
     sanitized_output = output.replace("false", "false").replace("true", "true").replace("null", "null")
     return sanitized_output
 
-def install_package(package, version, project_path, safe_mode, quiet_mode):
-    """Install a specific package version."""
+def install_package(package, version, project_path, safe_mode, quiet_mode, restore_point=None):
+    """Install a specific package version.
+
+    In safe mode a failed install or test run is rolled back from restore_point,
+    or from one taken here if the caller has none.
+    """
+    if restore_point or not safe_mode:
+        return _install_package(package, version, project_path, safe_mode, quiet_mode, restore_point)
+    restore_point = create_restore_point(project_path)
+    try:
+        return _install_package(package, version, project_path, safe_mode, quiet_mode, restore_point)
+    finally:
+        if restore_point:
+            restore_point.discard()
+
+def _install_package(package, version, project_path, safe_mode, quiet_mode, restore_point):
     try:
         log(f"Updating {package} from current to {version}...")
         
         # Install the package
-        result = subprocess.run(["npm", "install", f"{package}@{version}"], 
-                              cwd=project_path, 
-                              check=True,
-                              capture_output=quiet_mode, 
-                              text=True)
+        with span('install', package=package, version=version) as install_event:
+            result = run_command(["npm", "install", f"{package}@{version}"], project_path, quiet_mode)
+            install_event['status'] = 'ok' if result.ok else result.status
+        result.check()
         
         if safe_mode:
             # Run tests after installation in safe mode
             log(f"🧪 Running tests after updating {package}...")
-            try:
-                # Check if test script exists
-                package_json_path = os.path.join(project_path, "package.json")
-                if os.path.isfile(package_json_path):
-                    with open(package_json_path, 'r') as f:
-                        package_data = json.load(f)
-                    
-                    scripts = package_data.get('scripts', {})
-                    
-                    # Run test if available
-                    if 'test' in scripts:
-                        subprocess.run(["npm", "test"], cwd=project_path, check=True,
-                                     capture_output=quiet_mode, text=True)
-                        log(f"✅ Tests passed for {package}")
-                    
-                    # Run build if available
-                    if 'build' in scripts:
-                        subprocess.run(["npm", "run", "build"], cwd=project_path, check=True,
-                                     capture_output=quiet_mode, text=True)
-                        log(f"✅ Build passed for {package}")
-                        
-            except subprocess.CalledProcessError as test_error:
+            result = verify_project(project_path, quiet_mode)
+            if result['passed']:
+                log(f"✅ Verification passed for {package}")
+            else:
                 log(f"❌ Tests/build failed for {package}, reverting...")
                 # Revert the package installation
                 try:
-                    subprocess.run(["npm", "install"], cwd=project_path, check=True,
-                                 capture_output=quiet_mode, text=True)
+                    if restore_point:
+                        restore_point.restore()
+                    else:
+                        run_command(["npm", "install"], project_path, quiet_mode).check()
                 except:
                     pass
-                raise Exception(f"Tests/build failed for {package}: {test_error}")
+                raise Exception(f"Tests/build failed for {package}: {describe_failure(result)}")
         
         return True
         
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Error installing {package}@{version}: {e}"
+    except CommandError as e:
+        error_msg = f"Error installing {package}@{version}: {e}{format_tail(e.result.tail())}"
         write_log(f"ERROR: {error_msg}")
+        if restore_point:
+            restore_point.restore()
         raise Exception(error_msg)
+
+def find_failed_specs(output, specs):
+    """Pick out the package specs npm reported as unresolvable in its output."""
+    failed = set()
+    for name, version in specs:
+        spec = f"{name}@{version}"
+        if f"No matching version found for {spec}" in output or \
+                re.search(rf"404 Not Found - GET \S*/{re.escape(name.replace('/', '%2f'))}(\s|$)", output, re.IGNORECASE):
+            failed.add(name)
+    return failed
+
+def install_packages(packages, project_path, quiet_mode):
+    """Install several package versions with a single npm install.
+
+    packages is a list of (package, version) pairs. Returns (installed, failures)
+    where failures maps each package that could not be installed to its error.
+    """
+    if not packages:
+        return [], {}
+    
+    specs = [f"{package}@{version}" for package, version in packages]
+    log(f"📦 Installing batch of {len(specs)}: {' '.join(specs)}")
+    with span('install', packages=specs) as install_event:
+        result = run_command(["npm", "install"] + specs, project_path, quiet_mode)
+        install_event['status'] = 'ok' if result.ok else result.status
+    
+    if result.ok:
+        write_log(f"SUCCESS: Batch installed {', '.join(specs)}")
+        return [package for package, _ in packages], {}
+    
+    output = result.output
+    if len(packages) == 1:
+        package, version = packages[0]
+        error_msg = f"Error installing {package}@{version}: npm {result.describe()}"
+        write_log(f"ERROR: {error_msg}")
+        return [], {package: error_msg}
+    
+    # Drop the specs npm named as unresolvable and retry the rest as one batch
+    failures = {}
+    for package in find_failed_specs(output, packages):
+        failures[package] = f"Error installing {package}: no matching version in the registry"
+        write_log(f"ERROR: {failures[package]}")
+    remaining = [(package, version) for package, version in packages if package not in failures]
+    
+    if failures and remaining:
+        installed, retry_failures = install_packages(remaining, project_path, quiet_mode)
+        failures.update(retry_failures)
+        return installed, failures
+    
+    # npm didn't say which spec broke the batch; fall back to one install per package
+    log("⚠️  Batch install failed, installing packages individually to isolate failures...")
+    installed = []
+    for package, version in remaining:
+        single_installed, single_failures = install_packages([(package, version)], project_path, quiet_mode)
+        installed.extend(single_installed)
+        failures.update(single_failures)
+    return installed, failures
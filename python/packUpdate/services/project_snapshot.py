@@ -0,0 +1,110 @@
+"""
+Per-run project state cache
+
+A ProjectSnapshot memoizes what services derive from a project (outdated
+packages, dependency graph, package.json, breaking-change analysis) and drops
+everything as soon as package.json or the lockfile change on disk, e.g. after
+an install.
+"""
+import hashlib
+import json
+import os
+import threading
+
+FINGERPRINT_FILES = ('package.json', 'package-lock.json', 'npm-shrinkwrap.json')
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+class ProjectSnapshot:
+    """Memoized project state, valid for one package.json + lockfile content."""
+
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self._values = {}
+        self._stats = None
+        self._fingerprint = None
+        self._lock = threading.RLock()
+
+    def _file_stats(self):
+        stats = []
+        for name in FINGERPRINT_FILES:
+            try:
+                stat = os.stat(os.path.join(self.project_path, name))
+                stats.append((name, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append((name, None, None))
+        return tuple(stats)
+
+    def fingerprint(self):
+        """Content hash of package.json and the lockfile (rehashed only when their stat changes)."""
+        with self._lock:
+            stats = self._file_stats()
+            if stats != self._stats:
+                digest = hashlib.sha256()
+                for name, mtime, _ in stats:
+                    digest.update(name.encode())
+                    if mtime is not None:
+                        try:
+                            with open(os.path.join(self.project_path, name), 'rb') as f:
+                                digest.update(f.read())
+                        except OSError:
+                            pass
+                self._stats = stats
+                fingerprint = digest.hexdigest()
+                if fingerprint != self._fingerprint:
+                    self._values.clear()
+                    self._fingerprint = fingerprint
+            return self._fingerprint
+
+    def memoize(self, key, compute):
+        """Return the cached value for key, computing it if the project changed since.
+
+        compute returns None on failure; that is not cached, so the next call retries.
+        """
+        fingerprint = self.fingerprint()
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        value = compute()
+        with self._lock:
+            if value is not None and self._fingerprint == fingerprint:
+                self._values[key] = value
+        return value
+
+    def invalidate(self):
+        """Forget everything cached for this project."""
+        with self._lock:
+            self._values.clear()
+            self._stats = None
+            self._fingerprint = None
+
+    def package_json(self):
+        """Parsed package.json (shared; treat as read-only)."""
+        def read():
+            with open(os.path.join(self.project_path, 'package.json'), 'r') as f:
+                return json.load(f)
+        return self.memoize('package.json', read)
+
+    def scripts(self):
+        """Scripts declared in package.json ({} if there is no readable package.json)."""
+        try:
+            return self.package_json().get('scripts', {}) or {}
+        except (OSError, ValueError):
+            return {}
+
+
+def get_snapshot(project_path):
+    """Shared snapshot for a project directory."""
+    key = os.path.abspath(project_path)
+    with _snapshots_lock:
+        if key not in _snapshots:
+            _snapshots[key] = ProjectSnapshot(project_path)
+        return _snapshots[key]
+
+
+def reset_snapshots():
+    """Drop all snapshots (start of a new run)."""
+    with _snapshots_lock:
+        _snapshots.clear()
@@ -0,0 +1,212 @@
+"""
+npm registry access
+
+A pooled, caching registry client: one keep-alive HTTP session per run,
+abbreviated packuments where full metadata isn't needed, single-version
+documents (/<package>/<version>) for fields only the full metadata has, and
+an on-disk cache revalidated with ETag/Last-Modified once its TTL expires.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import quote, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from ..utils.logger import write_log
+
+DEFAULT_REGISTRY = 'https://registry.npmjs.org/'
+ABBREVIATED_ACCEPT = 'application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8, */*'
+FULL_ACCEPT = 'application/json'
+REQUEST_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 32
+DEFAULT_CACHE_TTL = int(os.getenv('PACKUPDATE_REGISTRY_TTL', '300'))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_cache_dir():
+    """Base directory for PackUpdate's persistent caches."""
+    return os.getenv('PACKUPDATE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'packupdate'))
+
+
+def read_npmrc(project_path):
+    """Merge user and project .npmrc settings (project wins), expanding ${ENV} references."""
+    settings = {}
+    for npmrc_path in (os.path.expanduser('~/.npmrc'), os.path.join(project_path, '.npmrc')):
+        if not os.path.isfile(npmrc_path):
+            continue
+        try:
+            with open(npmrc_path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith(('#', ';')) or '=' not in line:
+                        continue
+                    key, value = line.split('=', 1)
+                    settings[key.strip()] = os.path.expandvars(value.strip().strip('"\''))
+        except Exception as e:
+            write_log(f"ERROR: Could not read {npmrc_path}: {e}")
+    return settings
+
+
+def get_registry_url(project_path, package_name=None, settings=None):
+    """Resolve the registry URL npm would use for a package."""
+    settings = read_npmrc(project_path) if settings is None else settings
+    if package_name and package_name.startswith('@'):
+        scope = package_name.split('/')[0]
+        scoped = os.getenv(f'npm_config_{scope}:registry') or settings.get(f'{scope}:registry')
+        if scoped:
+            return scoped.rstrip('/') + '/'
+    registry = os.getenv('npm_config_registry') or os.getenv('NPM_CONFIG_REGISTRY') or settings.get('registry')
+    return (registry or DEFAULT_REGISTRY).rstrip('/') + '/'
+
+
+def packument_url(registry_url, package_name):
+    """Registry document URL for a package (scoped names keep their @ but escape the /)."""
+    return registry_url + quote(package_name, safe='@')
+
+
+class RegistryClient:
+    """Keep-alive registry client with an on-disk, revalidating packument cache."""
+
+    def __init__(self, project_path, cache_dir=None, ttl=DEFAULT_CACHE_TTL, pool_size=DEFAULT_POOL_SIZE):
+        self.project_path = project_path
+        self.ttl = ttl
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), 'registry')
+        self.settings = read_npmrc(project_path)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.stats = {'requests': 0, 'not_modified': 0, 'cache_hits': 0}
+        self._memory = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_packument(self, package_name, full=False):
+        """Return a package's registry document, fetching it at most once per run."""
+        kind = 'full' if full else 'abbreviated'
+        with self._lock:
+            lock = self._locks.setdefault((package_name, kind), threading.Lock())
+
+        with lock:
+            # A full document is a superset of the abbreviated one
+            for key in ((package_name, 'full'), (package_name, kind)):
+                if key in self._memory:
+                    return self._memory[key]
+
+            registry_url = get_registry_url(self.project_path, package_name, self.settings)
+            packument = self._fetch(packument_url(registry_url, package_name), full)
+            self._memory[(package_name, kind)] = packument
+            return packument
+
+    def get_version(self, package_name, version):
+        """Return the full document of one published version (homepage, repository, ...).
+
+        Much smaller than the full packument, which repeats this for every version.
+        """
+        key = (package_name, f"version:{version}")
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            full = self._memory.get((package_name, 'full'))
+            if full and version in full.get('versions', {}):
+                return full['versions'][version]
+            if key not in self._memory:
+                registry_url = get_registry_url(self.project_path, package_name, self.settings)
+                url = f"{packument_url(registry_url, package_name)}/{quote(version, safe='')}"
+                self._memory[key] = self._fetch(url, True)
+            return self._memory[key]
+
+    def _fetch(self, url, full):
+        cache_path = self._cache_path(url, full)
+        cached = self._read_cache(cache_path)
+        if cached and time.time() - cached.get('fetched_at', 0) < self.ttl:
+            self._count('cache_hits')
+            return cached['packument']
+
+        headers = {'Accept': FULL_ACCEPT if full else ABBREVIATED_ACCEPT}
+        headers.update(self._auth_headers(url))
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        self._count('requests')
+        response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached:
+            self._count('not_modified')
+            cached['fetched_at'] = time.time()
+            self._write_cache(cache_path, cached)
+            return cached['packument']
+
+        response.raise_for_status()
+        packument = response.json()
+        self._write_cache(cache_path, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'packument': packument
+        })
+        return packument
+
+    def _auth_headers(self, url):
+        """Bearer/basic auth from .npmrc entries scoped to the registry host and path."""
+        parsed = urlparse(url)
+        path = parsed.path
+        while True:
+            prefix = f"//{parsed.netloc}{path.rstrip('/')}/:"
+            if self.settings.get(prefix + '_authToken'):
+                return {'Authorization': f"Bearer {self.settings[prefix + '_authToken']}"}
+            if self.settings.get(prefix + '_auth'):
+                return {'Authorization': f"Basic {self.settings[prefix + '_auth']}"}
+            if path in ('', '/'):
+                return {}
+            path = path.rstrip('/').rsplit('/', 1)[0]
+
+    def _cache_path(self, url, full):
+        digest = hashlib.sha256(f"{'full' if full else 'abbreviated'}:{url}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def _read_cache(self, cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, cache_path, entry):
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            write_log(f"ERROR: Could not write registry cache {cache_path}: {e}")
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def get_registry_client(project_path):
+    """Shared registry client for a project, reused for the whole run."""
+    key = os.path.abspath(project_path)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = RegistryClient(project_path)
+        return _clients[key]
+
+
+def reset_registry_clients():
+    """Drop shared clients (their in-memory documents) so the next lookup revalidates."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -1,51 +1,84 @@
 """
 Security and dependency report generation
 """
-import subprocess
+import contextvars
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from ..utils.command_runner import run_command
+from ..utils.events import span
 from ..utils.logger import log, write_log, get_log_dir
-from .package_service import get_outdated_packages
+from .package_service import get_outdated_packages, get_dependency_tree
+from .registry_service import get_registry_client
+from .project_snapshot import get_snapshot
+
+ANALYSIS_WORKERS = 8
 
 def generate_security_report(project_path):
     """Generate security audit report."""
     try:
-        result = subprocess.run(['npm', 'audit', '--json'], cwd=project_path, capture_output=True, text=True)
+        result = run_command(['npm', 'audit', '--json'], project_path, capture_stdout=True)
         return json.loads(result.stdout) if result.stdout.strip() else {}
     except:
         return {}
 
 def generate_dependency_report(project_path):
-    """Generate dependency tree report."""
+    """Generate dependency graph report (lockfile first, npm ls as fallback)."""
     try:
-        result = subprocess.run(['npm', 'ls', '--json', '--all'], cwd=project_path, capture_output=True, text=True)
-        return json.loads(result.stdout) if result.stdout.strip() else {}
+        return get_dependency_tree(project_path) or {}
     except:
         return {}
 
-def find_circular_dependencies(deps, visited=None, path=None):
-    """Find circular dependencies in the dependency tree."""
-    if visited is None:
-        visited = set()
-    if path is None:
-        path = []
-    
+def find_circular_dependencies(dependency_graph):
+    """Find circular dependencies in the dependency graph."""
+    packages = (dependency_graph or {}).get('dependencies', {})
     circular = []
-    if not deps or 'dependencies' not in deps:
-        return circular
-    
-    for name, info in deps['dependencies'].items():
-        if name in visited:
-            if name in path:
-                circular.append(' → '.join(path + [name]))
+    state = {}  # name -> 1 while on the DFS stack, 2 once finished
+
+    for start in packages:
+        if start in state:
             continue
-        visited.add(name)
-        circular.extend(find_circular_dependencies(info, visited, path + [name]))
+        state[start] = 1
+        path = [start]
+        stack = [iter(packages[start].get('requires', {}))]
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                state[path.pop()] = 2
+                stack.pop()
+                continue
+            if dep not in packages:
+                continue
+            if state.get(dep) == 1:
+                circular.append(' → '.join(path[path.index(dep):] + [dep]))
+            elif dep not in state:
+                state[dep] = 1
+                path.append(dep)
+                stack.append(iter(packages[dep].get('requires', {})))
     
     return circular
 
-def check_breaking_changes(package_name, current_version, latest_version):
+def get_package_info(package_name, project_path):
+    """Get a package's abbreviated registry document (cached, one request per run at most)."""
+    try:
+        return get_registry_client(project_path).get_packument(package_name)
+    except Exception as error:
+        write_log(f"ERROR: Registry lookup failed for {package_name}: {error}")
+        return {}
+
+def get_version_info(package_name, version, project_path):
+    """Get the registry document of one version of a package (homepage, repository)."""
+    if not version:
+        return {}
+    try:
+        return get_registry_client(project_path).get_version(package_name, version)
+    except Exception as error:
+        write_log(f"ERROR: Registry lookup failed for {package_name}@{version}: {error}")
+        return {}
+
+def check_breaking_changes(package_name, current_version, latest_version, project_path='.'):
     """Check for breaking changes in package updates"""
     # Check if major version change (likely breaking)
     try:
@@ -55,12 +88,8 @@ def check_breaking_changes(package_name, current_version, latest_version):
     except:
         has_major_change = False
     
-    # Get package info for changelog analysis
-    try:
-        result = subprocess.run(['npm', 'info', package_name, '--json'], capture_output=True, text=True)
-        package_info = json.loads(result.stdout) if result.stdout.strip() else {}
-    except:
-        package_info = {}
+    # Get the latest version's metadata for changelog analysis
+    package_info = get_version_info(package_name, latest_version, project_path)
     
     return {
         'hasMajorVersionChange': has_major_change,
@@ -73,12 +102,9 @@ def check_breaking_changes(package_name, current_version, latest_version):
 
 def check_peer_dependencies(package_name, project_path):
     """Check peer dependency compatibility"""
-    try:
-        result = subprocess.run(['npm', 'info', package_name, 'peerDependencies', '--json'], 
-                              cwd=project_path, capture_output=True, text=True)
-        peer_deps = json.loads(result.stdout) if result.stdout.strip() else {}
-    except:
-        peer_deps = {}
+    package_info = get_package_info(package_name, project_path)
+    latest_version = package_info.get('dist-tags', {}).get('latest')
+    peer_deps = package_info.get('versions', {}).get(latest_version, {}).get('peerDependencies') or {}
     
     return {
         'hasPeerDependencies': len(peer_deps) > 0,
@@ -86,21 +112,53 @@ def check_peer_dependencies(package_name, project_path):
         'compatibilityIssues': []  # Simplified for now
     }
 
-def analyze_breaking_changes(outdated_packages, project_path):
-    """Analyze breaking changes for all outdated packages"""
+def set_analysis_workers(workers):
+    """Set how many packages are analyzed concurrently"""
+    global ANALYSIS_WORKERS
+    ANALYSIS_WORKERS = max(1, int(workers))
+
+def analyze_package(package_name, details, project_path):
+    """Analyze one outdated package, returning its results and how long the lookups took"""
+    started = time.perf_counter()
+    breaking_analysis = check_breaking_changes(package_name, details.get('current', ''), details.get('latest', ''), project_path)
+    peer_analysis = check_peer_dependencies(package_name, project_path)
+    return breaking_analysis, peer_analysis, (time.perf_counter() - started) * 1000
+
+def analyze_breaking_changes(outdated_packages, project_path, max_workers=None):
+    """Analyze breaking changes for all outdated packages (memoized per project state)"""
+    key = ('analysis', tuple((name, details.get('current'), details.get('latest'))
+                             for name, details in outdated_packages.items()))
+    def analyze():
+        with span('analysis', packages=len(outdated_packages)):
+            return run_breaking_change_analysis(outdated_packages, project_path, max_workers)
+    
+    return get_snapshot(project_path).memoize(key, analyze)
+
+def run_breaking_change_analysis(outdated_packages, project_path, max_workers=None):
+    """Analyze each outdated package concurrently and merge the results"""
     analysis = {
         'safeUpdates': [],
         'riskyUpdates': [],
         'breakingChanges': {},
-        'peerDependencyIssues': {}
+        'peerDependencyIssues': {},
+        'latencyMs': {}
     }
+    if not outdated_packages:
+        return analysis
+    
+    workers = min(max_workers or ANALYSIS_WORKERS, len(outdated_packages))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {package_name: executor.submit(contextvars.copy_context().run, analyze_package,
+                                                 package_name, details, project_path)
+                   for package_name, details in outdated_packages.items()}
     
-    for package_name, details in outdated_packages.items():
-        breaking_analysis = check_breaking_changes(package_name, details.get('current', ''), details.get('latest', ''))
-        peer_analysis = check_peer_dependencies(package_name, project_path)
+    # Merge in input order so safe/risky ordering doesn't depend on completion order
+    for package_name in outdated_packages:
+        breaking_analysis, peer_analysis, latency_ms = futures[package_name].result()
         
         analysis['breakingChanges'][package_name] = breaking_analysis
         analysis['peerDependencyIssues'][package_name] = peer_analysis
+        analysis['latencyMs'][package_name] = round(latency_ms, 1)
         
         # Categorize as safe or risky
         if breaking_analysis['riskLevel'] == 'low' and not peer_analysis['hasPeerDependencies']:
@@ -114,10 +172,14 @@ def generate_comprehensive_report(project_path):
     """Generate comprehensive security and dependency report."""
     log("\n=== Generating Comprehensive Security & Dependency Report ===")
     
-    security_report = generate_security_report(project_path)
-    dependency_report = generate_dependency_report(project_path)
-    outdated_packages = get_outdated_packages(project_path)
-    breaking_change_analysis = analyze_breaking_changes(outdated_packages, project_path)
+    with span('report', section='security'):
+        security_report = generate_security_report(project_path)
+    with span('report', section='dependencies'):
+        dependency_report = generate_dependency_report(project_path)
+    with span('report', section='outdated'):
+        outdated_packages = get_outdated_packages(project_path)
+    with span('report', section='breaking_changes'):
+        breaking_change_analysis = analyze_breaking_changes(outdated_packages, project_path)
     
     report = {
         'timestamp': datetime.now().isoformat(),
@@ -137,7 +199,8 @@ def generate_comprehensive_report(project_path):
             'safeUpdates': breaking_change_analysis['safeUpdates'],
             'riskyUpdates': breaking_change_analysis['riskyUpdates'],
             'analysis': breaking_change_analysis['breakingChanges'],
-            'peerDependencyIssues': breaking_change_analysis['peerDependencyIssues']
+            'peerDependencyIssues': breaking_change_analysis['peerDependencyIssues'],
+            'analysisLatencyMs': breaking_change_analysis['latencyMs']
         },
         'recommendations': []
     }
@@ -158,8 +221,9 @@ def generate_comprehensive_report(project_path):
     if not os.path.exists(get_log_dir()):
         os.makedirs(get_log_dir(), exist_ok=True)
     
-    with open(report_file, 'w') as f:
-        json.dump(report, f, indent=2)
+    with span('report', section='write', file=report_file):
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
     
     # Display summary
     display_report_summary(report, report_file)
@@ -179,6 +243,11 @@ def display_report_summary(report, report_file):
     log(f"✅ Safe Updates: {len(report['breakingChanges']['safeUpdates'])}")
     log(f"⚠️  Risky Updates: {len(report['breakingChanges']['riskyUpdates'])}")
     
+    latencies = report['breakingChanges'].get('analysisLatencyMs', {})
+    if latencies:
+        slowest = sorted(latencies.items(), key=lambda item: item[1], reverse=True)[:5]
+        log(f"⏱️  Slowest Lookups: " + ", ".join(f"{pkg} ({ms:.0f} ms)" for pkg, ms in slowest))
+    
     if report['security']['vulnerable_packages']:
         log(f"\n🚨 VULNERABLE PACKAGES:")
         for pkg in report['security']['vulnerable_packages']:
@@ -205,8 +274,9 @@ def display_report_summary(report, report_file):
     
     log(f"\n📄 Full report saved: {report_file}")
 
-def get_safe_packages_for_update(project_path):
+def get_safe_packages_for_update(project_path, outdated_packages=None):
     """Get safe packages for priority updating"""
-    outdated_packages = get_outdated_packages(project_path)
+    if outdated_packages is None:
+        outdated_packages = get_outdated_packages(project_path)
     breaking_change_analysis = analyze_breaking_changes(outdated_packages, project_path)
     return breaking_change_analysis['safeUpdates']
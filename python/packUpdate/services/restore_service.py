@@ -0,0 +1,117 @@
+"""
+Restore points for fast safe-mode reverts
+
+A restore point captures package.json, the lockfile and a copy of
+node_modules before a trial install, so a failed candidate is rolled back
+byte-for-byte without running npm or re-verifying the known-good state.
+
+node_modules is reflinked where the filesystem supports it and copied
+otherwise, never hardlinked: a trial's postinstall scripts, patch-package or
+node_modules/.cache writes rewrite files in place, which would change a
+hardlinked restore point along with the project.
+"""
+import os
+import shutil
+import tempfile
+from ..utils.events import span
+from ..utils.fs import copy_tree
+from ..utils.logger import write_log
+from .project_snapshot import FINGERPRINT_FILES
+
+
+class RestorePoint:
+    """Saved install state of a project (package.json, lockfiles, node_modules)."""
+
+    def __init__(self, project_path, files, storage_dir, has_node_modules):
+        self.project_path = project_path
+        self.files = files
+        self.storage_dir = storage_dir
+        self.has_node_modules = has_node_modules
+
+    @property
+    def node_modules_copy(self):
+        return os.path.join(self.storage_dir, 'node_modules')
+
+    def restore(self):
+        """Put the project back exactly as it was captured (the restore point stays usable)."""
+        with span('revert', project=self.project_path, method='restore_point'):
+            for name, content in self.files.items():
+                path = os.path.join(self.project_path, name)
+                if content is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+                with open(path, 'wb') as f:
+                    f.write(content)
+
+            node_modules = os.path.join(self.project_path, 'node_modules')
+            if os.path.lexists(node_modules):
+                self._remove_node_modules(node_modules)
+            if self.has_node_modules:
+                copy_tree(self.node_modules_copy, node_modules, allow_hardlinks=False)
+            write_log(f"Restored {self.project_path} from restore point")
+
+    def _remove_node_modules(self, node_modules):
+        # Move aside into the restore point's storage first, so a half-deleted tree is
+        # never left in place and nothing is left behind inside the project
+        try:
+            trash = tempfile.mkdtemp(prefix='trash-', dir=self.storage_dir)
+            os.rename(node_modules, os.path.join(trash, 'node_modules'))
+        except OSError:
+            # Storage on another filesystem: delete in place
+            if os.path.islink(node_modules):
+                os.remove(node_modules)
+                return
+            trash = node_modules
+        shutil.rmtree(trash, onerror=_log_removal_error)
+
+    def discard(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
+
+
+def _log_removal_error(function, path, exc_info):
+    write_log(f"ERROR: Could not remove {path}: {exc_info[1]}")
+
+
+def _make_storage_dir(project_path):
+    # Next to the project so node_modules can be reflinked and moved aside on the same filesystem
+    parent = os.path.dirname(os.path.abspath(project_path))
+    try:
+        return tempfile.mkdtemp(prefix='.packupdate-restore-', dir=parent)
+    except OSError:
+        return tempfile.mkdtemp(prefix='packupdate-restore-')
+
+
+def create_restore_point(project_path):
+    """Capture the project's install state, or None if it cannot be captured."""
+    if not os.path.isfile(os.path.join(project_path, 'package.json')):
+        return None
+
+    storage_dir = None
+    try:
+        files = {}
+        for name in FINGERPRINT_FILES:
+            path = os.path.join(project_path, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    files[name] = f.read()
+            else:
+                files[name] = None
+
+        storage_dir = _make_storage_dir(project_path)
+        node_modules = os.path.join(project_path, 'node_modules')
+        has_node_modules = os.path.isdir(node_modules)
+        if has_node_modules:
+            copy_tree(node_modules, os.path.join(storage_dir, 'node_modules'), allow_hardlinks=False)
+        return RestorePoint(project_path, files, storage_dir, has_node_modules)
+    except Exception as e:
+        write_log(f"ERROR: Could not create restore point for {project_path}: {e}")
+        if storage_dir:
+            shutil.rmtree(storage_dir, ignore_errors=True)
+        return None
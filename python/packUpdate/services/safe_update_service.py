@@ -0,0 +1,160 @@
+"""
+Safe-mode update strategies
+"""
+import os
+from ..utils.logger import log, write_log
+from ..utils.semver import VersionIndex
+from .registry_service import get_registry_client
+
+
+def group_test(candidates, apply, revert, verify):
+    """Find the candidates that can be applied without breaking verification.
+
+    Applies the whole batch and verifies once; on failure the batch is reverted
+    and split in half recursively until the offending candidates are isolated.
+    Candidates that pass stay applied, so later halves are verified on top of
+    them. When a batch fails and its first half passes, the second half is
+    known to contain a failure and is split without being verified as a whole.
+
+    apply(batch) and revert(batch) change the project; verify() returns a bool.
+    Returns (passed, failed) as lists in candidate order.
+    """
+    passed = []
+    failed = []
+    stats = {'verifications': 0}
+
+    def check(batch):
+        apply(batch)
+        stats['verifications'] += 1
+        if verify():
+            passed.extend(batch)
+            return True
+        revert(batch)
+        return False
+
+    def isolate(batch, known_bad):
+        if not known_bad and check(batch):
+            return
+        if len(batch) == 1:
+            failed.extend(batch)
+            return
+        middle = len(batch) // 2
+        left, right = batch[:middle], batch[middle:]
+        left_ok = check(left)
+        if not left_ok and len(left) > 1:
+            isolate(left, known_bad=True)
+        elif not left_ok:
+            failed.extend(left)
+        isolate(right, known_bad=left_ok)
+
+    if candidates:
+        isolate(list(candidates), known_bad=False)
+    write_log(f"Group testing: {len(passed)} passed, {len(failed)} failed, "
+              f"{stats['verifications']} verification(s) for {len(candidates)} candidate(s)")
+    order = {candidate: index for index, candidate in enumerate(candidates)}
+    passed.sort(key=order.get)
+    failed.sort(key=order.get)
+    return passed, failed
+
+
+def describe_batch(batch):
+    return ', '.join(f"{package}@{version}" for package, version in batch)
+
+
+def group_test_versions(batch, original_versions, install, verify, capture=None):
+    """Group-test (package, version) candidates, reverting failures to their original versions.
+
+    install(pairs) returns (installed, failures) like install_packages; a batch
+    whose install fails counts as a failed verification. capture() may return
+    a restore point taken before each trial; a failed batch is then restored
+    from it instead of reinstalling the original versions.
+    """
+    state = {'installed': False, 'restore_point': None}
+
+    def apply(candidates):
+        log(f"  🧪 Trying {describe_batch(candidates)}")
+        if state['restore_point']:
+            state['restore_point'].discard()
+        state['restore_point'] = capture() if capture else None
+        _, failures = install(candidates)
+        state['installed'] = not failures
+        if failures:
+            log(f"  ❌ Install failed: {'; '.join(f'{package}: {error}' for package, error in failures.items())}")
+
+    def revert(candidates):
+        log(f"  ↩️  Reverting {describe_batch(candidates)}")
+        if state['restore_point']:
+            state['restore_point'].restore()
+        else:
+            install([(package, original_versions[package]) for package, _ in candidates])
+
+    def checked_verify():
+        return state['installed'] and verify()
+
+    try:
+        return group_test(batch, apply, revert, checked_verify)
+    finally:
+        if state['restore_point']:
+            state['restore_point'].discard()
+
+
+def get_candidate_versions(package, current_version, latest_version, project_path):
+    """Published, non-deprecated releases above current up to latest, ascending."""
+    try:
+        packument = get_registry_client(project_path).get_packument(package)
+    except Exception as e:
+        write_log(f"ERROR: Could not list versions of {package}: {e}")
+        return [latest_version]
+    published = packument.get('versions', {}) or {}
+    index = VersionIndex(version for version, manifest in published.items()
+                         if not (manifest or {}).get('deprecated'))
+    versions = index.between(current_version, latest_version)
+    if latest_version not in versions:
+        versions.append(latest_version)
+    return versions
+
+
+def find_highest_passing_version(versions, try_version, tested=None):
+    """Binary-search ascending versions for the highest one that passes.
+
+    Assumes that once a version fails, every later one fails too. The newest
+    version is tried first, so an update that just works costs one trial.
+    try_version(version) returns a bool; results are recorded in tested
+    (version -> bool) and versions already in it are not tried again.
+    Returns the highest passing version or None.
+    """
+    tested = {} if tested is None else tested
+
+    def passes(version):
+        if version not in tested:
+            tested[version] = try_version(version)
+        return tested[version]
+
+    if not versions:
+        return None
+    if passes(versions[-1]):
+        return versions[-1]
+
+    best = None
+    low, high = 0, len(versions) - 2
+    while low <= high:
+        middle = (low + high) // 2
+        if passes(versions[middle]):
+            best = versions[middle]
+            low = middle + 1
+        else:
+            high = middle - 1
+    return best
+
+
+_version_trials = {}
+
+
+def get_version_trials(project_path, base_fingerprint, package):
+    """Trial results for a package tried on top of one project state, kept for the run."""
+    key = (os.path.abspath(project_path), base_fingerprint, package)
+    return _version_trials.setdefault(key, {})
+
+
+def reset_version_trials():
+    _version_trials.clear()
@@ -0,0 +1,68 @@
+"""
+Isolated project copies for parallel safe-mode trials
+"""
+import contextvars
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from ..utils.fs import clone_tree
+from ..utils.logger import write_log
+
+TRIAL_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def set_trial_workers(workers):
+    """Set how many sandbox trials run at once"""
+    global TRIAL_WORKERS
+    TRIAL_WORKERS = max(1, int(workers))
+
+
+def get_sandbox_root():
+    """Where sandboxes are created (PACKUPDATE_SANDBOX_DIR, e.g. a tmpfs like /dev/shm)."""
+    return os.getenv('PACKUPDATE_SANDBOX_DIR') or tempfile.gettempdir()
+
+
+@contextmanager
+def project_sandbox(project_path, root=None):
+    """A throwaway copy of the project, removed on exit."""
+    base = tempfile.mkdtemp(prefix='packupdate-trial-', dir=root or get_sandbox_root())
+    sandbox_path = os.path.join(base, os.path.basename(os.path.abspath(project_path)))
+    try:
+        method = clone_tree(project_path, sandbox_path)
+        write_log(f"Created sandbox {sandbox_path} (node_modules: {method})")
+        yield sandbox_path
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def run_trials(project_path, candidates, trial, max_workers=None, root=None):
+    """Run trial(sandbox_path, candidate) for each candidate in its own project copy.
+
+    Trials run concurrently; each gets a fresh copy of the real project, which
+    is never modified. A trial that raises counts as failed. Returns
+    (passed, failed) as lists in candidate order.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return [], []
+
+    def run(candidate):
+        try:
+            with project_sandbox(project_path, root) as sandbox_path:
+                return bool(trial(sandbox_path, candidate))
+        except Exception as e:
+            write_log(f"ERROR: Sandbox trial {candidate} failed: {e}")
+            return False
+
+    workers = min(max_workers or TRIAL_WORKERS, len(candidates))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each trial keeps the caller's context (e.g. the fleet repository its log lines belong to)
+        futures = [executor.submit(contextvars.copy_context().run, run, candidate) for candidate in candidates]
+        results = [future.result() for future in futures]
+
+    passed = [candidate for candidate, ok in zip(candidates, results) if ok]
+    failed = [candidate for candidate, ok in zip(candidates, results) if not ok]
+    write_log(f"Sandbox trials: {len(passed)} passed, {len(failed)} failed ({workers} worker(s))")
+    return passed, failed
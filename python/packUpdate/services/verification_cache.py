@@ -0,0 +1,172 @@
+"""
+Persistent verification result cache
+
+Build/test outcomes are stored under a content hash of the project state
+(package.json, the lockfile and tracked sources), so a state that was already
+verified - after a revert, in a later pass or in a later run - is not built and
+tested again.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from ..utils.command_runner import run_command
+from ..utils.logger import get_log_dir, write_log
+from .project_snapshot import FINGERPRINT_FILES
+from .registry_service import get_cache_dir
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('PACKUPDATE_VERIFY_CACHE_SIZE', '500'))
+DEFAULT_MAX_AGE = int(os.getenv('PACKUPDATE_VERIFY_CACHE_AGE', str(30 * 24 * 3600)))
+# Without git, skip directories that hold installs and build output
+UNTRACKED_DIRS = ('node_modules', '.git', 'dist', 'build', 'coverage', '.next', '.cache')
+
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+_cache = None
+
+
+def _file_digest(path):
+    """sha256 of a file, reused while its mtime and size are unchanged."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _file_digests_lock:
+        cached = _file_digests.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    with _file_digests_lock:
+        _file_digests[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def list_source_files(project_path):
+    """Tracked and unignored files (via git), else a walk that skips install/build dirs."""
+    result = run_command(['git', 'ls-files', '-z', '--cached', '--others', '--exclude-standard'],
+                         project_path, capture_stdout=True)
+    if result.ok:
+        return sorted({name for name in result.stdout.split('\0') if name})
+
+    files = []
+    for root, dirs, names in os.walk(project_path):
+        dirs[:] = [name for name in dirs if name not in UNTRACKED_DIRS]
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), project_path))
+    return sorted(files)
+
+
+def verification_key(project_path):
+    """Content hash identifying the project state, or None if it cannot be computed."""
+    if not os.path.isfile(os.path.join(project_path, 'package.json')):
+        return None
+    log_dir = os.path.abspath(get_log_dir()) + os.sep
+    digest = hashlib.sha256()
+    try:
+        files = set(list_source_files(project_path)) | set(FINGERPRINT_FILES)
+        for name in sorted(files):
+            path = os.path.join(project_path, name)
+            if name.startswith('node_modules/') or os.path.abspath(path).startswith(log_dir):
+                continue
+            if not os.path.isfile(path):
+                continue
+            digest.update(name.encode())
+            digest.update(b'\0')
+            digest.update(_file_digest(path).encode())
+    except OSError as e:
+        write_log(f"ERROR: Could not fingerprint {project_path} for verification: {e}")
+        return None
+    return digest.hexdigest()
+
+
+class VerificationCache:
+    """Pass/fail results and durations on disk, keyed by verification_key."""
+
+    def __init__(self, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), 'verification')
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Recorded result for a project state ({'passed', 'duration', ...}) or None."""
+        if not key:
+            return None
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('checked_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def put(self, key, passed, duration, details=None):
+        if not key:
+            return
+        entry = {'passed': passed, 'duration': duration, 'checked_at': time.time()}
+        entry.update(details or {})
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                write_log(f"ERROR: Could not write verification cache: {e}")
+                return
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries and the oldest ones beyond max_entries."""
+        try:
+            paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+            entries = sorted(((os.path.getmtime(path), path) for path in paths), reverse=True)
+        except OSError:
+            return
+        now = time.time()
+        for index, (mtime, path) in enumerate(entries):
+            if index >= self.max_entries or now - mtime > self.max_age:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Forget every recorded result; returns how many were removed."""
+        removed = 0
+        with self._lock:
+            try:
+                names = os.listdir(self.cache_dir)
+            except OSError:
+                return 0
+            for name in names:
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+
+def get_verification_cache():
+    """Shared verification cache for the run."""
+    global _cache
+    if _cache is None:
+        _cache = VerificationCache()
+    return _cache
+
+
+def reset_verification_cache():
+    """Forget the shared cache object and file digests (e.g. after PACKUPDATE_CACHE_DIR changes)."""
+    global _cache
+    _cache = None
+    with _file_digests_lock:
+        _file_digests.clear()
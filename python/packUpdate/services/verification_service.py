@@ -0,0 +1,250 @@
+"""
+Verification pipeline
+
+Every path that checks an update (safe-mode installs, run_tests, group testing
+and sandbox trials) goes through verify_project. Declared stages run as npm
+scripts or shell commands. Independent stages run concurrently, and the first
+failure stops the rest. Results are memoized per project state, in memory and
+in the persistent verification cache.
+
+Stages default to build then test. A project can declare its own in
+package.json::
+
+    "packUpdate": {
+        "verify": ["lint", "typecheck", "build", "test",
+                   {"name": "e2e", "command": "npx playwright test", "after": ["build"],
+                    "failOn": ["Error: browserType.launch"]}],
+        "failurePatterns": {"test": ["FAIL src/"]}
+    }
+
+A stage whose output matches one of its failure patterns (regular expressions)
+is stopped at once and counts as failed. Stages have no patterns unless the
+project sets them; true (for failOn, one failurePatterns entry or the whole
+of failurePatterns) selects the built-in DEFAULT_FAILURE_PATTERNS. The
+tail of a failed stage's output is kept with the result (output_tail) for
+failure messages; the full output is in the log file.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ..utils.command_runner import format_tail, run_command
+from ..utils.command_stats import get_current_package, package_scope
+from ..utils.events import emit, span
+from ..utils.logger import log, write_log
+from .project_snapshot import get_snapshot
+from .verification_cache import get_verification_cache, verification_key
+
+DEFAULT_STAGES = ('build', 'test')
+# Script stages that need another stage's output when both are declared
+DEFAULT_AFTER = {'test': ('build',)}
+# Output that usually means a stage has already failed, so it is stopped without waiting for it
+# to exit; only used when the project asks for them, since e.g. a test may print them on purpose
+DEFAULT_FAILURE_PATTERNS = {
+    'build': (r'error TS\d+:', r'Module not found: Error:', r'^ERROR in '),
+    'typecheck': (r'error TS\d+:',),
+    'test': (r'Test suite failed to run', r'Cannot find module .* from ')
+}
+
+# Stage statuses that do not make a stage the failing one
+NOT_FAILED = ('passed', 'cancelled', 'skipped')
+
+STAGE_NAMES = None
+_results = {}
+_results_lock = threading.Lock()
+
+
+def set_verify_stages(names):
+    """Override the stages to run (e.g. from --verify-stages); None uses the project's declaration."""
+    global STAGE_NAMES
+    STAGE_NAMES = list(names) if names else None
+
+
+def stage_failure_patterns(name, entry=None, config=None):
+    """Failure patterns for a stage: its failOn, else the project's failurePatterns, else none."""
+    configured = (config or {}).get('failurePatterns') or {}
+    if not isinstance(configured, dict):
+        configured = {name: configured}
+    patterns = (entry or {}).get('failOn', configured.get(name, ()))
+    if patterns is True:
+        return DEFAULT_FAILURE_PATTERNS.get(name, ())
+    return patterns or ()
+
+
+class Stage:
+    """One verification step: an npm script or a shell command."""
+
+    def __init__(self, name, command, after=(), failure_patterns=()):
+        self.name = name
+        self.command = command
+        self.after = tuple(after)
+        self.failure_patterns = tuple(failure_patterns)
+
+    def signature(self):
+        return [self.name, self.command, list(self.after), list(self.failure_patterns)]
+
+
+def load_stages(project_path, names=None):
+    """Resolve the stages to run; None if package.json cannot be read."""
+    try:
+        package_data = get_snapshot(project_path).package_json()
+    except Exception as e:
+        write_log(f"ERROR: Error reading package.json: {e}")
+        return None
+    scripts = package_data.get('scripts', {}) or {}
+    config = package_data.get('packUpdate') or {}
+    declared = names or STAGE_NAMES or config.get('verify') or DEFAULT_STAGES
+
+    stages = []
+    for entry in declared:
+        entry = entry if isinstance(entry, dict) else {'name': entry}
+        name = entry.get('name') or entry.get('script')
+        patterns = stage_failure_patterns(name, entry, config)
+        if entry.get('command'):
+            stages.append(Stage(name, entry['command'], entry.get('after', ()), patterns))
+            continue
+        if name not in scripts:
+            log(f"No {name} script found in package.json. Skipping.")
+            continue
+        after = entry.get('after', DEFAULT_AFTER.get(name, ()))
+        stages.append(Stage(name, ['npm', 'run', name], after, patterns))
+
+    # Only wait for stages that will actually run
+    names_present = {stage.name for stage in stages}
+    for stage in stages:
+        stage.after = tuple(dep for dep in stage.after if dep in names_present)
+    return stages
+
+
+def run_stage(stage, project_path, quiet_mode, cancelled):
+    """Run one stage, stopping it early on failure output or cancellation.
+
+    Returns (status, output tail); the tail is empty unless the stage failed
+    (including a timeout).
+    """
+    result = run_command(stage.command, project_path, quiet_mode, label=stage.name,
+                         failure_patterns=stage.failure_patterns, cancel_event=cancelled)
+    if result.status == 'matched':
+        log(f"❌ {stage.name} {result.describe()}")
+        write_log(f"Verification stage {stage.name} {result.describe()}")
+        return 'failed', result.tail()
+    return result.status, result.tail() if result.status not in NOT_FAILED else ''
+
+
+def run_pipeline(stages, project_path, quiet_mode, max_workers=None):
+    """Run stages respecting their order constraints; stop everything at the first failure."""
+    cancelled = threading.Event()
+    results = {}
+    tails = {}
+    durations = {}
+    pending = list(stages)
+    running = {}
+    started_at = time.perf_counter()
+    package = get_current_package()
+
+    def timed(stage):
+        started = time.perf_counter()
+        try:
+            with package_scope(package):
+                status, tail = run_stage(stage, project_path, quiet_mode, cancelled)
+        except Exception as e:
+            write_log(f"ERROR: Verification stage {stage.name} could not run: {e}")
+            status, tail = 'failed', str(e)
+        return status, tail, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(stages))) as executor:
+        while pending or running:
+            if not cancelled.is_set():
+                for stage in [s for s in pending if all(results.get(dep) == 'passed' for dep in s.after)]:
+                    log(f"\nRunning {stage.name}...")
+                    pending.remove(stage)
+                    running[executor.submit(contextvars.copy_context().run, timed, stage)] = stage
+            if not running:
+                if pending and not cancelled.is_set():
+                    write_log(f"ERROR: Verification stages can never start: {', '.join(stage.name for stage in pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                status, tail, duration = future.result()
+                results[stage.name] = status
+                tails[stage.name] = tail
+                durations[stage.name] = duration
+                write_log(f"Verification stage {stage.name}: {status} in {duration:.1f}s")
+                emit('stage', name=stage.name, status=status, duration=round(duration, 6))
+                if status != 'passed':
+                    cancelled.set()
+
+    stage_results = [{'name': stage.name, 'status': results.get(stage.name, 'skipped'),
+                      'duration': durations.get(stage.name, 0.0)} for stage in stages]
+    failed = next((result['name'] for result in stage_results if result['status'] not in NOT_FAILED), None)
+    return {
+        'passed': failed is None and all(result['status'] == 'passed' for result in stage_results),
+        'failed_stage': failed,
+        'output_tail': tails.get(failed, '') if failed else '',
+        'stages': stage_results,
+        'duration': time.perf_counter() - started_at,
+        'cached': False
+    }
+
+
+def pipeline_key(project_path, stages):
+    """Cache key for running these stages against the current project state."""
+    state = verification_key(project_path)
+    if not state:
+        return None
+    signature = json.dumps([stage.signature() for stage in stages], sort_keys=True)
+    return hashlib.sha256(f"{state}:{signature}".encode()).hexdigest()
+
+
+def verify_project(project_path, quiet_mode):
+    """Verify the project's current state, reusing any result recorded for the same state."""
+    with span('verify', project=project_path) as verify_event:
+        result = _verify_project(project_path, quiet_mode)
+        verify_event.update(status='ok' if result['passed'] else 'failed', cached=result['cached'],
+                            failed_stage=result['failed_stage'])
+    return result
+
+
+def _verify_project(project_path, quiet_mode):
+    stages = load_stages(project_path)
+    if stages is None:
+        return {'passed': False, 'failed_stage': None, 'output_tail': '', 'stages': [], 'duration': 0.0,
+                'cached': False}
+
+    key = pipeline_key(project_path, stages)
+    with _results_lock:
+        memoized = _results.get(key) if key else None
+    persisted = None if memoized else get_verification_cache().get(key)
+    cached = memoized or (persisted if persisted and persisted['passed'] else None)
+    if cached:
+        log(f"\nReusing verification result for this exact project state "
+            f"({'passed' if cached['passed'] else 'failed'}, took {cached['duration']:.1f}s)")
+        return dict(cached, cached=True)
+
+    result = run_pipeline(stages, project_path, quiet_mode)
+    write_log(f"Verification {'passed' if result['passed'] else 'failed'} in {result['duration']:.1f}s: "
+              + ", ".join(f"{stage['name']} {stage['status']} {stage['duration']:.1f}s" for stage in result['stages']))
+    if key:
+        with _results_lock:
+            _results[key] = result
+    # A failure may be a timeout, a cancellation or a flaky test, so only passes outlive the run
+    if key and result['passed']:
+        get_verification_cache().put(key, result['passed'], result['duration'],
+                                     {'failed_stage': result['failed_stage'], 'output_tail': result['output_tail'],
+                                      'stages': result['stages']})
+    return result
+
+
+def describe_failure(result):
+    """Failure message for a verification result: the failed stage and the end of its output."""
+    message = f"{result['failed_stage']} failed" if result.get('failed_stage') else "verification failed"
+    return message + format_tail(result.get('output_tail'))
+
+
+def reset_verification_results():
+    """Forget in-run results (the persistent cache is kept)."""
+    with _results_lock:
+        _results.clear()
@@ -0,0 +1,140 @@
+"""
+Reusable automation workspaces (--reuse-workspaces)
+
+Normally every automation run clones into a fresh, timestamped workspace and
+deletes it afterwards. With reuse enabled each repository keeps one workspace
+(<workspace dir>/<repo>) between runs, node_modules included: the next run
+fetches, hard-resets to the base branch and skips npm install when
+package.json and the lockfile match the last install, or lets npm update
+only what changed when they do not.
+
+Workspaces are stamped with their size and last use when released; after
+each run the least recently used ones are removed until the workspace
+directory fits the disk budget (--workspace-budget, MB). A workspace in use
+is locked (<workspace>.lock, an flock shared with other processes), so
+concurrent runs wait for each other and eviction skips it.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from ..utils.command_runner import run_command
+from ..utils.command_stats import format_bytes
+from ..utils.events import span
+from ..utils.fs import directory_size, lock_file, unlock_file
+from ..utils.logger import log, write_log
+from .project_snapshot import ProjectSnapshot
+
+DEFAULT_WORKSPACE_BUDGET_MB = int(os.getenv('PACKUPDATE_WORKSPACE_BUDGET_MB', '10240'))
+# Kept inside .git so the stamp never shows up as a change in the workspace
+STAMP_FILE = os.path.join('.git', 'packupdate-workspace.json')
+
+_held = {}
+_held_lock = threading.Lock()
+
+
+def read_stamp(path):
+    try:
+        with open(os.path.join(path, STAMP_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_stamp(path, **fields):
+    stamp = read_stamp(path) or {}
+    stamp.update(fields, last_used=time.time())
+    try:
+        with open(os.path.join(path, STAMP_FILE), 'w') as f:
+            json.dump(stamp, f)
+    except OSError as e:
+        write_log(f"ERROR: Could not stamp workspace {path}: {e}")
+
+
+def workspace_lock_path(path):
+    # Next to the workspace rather than inside it, so it survives the workspace being cloned again
+    return os.path.abspath(path) + '.lock'
+
+
+def acquire_workspace(path):
+    """Mark a workspace as in use so eviction leaves it alone, waiting while another run holds it."""
+    handle = lock_file(workspace_lock_path(path))
+    with _held_lock:
+        _held[os.path.abspath(path)] = handle
+
+
+def release_workspace(path, installed=False):
+    """Record the workspace as just used and no longer in use.
+
+    installed means node_modules matches package.json and the lockfile as
+    they are now (the run finished), so the next run may skip npm install if
+    they are unchanged after the reset. The workspace's size is recorded so
+    eviction does not have to walk it.
+    """
+    if os.path.isdir(os.path.join(path, '.git')):
+        write_stamp(path, install_fingerprint=ProjectSnapshot(path).fingerprint() if installed else None,
+                    size=directory_size(path))
+    with _held_lock:
+        handle = _held.pop(os.path.abspath(path), None)
+    if handle is not None:
+        unlock_file(handle)
+
+
+def is_reusable(path):
+    """True if path holds a workspace from an earlier run."""
+    return read_stamp(path) is not None
+
+
+def refresh_workspace(path, clone_url):
+    """Bring a kept workspace back to a clean clone of clone_url, keeping node_modules."""
+    log(f"♻️  Reusing workspace: {path}")
+    with span('git', step='fetch', target=clone_url):
+        run_command(['git', 'remote', 'set-url', 'origin', clone_url], path).check()
+        run_command(['git', 'fetch', '--prune', 'origin'], path).check()
+    run_command(['git', 'reset', '--hard', '--quiet'], path).check()
+    run_command(['git', 'clean', '-fdx', '--quiet', '-e', 'node_modules'], path).check()
+
+
+def install_is_current(path):
+    """True if node_modules was installed from the package.json and lockfile now on disk."""
+    stamp = read_stamp(path) or {}
+    return (os.path.isdir(os.path.join(path, 'node_modules'))
+            and stamp.get('install_fingerprint') == ProjectSnapshot(path).fingerprint())
+
+
+def evict_workspaces(root, budget_bytes):
+    """Remove the least recently used kept workspaces under root until they fit budget_bytes.
+
+    Sizes come from the stamps written at release. Workspaces in use, by this
+    or another process, are never removed. Returns the paths removed.
+    """
+    if not os.path.isdir(root):
+        return []
+    workspaces = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        stamp = read_stamp(path)
+        if stamp is not None:
+            size = stamp.get('size')
+            if size is None:
+                # Stamped before sizes were recorded
+                size = directory_size(path)
+            workspaces.append((stamp.get('last_used', 0), path, size))
+
+    total = sum(size for _, _, size in workspaces)
+    removed = []
+    for _, path, size in sorted(workspaces):
+        if total <= budget_bytes:
+            break
+        handle = lock_file(workspace_lock_path(path), blocking=False)
+        if handle is None:
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            unlock_file(handle)
+        total -= size
+        removed.append(path)
+        log(f"🧹 Evicted workspace: {path} ({format_bytes(size)})")
+    return removed
@@ -2,18 +2,35 @@
 PackUpdate - Python Package Updater
 Main entry point for the application
 """
+import json
 import os
 import sys
-from .utils.logger import set_quiet_mode, write_log, log, get_log_file
+from .utils.logger import set_quiet_mode, write_log, log, get_log_file, get_current_repository
 from .utils.cli import parse_cli_args, handle_special_flags
-from .services.report_service import generate_comprehensive_report
-from .services.package_service import get_outdated_packages, get_dependency_tree, install_package
+from .services.report_service import generate_comprehensive_report, set_analysis_workers
+from .services.package_service import get_outdated_packages, get_dependency_tree, install_package, install_packages
 from .services.interactive_service import InteractiveService
 from .services.automation_service import (
     create_automation_config, validate_automation_config, setup_workspace,
     commit_and_push, create_pull_request, cleanup_workspace
 )
 from .services.version_service import VersionService
+from .services.project_snapshot import get_snapshot
+from .services.dependency_service import plan_update_levels
+from .services.sandbox_service import run_trials, set_trial_workers
+from .services import fleet_service
+from .services.fleet_service import load_fleet_manifest, run_fleet, set_fleet_limits
+from .services.npm_cache import finish_npm_cache, use_shared_npm_cache
+from .services.restore_service import create_restore_point
+from .services.verification_cache import get_verification_cache
+from .services.verification_service import verify_project, set_verify_stages, describe_failure, stage_failure_patterns
+from .utils.command_runner import run_command
+from .utils.command_stats import get_command_stats, get_stats_file, package_scope, set_current_package
+from .utils.events import open_event_stream, span
+from .utils.profiler import start_profiler, stop_profiler
+from .services.safe_update_service import (
+    group_test_versions, get_candidate_versions, find_highest_passing_version, get_version_trials
+)
 
 def validate_project_path(project_path):
     """Validate project path exists and is a directory"""
@@ -25,42 +42,22 @@ def validate_project_path(project_path):
 
 def resolve_update_order(outdated_packages, dependency_tree):
     """Determine the order of updates based on interdependencies among outdated packages."""
-    resolved_order = []
-    visited = set()
-
-    def visit(package):
-        if package in visited:
-            return
-        visited.add(package)
-        dependencies = dependency_tree.get('dependencies', {}).get(package, {}).get('requires', {})
-        for dep in dependencies:
-            if dep in outdated_packages:
-                visit(dep)
-        resolved_order.append(package)
-
-    for package in outdated_packages:
-        visit(package)
-    
-    return resolved_order
+    return [package for level in plan_update_levels(outdated_packages, dependency_tree) for package in level]
 
 def execute_script_if_exist(project_path, script_name, quiet_mode):
     """Check if the project has a script in package.json."""
-    import json
-    import subprocess
-    
     package_json_path = os.path.join(project_path, "package.json")
     if not os.path.isfile(package_json_path):
         return False
         
     try:
-        with open(package_json_path, "r") as f:
-            package_data = json.load(f)
+        package_data = get_snapshot(project_path).package_json()
         script_exists = script_name in package_data.get("scripts", {})
         returnCode = 0
         if script_exists:
-            script_execute = subprocess.run(["npm", "run", script_name], cwd=project_path, 
-                                          capture_output=quiet_mode, text=True)
-            returnCode = script_execute.returncode
+            script_execute = run_command(["npm", "run", script_name], project_path, quiet_mode,
+                                         failure_patterns=stage_failure_patterns(script_name, config=package_data.get('packUpdate')))
+            returnCode = 0 if script_execute.ok else (script_execute.returncode or 1)
         else:
             returnCode = 0
             log(f"No {script_name} script found in package.json. Skipping.")
@@ -72,24 +69,21 @@ def execute_script_if_exist(project_path, script_name, quiet_mode):
         return False
 
 def run_tests(project_path, quiet_mode):
-    """Run build and test scripts"""
-    log("\nRunning build...")
-    resultBuild = execute_script_if_exist(project_path, "build", quiet_mode)
-    log("\nRunning tests...")
-    resultTest = execute_script_if_exist(project_path, "test", quiet_mode)
-    if resultBuild == False or resultTest == False:
-        error_msg = "Tests failed."
+    """Verify the project through the verification pipeline (build and test by default)"""
+    result = verify_project(project_path, quiet_mode)
+    if not result['passed']:
+        error_msg = f"Tests failed: {describe_failure(result)}"
         write_log(f"ERROR: {error_msg}")
         raise Exception(error_msg)
 
-def update_packages_in_order(outdated_packages, dependency_tree, project_path, safe_mode, quiet_mode):   
+def update_packages_in_order(outdated_packages, dependency_tree, project_path, safe_mode, quiet_mode, batch_install=False, safe_strategy='sequential'):   
     """Update packages in the resolved order."""
     from .services.report_service import get_safe_packages_for_update
     
     original_order = resolve_update_order(outdated_packages, dependency_tree)
     
-    # Get safe packages and prioritize them
-    safe_packages = get_safe_packages_for_update(project_path)
+    # Get safe packages and prioritize them (reuses this pass's outdated set)
+    safe_packages = get_safe_packages_for_update(project_path, outdated_packages)
     safe_in_order = [pkg for pkg in original_order if pkg in safe_packages]
     risky_in_order = [pkg for pkg in original_order if pkg not in safe_packages]
     
@@ -100,10 +94,18 @@ def update_packages_in_order(outdated_packages, dependency_tree, project_path, s
     update_order = safe_in_order + risky_in_order
     log("\nFinal Update Order: " + ", ".join(update_order))
     
+    if batch_install and not safe_mode:
+        return update_packages_in_batches(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode)
+    if safe_mode and safe_strategy == 'bisect':
+        return update_packages_with_group_testing(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode)
+    if safe_mode and safe_strategy == 'parallel':
+        return update_packages_with_sandbox_trials(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode)
+    
     failed_updates = []
     updated_packages = []
 
     for package in update_order:
+        set_current_package(package)
         details = outdated_packages[package]
         current_version = details.get("current")
         wanted_version = details.get("wanted")
@@ -115,15 +117,27 @@ def update_packages_in_order(outdated_packages, dependency_tree, project_path, s
         log(f"\n{'✅' if is_safe else '⚠️'} Updating {package} ({'safe' if is_safe else 'risky'})...")
         
         update_successful = False
+        restore_point = None
         
-        if safe_mode:
+        if safe_mode and safe_strategy == 'search':
+            final_version, update_successful, reverted = update_package_with_version_search(package, details, project_path, quiet_mode)
+            if not reverted:
+                failed_updates.append(package)
+                write_log(f"FAILED: {package} update failed completely")
+                updated_packages.append((package, current_version, final_version))
+                continue
+            if update_successful:
+                write_log(f"SUCCESS: Updated {package} from {current_version} to {final_version} ({'safe' if is_safe else 'risky'})")
+        elif safe_mode:
             # Try latest → wanted → revert (with tests after each)
+            restore_point = create_restore_point(project_path)
             
             # Try latest version first
             try:
                 log(f"  Trying latest version {latest_version}...")
-                install_package(package, latest_version, project_path, safe_mode, quiet_mode)
-                run_tests(project_path, quiet_mode)
+                with span('trial', package=package, version=latest_version, target='latest'):
+                    install_package(package, latest_version, project_path, safe_mode, quiet_mode, restore_point=restore_point)
+                    run_tests(project_path, quiet_mode)
                 final_version = latest_version
                 update_successful = True
                 log(f"  ✅ Latest version {latest_version} works!")
@@ -134,8 +148,9 @@ def update_packages_in_order(outdated_packages, dependency_tree, project_path, s
                 if wanted_version and wanted_version != latest_version and wanted_version != original_version:
                     try:
                         log(f"  Trying wanted version {wanted_version}...")
-                        install_package(package, wanted_version, project_path, safe_mode, quiet_mode)
-                        run_tests(project_path, quiet_mode)
+                        with span('trial', package=package, version=wanted_version, target='wanted'):
+                            install_package(package, wanted_version, project_path, safe_mode, quiet_mode, restore_point=restore_point)
+                            run_tests(project_path, quiet_mode)
                         final_version = wanted_version
                         update_successful = True
                         log(f"  ✅ Wanted version {wanted_version} works!")
@@ -145,16 +160,15 @@ def update_packages_in_order(outdated_packages, dependency_tree, project_path, s
                 # Revert to original version if both failed
                 if not update_successful:
                     try:
-                        log(f"  Reverting to original version {original_version}...")
-                        install_package(package, original_version, project_path, safe_mode, quiet_mode)
-                        run_tests(project_path, quiet_mode)
+                        revert_package(package, original_version, restore_point, project_path, safe_mode, quiet_mode)
                         final_version = original_version
-                        log(f"  ✅ Reverted to original version {original_version}")
                     except Exception as error:
                         log(f"  ❌ Even revert failed: {error}")
                         failed_updates.append(package)
                         write_log(f"FAILED: {package} update failed completely")
                         updated_packages.append((package, current_version, final_version))
+                        if restore_point:
+                            restore_point.discard()
                         continue
             
             # Log success
@@ -176,30 +190,291 @@ def update_packages_in_order(outdated_packages, dependency_tree, project_path, s
             else:
                 log(f"Skipping {package}, already at latest version or missing version info.")
         
+        if restore_point:
+            restore_point.discard()
         updated_packages.append((package, current_version, final_version))
+    set_current_package(None)
     return updated_packages, failed_updates
 
-def run_update_process(project_path, safe_mode, passes, minor_only, quiet_mode, update_version=None):
-    """Execute update process with multiple passes"""
-    import subprocess
+def revert_package(package, original_version, restore_point, project_path, safe_mode, quiet_mode):
+    """Return a package to its original version, raising if that fails."""
+    if restore_point:
+        # The captured state already passed verification, so it is not re-run
+        log(f"  Restoring original version {original_version}...")
+        restore_point.restore()
+    else:
+        log(f"  Reverting to original version {original_version}...")
+        with span('revert', package=package, version=original_version, method='reinstall'):
+            install_package(package, original_version, project_path, safe_mode, quiet_mode)
+            run_tests(project_path, quiet_mode)
+    log(f"  ✅ Reverted to original version {original_version}")
+
+def update_package_with_version_search(package, details, project_path, quiet_mode):
+    """Safe mode: install the highest published version between current and latest that passes.
+
+    Returns (final_version, update_successful, reverted_ok).
+    """
+    current_version = details.get("current")
+    latest_version = details.get("latest")
+    if not current_version or not latest_version or current_version == latest_version:
+        log(f"Skipping {package}, already at latest version or missing version info.")
+        return current_version, False, True
+    
+    versions = get_candidate_versions(package, current_version, latest_version, project_path)
+    log(f"  Searching {len(versions)} version(s) of {package} between {current_version} and {latest_version}...")
+    try:
+        base_fingerprint = get_snapshot(project_path).fingerprint()
+    except Exception:
+        base_fingerprint = None
+    tested = get_version_trials(project_path, base_fingerprint, package)
+    state = {'installed': current_version}
+    restore_point = create_restore_point(project_path)
+    
+    def try_version(version):
+        try:
+            log(f"  Trying {package}@{version}...")
+            with span('trial', package=package, version=version, target='search'):
+                state['installed'] = None
+                install_package(package, version, project_path, True, quiet_mode, restore_point=restore_point)
+                state['installed'] = version
+                run_tests(project_path, quiet_mode)
+            log(f"  ✅ {package}@{version} works!")
+            return True
+        except Exception as error:
+            log(f"  ❌ {package}@{version} failed: {error}")
+            return False
+    
+    best = find_highest_passing_version(versions, try_version, tested)
+    target = best or current_version
+    if state['installed'] == target:
+        if restore_point:
+            restore_point.discard()
+        return target, best is not None, True
+    
+    # The last trial is not the winner: reinstall it (or go back to the original version)
+    try:
+        if best:
+            log(f"  Installing {package}@{best}...")
+            install_package(package, best, project_path, False, quiet_mode)
+        else:
+            revert_package(package, current_version, restore_point, project_path, True, quiet_mode)
+        return target, best is not None, True
+    except Exception as error:
+        log(f"  ❌ Even revert failed: {error}")
+        return state['installed'] or current_version, False, False
+    finally:
+        if restore_point:
+            restore_point.discard()
+
+def update_packages_in_batches(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode):
+    """Install each planner level of independent packages with a single npm install."""
+    failed_updates = []
+    updated_packages = []
+    
+    levels = plan_update_levels(outdated_packages, dependency_tree)
+    for level_number, level in enumerate(levels, 1):
+        level = [pkg for pkg in level if pkg in safe_packages] + [pkg for pkg in level if pkg not in safe_packages]
+        batch = []
+        for package in level:
+            details = outdated_packages[package]
+            current_version = details.get("current")
+            latest_version = details.get("latest")
+            if current_version and latest_version and current_version != latest_version:
+                batch.append((package, latest_version))
+            else:
+                log(f"Skipping {package}, already at latest version or missing version info.")
+        
+        log(f"\n📦 Level {level_number}/{len(levels)}: {len(batch)} package(s)")
+        installed, failures = install_packages(batch, project_path, quiet_mode)
+        
+        for package in level:
+            details = outdated_packages[package]
+            current_version = details.get("current")
+            is_safe = package in safe_packages
+            if package in installed:
+                final_version = details.get("latest")
+                write_log(f"SUCCESS: Updated {package} from {current_version} to {final_version} ({'safe' if is_safe else 'risky'})")
+            else:
+                final_version = current_version
+                if package in failures:
+                    write_log(f"ERROR: Failed to update {package}: {failures[package]}")
+                    failed_updates.append(package)
+                    write_log(f"FAILED: {package} update failed")
+            updated_packages.append((package, current_version, final_version))
+    
+    return updated_packages, failed_updates
+
+def update_packages_with_group_testing(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode):
+    """Safe mode by group testing: verify each level's batch once and bisect only on failure."""
+    failed_updates = []
+    updated_packages = []
+    
+    def install(pairs):
+        return install_packages(pairs, project_path, quiet_mode)
+    
+    def capture():
+        return create_restore_point(project_path)
     
+    def verify():
+        try:
+            run_tests(project_path, quiet_mode)
+            return True
+        except Exception as error:
+            log(f"  ❌ Verification failed: {error}")
+            return False
+    
+    levels = plan_update_levels(outdated_packages, dependency_tree)
+    for level_number, level in enumerate(levels, 1):
+        level = [pkg for pkg in level if pkg in safe_packages] + [pkg for pkg in level if pkg not in safe_packages]
+        original_versions = {pkg: outdated_packages[pkg].get("current") for pkg in level}
+        final_versions = dict(original_versions)
+        
+        candidates = []
+        for package in level:
+            details = outdated_packages[package]
+            if details.get("current") and details.get("latest") and details.get("current") != details.get("latest"):
+                candidates.append((package, details.get("latest")))
+            else:
+                log(f"Skipping {package}, already at latest version or missing version info.")
+        
+        log(f"\n📦 Level {level_number}/{len(levels)}: group testing {len(candidates)} package(s) at latest")
+        passed, failed = group_test_versions(candidates, original_versions, install, verify, capture)
+        
+        # Packages that broke at latest get one more group-tested round at wanted
+        retry = []
+        for package, _ in failed:
+            details = outdated_packages[package]
+            wanted_version = details.get("wanted")
+            if wanted_version and wanted_version not in (details.get("latest"), details.get("current")):
+                retry.append((package, wanted_version))
+        if retry:
+            log(f"  Retrying {len(retry)} package(s) at wanted version...")
+            passed_wanted, _ = group_test_versions(retry, original_versions, install, verify, capture)
+            passed.extend(passed_wanted)
+        
+        for package, version in passed:
+            final_versions[package] = version
+        
+        for package in level:
+            current_version = original_versions[package]
+            final_version = final_versions[package]
+            is_safe = package in safe_packages
+            if final_version != current_version:
+                log(f"  ✅ {package} {current_version} → {final_version}")
+                write_log(f"SUCCESS: Updated {package} from {current_version} to {final_version} ({'safe' if is_safe else 'risky'})")
+            elif any(package == candidate for candidate, _ in failed):
+                log(f"  ↩️  {package} kept at original version {current_version}")
+                failed_updates.append(package)
+                write_log(f"FAILED: {package} update failed")
+            updated_packages.append((package, current_version, final_version))
+    
+    return updated_packages, failed_updates
+
+def update_packages_with_sandbox_trials(outdated_packages, dependency_tree, project_path, safe_packages, quiet_mode):
+    """Safe mode with parallel trials: test each candidate in its own project copy, then apply the winners."""
+    failed_updates = []
+    updated_packages = []
+    
+    def trial(sandbox_path, candidate):
+        package, version = candidate
+        try:
+            with package_scope(package), span('trial', package=package, version=version, target='sandbox'):
+                install_package(package, version, sandbox_path, False, True)
+                run_tests(sandbox_path, True)
+            log(f"  ✅ {package}@{version} passed in sandbox")
+            return True
+        except Exception as error:
+            log(f"  ❌ {package}@{version} failed in sandbox: {error}")
+            return False
+    
+    def install(pairs):
+        return install_packages(pairs, project_path, quiet_mode)
+    
+    def capture():
+        return create_restore_point(project_path)
+    
+    def verify():
+        try:
+            run_tests(project_path, quiet_mode)
+            return True
+        except Exception as error:
+            log(f"  ❌ Verification failed: {error}")
+            return False
+    
+    levels = plan_update_levels(outdated_packages, dependency_tree)
+    for level_number, level in enumerate(levels, 1):
+        level = [pkg for pkg in level if pkg in safe_packages] + [pkg for pkg in level if pkg not in safe_packages]
+        original_versions = {pkg: outdated_packages[pkg].get("current") for pkg in level}
+        final_versions = dict(original_versions)
+        
+        candidates = []
+        for package in level:
+            details = outdated_packages[package]
+            if details.get("current") and details.get("latest") and details.get("current") != details.get("latest"):
+                candidates.append((package, details.get("latest")))
+            else:
+                log(f"Skipping {package}, already at latest version or missing version info.")
+        
+        log(f"\n📦 Level {level_number}/{len(levels)}: trying {len(candidates)} package(s) at latest in sandboxes")
+        winners, failed = run_trials(project_path, candidates, trial)
+        
+        retry = []
+        for package, _ in failed:
+            details = outdated_packages[package]
+            wanted_version = details.get("wanted")
+            if wanted_version and wanted_version not in (details.get("latest"), details.get("current")):
+                retry.append((package, wanted_version))
+        if retry:
+            log(f"  Retrying {len(retry)} package(s) at wanted version in sandboxes...")
+            passed_wanted, _ = run_trials(project_path, retry, trial)
+            winners.extend(passed_wanted)
+        
+        # Winners passed on their own; apply them together and bisect only if they conflict
+        if winners:
+            log(f"  Applying {len(winners)} sandbox winner(s) to the project...")
+            order = {package: index for index, package in enumerate(level)}
+            winners.sort(key=lambda candidate: order[candidate[0]])
+            applied, _ = group_test_versions(winners, original_versions, install, verify, capture)
+            for package, version in applied:
+                final_versions[package] = version
+        
+        for package in level:
+            current_version = original_versions[package]
+            final_version = final_versions[package]
+            is_safe = package in safe_packages
+            if final_version != current_version:
+                log(f"  ✅ {package} {current_version} → {final_version}")
+                write_log(f"SUCCESS: Updated {package} from {current_version} to {final_version} ({'safe' if is_safe else 'risky'})")
+            elif any(package == candidate for candidate, _ in candidates):
+                log(f"  ↩️  {package} kept at original version {current_version}")
+                failed_updates.append(package)
+                write_log(f"FAILED: {package} update failed")
+            updated_packages.append((package, current_version, final_version))
+    
+    return updated_packages, failed_updates
+
+def run_update_process(project_path, safe_mode, passes, minor_only, quiet_mode, update_version=None, batch_install=False, safe_strategy='sequential'):
+    """Execute update process with multiple passes"""
     all_updated_packages = []
     all_failed_updates = []
     
     for i in range(passes):
         log(f"\n=== Pass {i + 1} ===")
-        outdated_packages = get_outdated_packages(project_path, minor_only)
-        if not outdated_packages:
-            log("No more outdated packages found.")
-            break
-        
-        dependency_tree = get_dependency_tree(project_path)
-        updated_packages, failed_updates = update_packages_in_order(outdated_packages, dependency_tree, project_path, safe_mode, quiet_mode)
+        with span('pass', number=i + 1) as pass_event:
+            outdated_packages = get_outdated_packages(project_path, minor_only)
+            pass_event['outdated'] = len(outdated_packages)
+            if not outdated_packages:
+                log("No more outdated packages found.")
+                break
+            
+            dependency_tree = get_dependency_tree(project_path)
+            updated_packages, failed_updates = update_packages_in_order(outdated_packages, dependency_tree, project_path, safe_mode, quiet_mode, batch_install, safe_strategy)
+            pass_event['failed'] = len(failed_updates)
         all_updated_packages.append((i + 1, updated_packages))
         all_failed_updates.extend(failed_updates)
     
     log("\nRunning final npm audit and build...")
-    subprocess.run(["npm", "audit", "fix"], cwd=project_path, capture_output=quiet_mode, text=True)
+    run_command(["npm", "audit", "fix"], project_path, quiet_mode)
     execute_script_if_exist(project_path, "build", quiet_mode)
     print_update_summary(all_updated_packages, all_failed_updates)
     
@@ -223,6 +498,24 @@ def print_update_summary(all_updated_packages, all_failed_updates):
         for package in set(all_failed_updates):
             log(f"- {package}")
 
+    print_command_breakdown()
+
+def print_command_breakdown():
+    """Print where the run spent its time on external commands and save the numbers as JSON."""
+    if get_current_repository():
+        # One repository of a fleet: the fleet summary prints and saves the stats once
+        return
+    stats = get_command_stats()
+    lines = stats.format_table()
+    if not lines:
+        return
+    log("\nCommand Breakdown:")
+    for line in lines:
+        log(line)
+    stats_file = stats.save(get_stats_file())
+    if stats_file:
+        log(f"Command stats saved to {stats_file}")
+
 def run_interactive_mode(project_path, safe_mode, quiet_mode, update_version=None):
     """Execute interactive mode for selective package updates"""
     try:
@@ -255,7 +548,8 @@ def run_interactive_mode(project_path, safe_mode, quiet_mode, update_version=Non
             log(f"\nUpdating {choice.name} from {choice.current} to {target_version}...")
             
             try:
-                success = install_package(choice.name, target_version, project_path, safe_mode, quiet_mode)
+                with package_scope(choice.name):
+                    success = install_package(choice.name, target_version, project_path, safe_mode, quiet_mode)
                 if success:
                     updated_packages.append((choice.name, choice.current, target_version))
                     log(f"✅ Successfully updated {choice.name}")
@@ -306,8 +600,19 @@ def handle_cleanup_operations(project_path, remove_unused, dedupe_packages, quie
     write_log(f"Cleanup operations completed - Log file: {get_log_file()}")
     print(f"Log file created: {get_log_file()}")
 
+def automation_outcome(all_results, status, message, pr_url=None):
+    """Summary of one repository's automation run"""
+    return {
+        'success': True,
+        'status': status,
+        'updated': [update for result in all_results for update in result.get('updated', [])],
+        'failed': [package for result in all_results for package in result.get('failed', [])],
+        'pr_url': pr_url,
+        'message': message
+    }
+
 def execute_automation_workflow(cli_args):
-    """Execute automation workflow"""
+    """Execute automation workflow; returns a summary (see automation_outcome), raises on failure"""
     config = create_automation_config(cli_args)
     
     try:
@@ -360,7 +665,9 @@ def execute_automation_workflow(cli_args):
         all_results = []
         for i in range(passes):
             log(f"\n=== Pass {i + 1} ===")
-            result = run_single_update_pass(report_path, safe_mode, minor_only, quiet_mode)
+            with span('pass', number=i + 1) as pass_event:
+                result = run_single_update_pass(report_path, safe_mode, minor_only, quiet_mode)
+                pass_event.update(updated=len(result['updated']), failed=len(result['failed']))
             all_results.append(result)
 
             if not result.get('updated'):
@@ -370,6 +677,8 @@ def execute_automation_workflow(cli_args):
         # Update project version if requested and updates were successful
         if update_version and any(result.get('updated') for result in all_results):
             VersionService.update_project_version(report_path, update_version, quiet_mode)
+        # node_modules matches package.json and the lockfile; a reused workspace can skip the next install
+        config['dependencies_current'] = True
         
         # Print summary
         print_automation_summary(all_results, passes)
@@ -380,7 +689,7 @@ def execute_automation_workflow(cli_args):
             if all(not result.get('updated') for result in all_results):
                 log("✅ No packages needed updating - repository is already up to date!")
                 log("🎉 Automation workflow completed successfully (no changes needed)!")
-                return
+                return automation_outcome(all_results, 'up-to-date', "No packages needed updating")
             else:
                 raise Exception(commit_result['message'])
         
@@ -392,6 +701,8 @@ def execute_automation_workflow(cli_args):
             log(f"⚠️  {pr_result['message']}")
         
         log("\n🎉 Automation workflow completed successfully!")
+        return automation_outcome(all_results, 'pr-created' if pr_result.get('pr_url') else 'pushed',
+                                  pr_result['message'], pr_result.get('pr_url'))
         
     except Exception as error:
         log(f"❌ Automation workflow failed: {error}")
@@ -399,6 +710,76 @@ def execute_automation_workflow(cli_args):
     finally:
         # Always cleanup workspace
         cleanup_workspace(config)
+        # Include the commit, push and PR commands that ran after the summary
+        if not get_current_repository():
+            get_command_stats().save(get_stats_file())
+
+def execute_fleet_workflow(cli_args):
+    """Run the automation workflow for every repository in the fleet manifest"""
+    entries = load_fleet_manifest(cli_args['fleet'])
+    set_fleet_limits(cli_args['fleet_workers'], cli_args['fleet_host_limit'])
+    log(f"\n🚢 Starting fleet automation for {len(entries)} repositories "
+        f"(max {fleet_service.FLEET_WORKERS} at once, {fleet_service.FLEET_HOST_LIMIT} per host)")
+    write_log(f"Fleet automation started for {len(entries)} repositories from {cli_args['fleet']}")
+    
+    # Interleaved output from concurrent repositories is unreadable; details go to the log file
+    quiet_mode = cli_args['quiet_mode']
+    set_quiet_mode(True)
+    completed = []
+    
+    def run_repository(args):
+        with span('repository', repository=args['repository']) as repository_event:
+            summary = execute_automation_workflow(args)
+            repository_event.update(status=summary['status'], updated=len(summary['updated']))
+            return summary
+    
+    def on_done(result):
+        completed.append(result)
+        if not quiet_mode:
+            mark = '✅' if result['success'] else '❌'
+            print(f"{mark} [{len(completed)}/{len(entries)}] {result['repository']}: {result['status']} "
+                  f"({len(result['updated'])} updated, {result['duration']:.0f}s)")
+    
+    try:
+        results = run_fleet(cli_args, entries, run_repository, on_done=on_done)
+    finally:
+        set_quiet_mode(quiet_mode)
+    
+    print_fleet_summary(results)
+    return results
+
+def print_fleet_summary(results):
+    """Print one line per repository and save the fleet results as JSON next to the log file"""
+    log("\n" + "=" * 60)
+    log("Fleet Summary:")
+    log("{:<40} {:<12} {:>8} {:>7} {:>8}".format("Repository", "Status", "Updated", "Failed", "Time (s)"))
+    log("-" * 79)
+    for result in results:
+        log("{:<40} {:<12} {:>8} {:>7} {:>8.0f}".format(result['repository'][:40], result['status'],
+                                                      len(result['updated']), len(result['failed']), result['duration']))
+    log("-" * 79)
+    
+    errors = [result for result in results if not result['success']]
+    pull_requests = [result for result in results if result.get('pr_url')]
+    log(f"Repositories: {len(results)}, succeeded: {len(results) - len(errors)}, failed: {len(errors)}")
+    log(f"Packages updated: {sum(len(result['updated']) for result in results)}")
+    if pull_requests:
+        log("\nPull requests:")
+        for result in pull_requests:
+            log(f"- {result['repository']}: {result['pr_url']}")
+    if errors:
+        log("\nFailed repositories:")
+        for result in errors:
+            log(f"- {result['repository']}: {result['message']}")
+    
+    print_command_breakdown()
+    fleet_file = f"{os.path.splitext(get_log_file())[0]}-fleet.json"
+    try:
+        with open(fleet_file, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        log(f"Fleet results saved to {fleet_file}")
+    except OSError as e:
+        write_log(f"ERROR: Could not write fleet results: {e}")
 
 def run_single_update_pass(project_path, safe_mode, minor_only, quiet_mode):
     """Run a single update pass and return results"""
@@ -412,6 +793,7 @@ def run_single_update_pass(project_path, safe_mode, minor_only, quiet_mode):
     
     updated_packages = []
     failed_updates = []
+    errors = {}
     
     for package in update_order:
         details = outdated_packages[package]
@@ -420,7 +802,8 @@ def run_single_update_pass(project_path, safe_mode, minor_only, quiet_mode):
         log(f"Updating {package} from {details['current']} to {target_version}...")
         
         try:
-            success = install_package(package, target_version, project_path, safe_mode, quiet_mode)
+            with package_scope(package):
+                success = install_package(package, target_version, project_path, safe_mode, quiet_mode)
             if success:
                 updated_packages.append((package, details['current'], target_version))
                 log(f"✅ Successfully updated {package}")
@@ -429,9 +812,10 @@ def run_single_update_pass(project_path, safe_mode, minor_only, quiet_mode):
                 log(f"❌ Failed to update {package}")
         except Exception as error:
             failed_updates.append(package)
+            errors[package] = str(error)
             log(f"❌ Failed to update {package}: {error}")
     
-    return {'updated': updated_packages, 'failed': failed_updates}
+    return {'updated': updated_packages, 'failed': failed_updates, 'errors': errors}
 
 def print_automation_summary(all_results, passes):
     """Print final summary of all update passes for automation workflow"""
@@ -461,6 +845,8 @@ def print_automation_summary(all_results, passes):
     log(f"\nTotal packages updated: {total_updated}")
     log(f"Total packages failed: {total_failed}")
 
+    print_command_breakdown()
+
 def main():
     """Main application entry point"""
     # Handle special flags first (help, version, type)
@@ -480,36 +866,79 @@ def main():
     passes = cli_args['passes']
     update_version = cli_args['update_version']
     automate = cli_args['automate']
+    batch_install = cli_args['batch_install']
+    safe_strategy = cli_args['safe_strategy']
 
     # Set up logging
     set_quiet_mode(quiet_mode)
+    set_analysis_workers(cli_args['analysis_workers'])
+    set_trial_workers(cli_args['trial_workers'])
+    set_verify_stages(cli_args['verify_stages'])
+    if cli_args['events']:
+        open_event_stream(cli_args['events'])
+    if cli_args['profile']:
+        start_profiler()
+    if cli_args['clear_verification_cache']:
+        removed = get_verification_cache().clear()
+        log(f"Cleared {removed} cached verification result(s)")
     write_log(f"PackUpdate started - Project: {project_path}, Safe Mode: {safe_mode}, Interactive: {interactive}, Minor Only: {minor_only}, Generate Report: {generate_report}, Remove Unused: {remove_unused}, Dedupe: {dedupe_packages}, Passes: {passes}, Update Version: {update_version or 'none'}, Quiet: {quiet_mode}, Automate: {automate or False}")
     
-    # Handle automation workflow
-    if automate:
-        execute_automation_workflow(cli_args)
-        return
+    if cli_args['fleet']:
+        mode = 'fleet'
+    elif automate:
+        mode = 'automate'
+    elif remove_unused or dedupe_packages:
+        mode = 'cleanup'
+    elif generate_report:
+        mode = 'report'
+    elif interactive:
+        mode = 'interactive'
+    else:
+        mode = 'update'
     
-    # Validate project path for non-automation workflows
-    validate_project_path(project_path)
+    try:
+        with span('run', mode=mode, project=project_path):
+            if mode in ('fleet', 'automate'):
+                # One package cache for every workspace, so a download is reused across repositories
+                use_shared_npm_cache()
+    
+            # Handle fleet automation (many repositories)
+            if cli_args['fleet']:
+                results = execute_fleet_workflow(cli_args)
+                if any(not result['success'] for result in results):
+                    sys.exit(1)
+                return
     
-    # Handle cleanup operations
-    if remove_unused or dedupe_packages:
-        handle_cleanup_operations(project_path, remove_unused, dedupe_packages, quiet_mode)
-        return
+            # Handle automation workflow
+            if automate:
+                execute_automation_workflow(cli_args)
+                return
     
-    # Handle report generation (no updates)
-    if generate_report:
-        generate_comprehensive_report(project_path)
-        return
+            # Validate project path for non-automation workflows
+            validate_project_path(project_path)
     
-    # Handle interactive mode
-    if interactive:
-        run_interactive_mode(project_path, safe_mode, quiet_mode, update_version)
-        return
+            # Handle cleanup operations
+            if remove_unused or dedupe_packages:
+                handle_cleanup_operations(project_path, remove_unused, dedupe_packages, quiet_mode)
+                return
+    
+            # Handle report generation (no updates)
+            if generate_report:
+                generate_comprehensive_report(project_path)
+                return
     
-    # Execute update process
-    run_update_process(project_path, safe_mode, passes, minor_only, quiet_mode, update_version)
+            # Handle interactive mode
+            if interactive:
+                run_interactive_mode(project_path, safe_mode, quiet_mode, update_version)
+                return
+    
+            # Execute update process
+            run_update_process(project_path, safe_mode, passes, minor_only, quiet_mode, update_version, batch_install, safe_strategy)
+    finally:
+        if mode in ('fleet', 'automate'):
+            finish_npm_cache()
+        if cli_args['profile']:
+            stop_profiler()
     
     # Log completion
     write_log(f"PackUpdate completed - Log file: {get_log_file()}")
@@ -21,6 +21,16 @@ def parse_cli_args():
     ticket_no_arg = next((arg for arg in flags if arg.startswith("--ticket-no=")), None)
     workspace_dir_arg = next((arg for arg in flags if arg.startswith("--workspace-dir=")), None)
     reviewers_arg = next((arg for arg in flags if arg.startswith("--reviewers=")), None)
+    safe_strategy_arg = next((arg for arg in flags if arg.startswith("--safe-strategy=")), None)
+    analysis_workers_arg = next((arg for arg in flags if arg.startswith("--analysis-workers=")), None)
+    trial_workers_arg = next((arg for arg in flags if arg.startswith("--trial-workers=")), None)
+    verify_stages_arg = next((arg for arg in flags if arg.startswith("--verify-stages=")), None)
+    events_arg = next((arg for arg in flags if arg.startswith("--events=")), None)
+    clone_mode_arg = next((arg for arg in flags if arg.startswith("--clone-mode=")), None)
+    workspace_budget_arg = next((arg for arg in flags if arg.startswith("--workspace-budget=")), None)
+    fleet_arg = next((arg for arg in flags if arg.startswith("--fleet=")), None)
+    fleet_workers_arg = next((arg for arg in flags if arg.startswith("--fleet-workers=")), None)
+    fleet_host_limit_arg = next((arg for arg in flags if arg.startswith("--fleet-host-limit=")), None)
     
     return {
         'project_path': non_flags[0] if non_flags else os.getcwd(),
@@ -31,8 +41,16 @@ def parse_cli_args():
         'remove_unused': "--remove-unused" in flags,
         'dedupe_packages': "--dedupe-packages" in flags,
         'quiet_mode': "--quiet" in flags,
+        'batch_install': "--batch-install" in flags,
+        'clear_verification_cache': "--clear-verification-cache" in flags,
+        'profile': "--profile" in flags,
+        'verify_stages': [stage for stage in verify_stages_arg.split("=", 1)[1].split(",") if stage] if verify_stages_arg else None,
+        'safe_strategy': safe_strategy_arg.split("=")[1] if safe_strategy_arg else 'sequential',
         'passes': int(pass_arg.split("=")[1]) if pass_arg else 1,
         'update_version': update_version_arg.split("=")[1] if update_version_arg else None,
+        'analysis_workers': int(analysis_workers_arg.split("=")[1]) if analysis_workers_arg else int(os.getenv('PACKUPDATE_ANALYSIS_WORKERS', '8')),
+        'events': events_arg.split("=", 1)[1] if events_arg else os.getenv('PACKUPDATE_EVENTS'),
+        'trial_workers': int(trial_workers_arg.split("=")[1]) if trial_workers_arg else int(os.getenv('PACKUPDATE_TRIAL_WORKERS', str(min(8, os.cpu_count() or 1)))),
         # Automation flags
         'automate': "--automate" in flags,
         'platform': platform_arg.split("=")[1] if platform_arg else None,
@@ -43,7 +61,13 @@ def parse_cli_args():
         'feature_branch': feature_branch_arg.split("=")[1] if feature_branch_arg else None,
         'ticket_no': ticket_no_arg.split("=")[1] if ticket_no_arg else None,
         'workspace_dir': workspace_dir_arg.split("=")[1] if workspace_dir_arg else os.getenv('PACKUPDATE_WORKSPACE_DIR', './temp-updates'),
-        'reviewers': reviewers_arg.split("=")[1] if reviewers_arg else os.getenv('PACKUPDATE_REVIEWERS')
+        'reviewers': reviewers_arg.split("=")[1] if reviewers_arg else os.getenv('PACKUPDATE_REVIEWERS'),
+        'clone_mode': clone_mode_arg.split("=")[1] if clone_mode_arg else os.getenv('PACKUPDATE_CLONE_MODE', 'mirror'),
+        'reuse_workspaces': "--reuse-workspaces" in flags or os.getenv('PACKUPDATE_REUSE_WORKSPACES') == '1',
+        'workspace_budget': int(workspace_budget_arg.split("=")[1]) if workspace_budget_arg else None,
+        'fleet': fleet_arg.split("=", 1)[1] if fleet_arg else None,
+        'fleet_workers': int(fleet_workers_arg.split("=")[1]) if fleet_workers_arg else None,
+        'fleet_host_limit': int(fleet_host_limit_arg.split("=")[1]) if fleet_host_limit_arg else None
     }
 
 def handle_special_flags():
@@ -82,11 +106,25 @@ Options:
   --quiet                  Enable quiet mode (minimal console output)
   --interactive            Interactive mode for selective package updates
   --minor-only             Update only minor versions (1.2.x → 1.3.x, skip major updates)
+  --safe-strategy=<name>   Safe-mode strategy: sequential (default), bisect (verify each batch once, split on failure)
+                           search (binary-search the highest passing version up to latest)
+                           or parallel (try candidates concurrently in sandbox copies of the project)
+  --batch-install          Install each level of independent packages with one npm install (without --safe)
   --generate-report        Generate comprehensive security & dependency report (no updates)
   --remove-unused          Clean up unused dependencies
   --dedupe-packages        Remove duplicate dependencies
   --update-version=<type>  Update project version after successful updates (major|minor|patch|x.y.z)
   --pass=<number>          Number of update passes (default: 1)
+  --analysis-workers=<n>   Packages analyzed concurrently for breaking changes (default: 8)
+  --verify-stages=<list>   Scripts run to verify an update, e.g. lint,typecheck,build,test
+                           (default: package.json "packUpdate.verify", else build,test)
+  --clear-verification-cache
+                           Forget cached build/test results before running
+  --trial-workers=<n>      Sandbox trials run concurrently with --safe-strategy=parallel (default: CPU count, max 8)
+  --events=<path|fd>       Write newline-delimited JSON progress events to a file, an inherited descriptor
+                           (fd:3) or stdout (-)
+  --profile                Time each phase and write a cProfile .prof and a collapsed-stack file
+                           (for flamegraph tools) next to the log file
 
 Automation Options:
   --automate               Enable Git automation workflow
@@ -99,6 +137,15 @@ Automation Options:
   --ticket-no=<ticket>     Ticket number for commit messages and PR linking
   --workspace-dir=<path>   Temporary workspace directory (default: ./temp-updates)
   --reviewers=<list>       Comma-separated list of reviewers for PR
+  --clone-mode=<mode>      How the workspace is cloned: mirror (default, local clone from a cached bare mirror
+                           refreshed with git fetch), blobless, shallow (base branch only) or full
+  --reuse-workspaces       Keep each repository's workspace (including node_modules) between runs; the next run
+                           fetches, resets to the base branch and installs only what changed
+  --workspace-budget=<MB>  Disk budget for kept workspaces; least recently used ones are removed (default: 10240)
+  --fleet=<manifest>       Run the automation workflow for every repository in a manifest (JSON list or
+                           one repository per line); the options above apply to every repository
+  --fleet-workers=<n>      Repositories processed concurrently in fleet mode (default: 4)
+  --fleet-host-limit=<n>   Repositories processed concurrently against the same git host (default: 2)
 
   --version                Show package version
   --type                   Show package type (python)
@@ -107,9 +154,34 @@ Automation Options:
 Environment Variables:
   PACKUPDATE_BITBUCKET_TOKEN     Default Bitbucket authentication token
   PACKUPDATE_BITBUCKET_ENDPOINT  Default Bitbucket server endpoint
+  PACKUPDATE_BITBUCKET_TTL       Seconds Bitbucket repository metadata is cached (default: 600)
   PACKUPDATE_BASE_BRANCH         Default base branch
   PACKUPDATE_WORKSPACE_DIR       Default workspace directory
   PACKUPDATE_REVIEWERS           Default reviewers (comma-separated)
+  PACKUPDATE_CLONE_MODE          Default workspace clone mode
+  PACKUPDATE_REUSE_WORKSPACES    Set to 1 to keep workspaces between runs
+  PACKUPDATE_WORKSPACE_BUDGET_MB Default disk budget for kept workspaces
+  PACKUPDATE_MIRROR_DIR          Bare mirror directory (default: <cache dir>/mirrors)
+  PACKUPDATE_NPM_CACHE_DIR       npm cache shared by automation workspaces (default: <cache dir>/npm)
+  PACKUPDATE_NPM_CACHE_MB        Size above which the shared npm cache is pruned (default: 4096)
+  PACKUPDATE_FLEET_WORKERS       Default fleet concurrency
+  PACKUPDATE_FLEET_HOST_LIMIT    Default fleet concurrency per git host
+  PACKUPDATE_ANALYSIS_WORKERS    Default breaking-change analysis concurrency
+  PACKUPDATE_CACHE_DIR           Registry and verification cache directory (default: ~/.cache/packupdate)
+  PACKUPDATE_REGISTRY_TTL        Seconds before cached registry metadata is revalidated (default: 300)
+  PACKUPDATE_TRIAL_WORKERS       Default sandbox trial concurrency
+  PACKUPDATE_VERIFY_CACHE_SIZE   Verification results kept on disk (default: 500)
+  PACKUPDATE_VERIFY_CACHE_AGE    Seconds a verification result stays valid (default: 30 days)
+  PACKUPDATE_TIMEOUT_INSTALL     Seconds before npm install/ci/uninstall/dedupe is killed (default: 900)
+  PACKUPDATE_TIMEOUT_QUERY       Seconds before npm outdated/ls/audit/view is killed (default: 300)
+  PACKUPDATE_TIMEOUT_SCRIPT      Seconds before a build/test script is killed (default: 1800)
+  PACKUPDATE_TIMEOUT_GIT         Seconds before a git command is killed (default: 600)
+  PACKUPDATE_OUTPUT_TAIL_KB      Command output kept in memory for failure messages (default: 64)
+  PACKUPDATE_LOG_MAX_MB          Log file size before it is rotated and compressed (default: 50)
+  PACKUPDATE_EVENTS              Default --events target
+  PACKUPDATE_SANDBOX_DIR         Where sandbox project copies are created (default: system temp; e.g. /dev/shm)
+  PACKUPDATE_SANDBOX_HARDLINKS   Set to 1 to hardlink sandbox node_modules when reflinks are unavailable
+                                 (faster, but in-place rewrites such as postinstall scripts reach the project)
 
 Examples:
   # Basic usage
@@ -0,0 +1,290 @@
+"""
+Central subprocess execution
+
+Every npm, npx and git invocation goes through run_command. Each command runs
+in its own process group with a timeout for its class (install, query,
+script, git), and the whole tree is killed when it expires. Output is read
+line by line, so a known failure (a compile error, a missing module) can stop
+the process tree as soon as it is printed instead of after the full test suite.
+
+Output is teed to the log file as it streams, and only its last
+OUTPUT_TAIL_CHARS are kept in memory, so a verbose test suite costs the same
+memory as a quiet one. Every finished command is recorded in the run's
+command stats (see command_stats).
+"""
+import os
+import queue
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from .command_stats import record_command
+from .logger import log, write_log, write_log_lines
+
+POLL_INTERVAL = 0.1
+KILL_GRACE = 5
+OUTPUT_TAIL_CHARS = int(os.getenv('PACKUPDATE_OUTPUT_TAIL_KB', '64')) * 1024
+TAIL_LINES = 20
+# Lines waiting in the reader queue; a full queue makes the readers (and the command) wait
+QUEUE_LINES = 1000
+LOG_FLUSH_LINES = 200
+LOG_FLUSH_INTERVAL = 0.5
+
+# Seconds before a command is killed, per command class (PACKUPDATE_TIMEOUT_<CLASS> overrides)
+COMMAND_TIMEOUTS = {
+    'install': 900,
+    'query': 300,
+    'script': 1800,
+    'git': 600
+}
+INSTALL_KINDS = ('npm install', 'npm ci', 'npm uninstall', 'npm dedupe', 'npm audit fix')
+
+
+class CommandError(subprocess.CalledProcessError):
+    """A command that failed, timed out or was stopped early."""
+
+    def __init__(self, result):
+        super().__init__(result.returncode if result.returncode else 1, result.command,
+                         output=result.stdout, stderr=result.output)
+        self.result = result
+
+    def __str__(self):
+        return f"Command '{' '.join(self.result.argv())}' {self.result.describe()}"
+
+
+class CommandResult:
+    """Outcome of a command: status is passed, failed, matched, timeout or cancelled.
+
+    output holds the last OUTPUT_TAIL_CHARS of combined output (stderr only when
+    stdout is captured); stdout is the full standard output when requested.
+    """
+
+    def __init__(self, command, kind, status, returncode, duration, output, stdout=None, matched=None,
+                 output_bytes=0):
+        self.command = command
+        self.kind = kind
+        self.status = status
+        self.returncode = returncode
+        self.duration = duration
+        self.output = output
+        self.stdout = stdout
+        self.matched = matched
+        self.output_bytes = output_bytes
+
+    @property
+    def ok(self):
+        return self.status == 'passed'
+
+    def argv(self):
+        return [self.command] if isinstance(self.command, str) else list(self.command)
+
+    def describe(self):
+        if self.status == 'matched':
+            return f"stopped early on failure output: {self.matched}"
+        if self.status == 'timeout':
+            return f"timed out after {self.duration:.0f}s"
+        if self.status == 'cancelled':
+            return "cancelled"
+        return f"exit code {self.returncode}"
+
+    def tail(self, max_lines=TAIL_LINES):
+        """The last lines of output, for failure messages."""
+        lines = [line.rstrip() for line in self.output.splitlines() if line.strip()]
+        return '\n'.join(lines[-max_lines:])
+
+    def check(self):
+        """Raise CommandError unless the command passed."""
+        if not self.ok:
+            raise CommandError(self)
+        return self
+
+
+class OutputTail:
+    """Ring buffer of the most recent output lines, at most max_chars in total."""
+
+    def __init__(self, max_chars=None):
+        self.max_chars = OUTPUT_TAIL_CHARS if max_chars is None else max_chars
+        self.lines = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def append(self, line):
+        if len(line) > self.max_chars:
+            line = line[-self.max_chars:]
+        self.lines.append(line)
+        self.size += len(line)
+        while self.size > self.max_chars and len(self.lines) > 1:
+            self.size -= len(self.lines.popleft())
+            self.dropped += 1
+
+    def text(self):
+        return ''.join(self.lines)
+
+
+def format_tail(tail):
+    """Indented output tail to append to a failure message."""
+    return ", last output:\n" + '\n'.join(f"    {line}" for line in tail.splitlines()) if tail else ''
+
+
+def command_kind(command):
+    """Short label for a command, e.g. 'npm install', 'npm run build', 'git push'."""
+    if isinstance(command, str):
+        return 'shell'
+    args = [arg for arg in command if not arg.startswith('-')]
+    if not args:
+        return 'command'
+    program = os.path.basename(args[0])
+    if program in ('npm', 'npx', 'git') and len(args) > 1:
+        if program == 'npm' and args[1] in ('run', 'run-script') and len(args) > 2:
+            return f"npm run {args[2]}"
+        if program == 'npm' and args[1] == 'audit' and 'fix' in args[2:]:
+            return 'npm audit fix'
+        return f"{program} {args[1]}"
+    return program
+
+
+def timeout_class(kind):
+    if kind in INSTALL_KINDS:
+        return 'install'
+    if kind.startswith('git'):
+        return 'git'
+    if kind.startswith(('npm run', 'npm test')) or kind == 'shell':
+        return 'script'
+    return 'query'
+
+
+def get_command_timeout(kind):
+    """Timeout in seconds for a command kind."""
+    command_class = timeout_class(kind)
+    override = os.getenv(f"PACKUPDATE_TIMEOUT_{command_class.upper()}")
+    return float(override) if override else COMMAND_TIMEOUTS[command_class]
+
+
+def kill_process_tree(process, sig=signal.SIGTERM):
+    """Signal a command and everything it spawned."""
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, sig)
+        elif sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+def compile_patterns(patterns):
+    return [re.compile(pattern) if isinstance(pattern, str) else pattern for pattern in patterns or ()]
+
+
+def _read_lines(stream, name, lines):
+    for line in stream:
+        lines.put((name, line))
+    lines.put((name, None))
+
+
+def run_command(command, cwd, quiet_mode=True, label=None, failure_patterns=(), cancel_event=None,
+                shell=None, kind=None, timeout=None, capture_stdout=False, env=None, log_output=True):
+    """Run a command with a timeout, streaming its output and stopping it early on a failure pattern.
+
+    Output lines are echoed (prefixed with label) unless quiet_mode is set and
+    written to the log file unless log_output is False; captured stdout is
+    neither. Returns a CommandResult; a failing command does not raise unless
+    the caller uses result.check().
+    """
+    shell = isinstance(command, str) if shell is None else shell
+    kind = kind or command_kind(command)
+    timeout = get_command_timeout(kind) if timeout is None else timeout
+    patterns = compile_patterns(failure_patterns)
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, cwd=cwd, shell=shell, text=True, errors='replace', env=env,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE if capture_stdout else subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, start_new_session=os.name == 'posix')
+    except OSError as e:
+        write_log(f"ERROR: Could not start {kind}: {e}")
+        record_command(kind, time.perf_counter() - started, 'failed', 0)
+        return CommandResult(command, kind, 'failed', 127, time.perf_counter() - started, str(e),
+                             '' if capture_stdout else None)
+
+    lines = queue.Queue(maxsize=QUEUE_LINES)
+    streams = [('stdout', process.stdout)] + ([('stderr', process.stderr)] if capture_stdout else [])
+    for name, stream in streams:
+        threading.Thread(target=_read_lines, args=(stream, name, lines), daemon=True).start()
+
+    output = OutputTail()
+    log_prefix = f"[{label or kind}] "
+    log_pending = []
+    log_flushed_at = started
+    stdout = []
+    output_bytes = 0
+    open_streams = len(streams)
+    status = None
+    matched = None
+    killed_at = None
+    deadline = started + timeout if timeout else None
+    while open_streams:
+        try:
+            name, line = lines.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            name, line = None, ''
+        if line is None:
+            open_streams -= 1
+            continue
+        if line:
+            output_bytes += len(line.encode('utf-8', 'replace'))
+            if capture_stdout and name == 'stdout':
+                stdout.append(line)
+            else:
+                output.append(line)
+                if log_output:
+                    log_pending.append(log_prefix + line.rstrip())
+                if not quiet_mode:
+                    log(f"[{label}] {line.rstrip()}" if label else line.rstrip())
+            if status is None:
+                for pattern in patterns:
+                    if pattern.search(line):
+                        matched = line.strip()
+                        status = 'matched'
+                        break
+
+        now = time.perf_counter()
+        if log_pending and (len(log_pending) >= LOG_FLUSH_LINES or now - log_flushed_at > LOG_FLUSH_INTERVAL):
+            write_log_lines(log_pending)
+            log_pending = []
+            log_flushed_at = now
+        if status is None and cancel_event is not None and cancel_event.is_set():
+            status = 'cancelled'
+        if status is None and deadline and now > deadline:
+            status = 'timeout'
+            write_log(f"ERROR: {kind} timed out after {timeout:.0f}s in {cwd}, killing its process tree")
+        if status is not None and killed_at is None:
+            kill_process_tree(process)
+            killed_at = now
+        elif killed_at is not None and now - killed_at > KILL_GRACE:
+            kill_process_tree(process, signal.SIGKILL if os.name == 'posix' else signal.SIGTERM)
+            if now - killed_at > 2 * KILL_GRACE:
+                break  # something outside the group still holds the pipe open
+
+    try:
+        process.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process, signal.SIGKILL if os.name == 'posix' else signal.SIGTERM)
+        process.wait()
+    if not open_streams:
+        for _, stream in streams:
+            stream.close()
+    if log_pending:
+        write_log_lines(log_pending)
+    if status is None:
+        status = 'passed' if process.returncode == 0 else 'failed'
+    if output.dropped:
+        write_log(f"{kind}: kept the last {output.size} chars of output in memory, "
+                  f"{output.dropped} earlier lines are only in the log")
+    duration = time.perf_counter() - started
+    record_command(kind, duration, status, output_bytes)
+    return CommandResult(command, kind, status, process.returncode, duration,
+                         output.text(), ''.join(stdout) if capture_stdout else None, matched, output_bytes)
@@ -0,0 +1,177 @@
+"""
+Per-run accounting of external commands
+
+run_command records every command it finishes here: count, wall time, exit
+status and bytes of output, grouped by command kind (npm install, npm run
+test, git push, ...) and by the package being updated at the time. The
+package is taken from package_scope, which update code sets around the work
+for one package; commands outside any scope count towards PROJECT. In a
+fleet run commands are also grouped by repository (logger.repository_scope)
+and packages are keyed as "<repository>: <package>".
+"""
+import contextvars
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+from .logger import get_current_repository, get_log_file, write_log
+
+PROJECT = '(project)'
+
+_current_package = contextvars.ContextVar('packupdate_package', default=None)
+
+
+def get_current_package():
+    """The package commands are currently attributed to, or None."""
+    return _current_package.get()
+
+
+def set_current_package(package):
+    """Attribute the following commands (in this thread) to package; None for the project."""
+    _current_package.set(package)
+
+
+@contextmanager
+def package_scope(package):
+    """Attribute the commands run inside the block (in this thread) to package."""
+    token = _current_package.set(package)
+    try:
+        yield
+    finally:
+        _current_package.reset(token)
+
+
+def _new_totals():
+    return {'count': 0, 'seconds': 0.0, 'bytes': 0, 'statuses': {}}
+
+
+def _add(totals, duration, status, output_bytes):
+    totals['count'] += 1
+    totals['seconds'] += duration
+    totals['bytes'] += output_bytes
+    totals['statuses'][status] = totals['statuses'].get(status, 0) + 1
+
+
+class CommandStats:
+    """Command totals by kind, by repository, by package and by (package, kind)."""
+
+    def __init__(self):
+        self.by_kind = {}
+        self.by_repository = {}
+        self.by_package = {}
+        self.by_package_kind = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, duration, status, output_bytes, package=None, repository=None):
+        package = package or PROJECT
+        if repository:
+            package = f"{repository}: {package}"
+        with self._lock:
+            _add(self.by_kind.setdefault(kind, _new_totals()), duration, status, output_bytes)
+            if repository:
+                _add(self.by_repository.setdefault(repository, _new_totals()), duration, status, output_bytes)
+            _add(self.by_package.setdefault(package, _new_totals()), duration, status, output_bytes)
+            _add(self.by_package_kind.setdefault(package, {}).setdefault(kind, _new_totals()),
+                 duration, status, output_bytes)
+
+    def total(self):
+        totals = _new_totals()
+        with self._lock:
+            for entry in self.by_kind.values():
+                totals['count'] += entry['count']
+                totals['seconds'] += entry['seconds']
+                totals['bytes'] += entry['bytes']
+                for status, count in entry['statuses'].items():
+                    totals['statuses'][status] = totals['statuses'].get(status, 0) + count
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            data = copy.deepcopy({
+                'by_kind': self.by_kind,
+                'by_repository': self.by_repository,
+                'by_package': self.by_package,
+                'by_package_kind': self.by_package_kind
+            })
+        data['total'] = self.total()
+        return data
+
+    def format_table(self, top_packages=10):
+        """Breakdown lines: one row per command kind, then the most expensive packages."""
+        with self._lock:
+            kinds = sorted(self.by_kind.items(), key=lambda item: item[1]['seconds'], reverse=True)
+            repositories = sorted(self.by_repository.items(), key=lambda item: item[1]['seconds'], reverse=True)
+            packages = sorted(self.by_package.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        if not kinds:
+            return []
+
+        row = "{:<30} {:>7} {:>11} {:>8} {:>10}"
+        lines = [row.format("Command", "Count", "Time (s)", "Failed", "Output"), "-" * 70]
+        for kind, entry in kinds:
+            lines.append(_format_row(row, kind, entry))
+        lines.append("-" * 70)
+        lines.append(_format_row(row, "Total", self.total()))
+
+        if repositories:
+            lines.append("")
+            lines.append(row.format("Repository", "Count", "Time (s)", "Failed", "Output"))
+            lines.append("-" * 70)
+            for repository, entry in repositories:
+                lines.append(_format_row(row, repository, entry))
+
+        lines.append("")
+        lines.append(row.format("Package", "Count", "Time (s)", "Failed", "Output"))
+        lines.append("-" * 70)
+        for package, entry in packages[:top_packages]:
+            lines.append(_format_row(row, package, entry))
+        if len(packages) > top_packages:
+            lines.append(f"... {len(packages) - top_packages} more packages in the command stats file")
+        return lines
+
+    def save(self, path):
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            write_log(f"ERROR: Could not write command stats: {e}")
+            return None
+        return path
+
+
+def _format_row(row, name, entry):
+    failed = entry['count'] - entry['statuses'].get('passed', 0)
+    return row.format(name[:30], entry['count'], f"{entry['seconds']:.1f}", failed, format_bytes(entry['bytes']))
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def get_stats_file():
+    """JSON file for the run's command stats, next to the log file."""
+    return f"{os.path.splitext(get_log_file())[0]}-commands.json"
+
+
+_stats = CommandStats()
+
+
+def get_command_stats():
+    return _stats
+
+
+def record_command(kind, duration, status, output_bytes):
+    """Record a finished command against the current package (and fleet repository)."""
+    _stats.record(kind, duration, status, output_bytes, get_current_package(), get_current_repository())
+
+
+def reset_command_stats():
+    global _stats
+    _stats = CommandStats()
@@ -0,0 +1,129 @@
+"""
+Machine-readable progress events (--events)
+
+When an event stream is open, each phase of a run is written as newline
+delimited JSON so tools can follow progress without parsing console output::
+
+    {"event": "install", "phase": "start", "t": 12.48, "package": "react", "version": "19.0.0"}
+    {"event": "install", "phase": "end", "t": 31.02, "duration": 18.54, "status": "ok", ...}
+
+t is seconds on a monotonic clock since the stream was opened. Phases are
+run, pass, trial, install, verify, revert, report and git. Single events
+(phase "point") mark results such as a package outcome. Nothing is written,
+and the cost is one check, when no stream is open.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from .profiler import get_profiler, phase_label
+
+_stream = None
+
+
+class EventStream:
+    """Writes one JSON object per line to a file object, safely across threads."""
+
+    def __init__(self, target, close_target=True):
+        self.target = target
+        self.close_target = close_target
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def emit(self, event, phase='point', **fields):
+        record = {'event': event, 'phase': phase, 't': round(time.monotonic() - self.started, 6)}
+        record.update((key, value) for key, value in fields.items() if value is not None)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                self.target.write(line + '\n')
+                self.target.flush()
+            except (OSError, ValueError):
+                pass  # a consumer that went away must not stop the run
+
+    def close(self):
+        with self._lock:
+            try:
+                if self.close_target:
+                    self.target.close()
+                else:
+                    self.target.flush()
+            except (OSError, ValueError):
+                pass
+
+
+def open_target(target):
+    """File object for --events: '-' is stdout, 'fd:N' or a number is an inherited descriptor, else a path."""
+    if target == '-':
+        return sys.stdout, False
+    descriptor = target[3:] if target.startswith('fd:') else target
+    if descriptor.isdigit():
+        return os.fdopen(int(descriptor), 'w', buffering=1), True
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return open(target, 'a', buffering=1), True
+
+
+def open_event_stream(target):
+    """Start writing events to target (see open_target); closed at exit."""
+    global _stream
+    close_event_stream()
+    file, close_target = open_target(target)
+    _stream = EventStream(file, close_target)
+    atexit.register(close_event_stream)
+    emit('stream', time=datetime.now().isoformat(), pid=os.getpid())
+    return _stream
+
+
+def close_event_stream():
+    global _stream
+    if _stream is not None:
+        _stream.close()
+        _stream = None
+
+
+def emit(event, **fields):
+    """Write a single event if a stream is open."""
+    if _stream is not None:
+        _stream.emit(event, **fields)
+
+
+@contextmanager
+def span(event, **fields):
+    """Emit start and end events around a block.
+
+    The block gets a dict it can fill with fields for the end event (e.g.
+    passed=False). The end event has the duration and status "ok", or
+    "error" with the error message if the block raised. The block is also
+    timed as a phase when the profiler is running.
+    """
+    result = {}
+    stream = _stream
+    profiler = get_profiler()
+    if stream is None and profiler is None:
+        yield result
+        return
+    label = phase_label(event, fields) if profiler else None
+    started = time.monotonic()
+    if stream:
+        stream.emit(event, 'start', **fields)
+    if profiler:
+        profiler.enter(label)
+    try:
+        yield result
+    except BaseException as error:
+        result['status'] = 'error'
+        result['error'] = str(error).splitlines()[0] if str(error) else type(error).__name__
+        raise
+    finally:
+        duration = time.monotonic() - started
+        if profiler:
+            profiler.exit(label, duration)
+        if stream:
+            status = result.pop('status', 'ok')
+            stream.emit(event, 'end', duration=round(duration, 6), status=status, **dict(fields, **result))
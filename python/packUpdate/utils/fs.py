@@ -0,0 +1,140 @@
+"""
+Filesystem helpers for cheap project copies and cross-process locks
+"""
+import os
+import shutil
+import sys
+from contextlib import contextmanager
+from .command_runner import run_command
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only hold within the process
+    fcntl = None
+
+CLONE_IGNORE = ('.git',)
+# Hardlinked sandboxes share inodes with the project, so anything that rewrites a
+# file in place (postinstall scripts, patch-package, caches under node_modules/.cache)
+# would change the real project too; only used when explicitly enabled
+SANDBOX_HARDLINKS = os.getenv('PACKUPDATE_SANDBOX_HARDLINKS') == '1'
+
+
+def _reflink_tree(source, destination):
+    """Copy-on-write clone of a directory (Btrfs/XFS via cp --reflink, APFS via cp -c)."""
+    if sys.platform.startswith('linux'):
+        command = ['cp', '-a', '--reflink=always', source, destination]
+    elif sys.platform == 'darwin':
+        command = ['cp', '-cR', source, destination]
+    else:
+        return False
+    result = run_command(command, os.path.dirname(os.path.abspath(source)) or None, kind='cp --reflink')
+    if not result.ok:
+        shutil.rmtree(destination, ignore_errors=True)
+        return False
+    return True
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Cross-device (e.g. a tmpfs sandbox root) or unsupported: fall back to a real copy
+        shutil.copy2(source, destination)
+
+
+def link_tree(source, destination):
+    """Recreate a directory tree whose files are hardlinks to the originals."""
+    shutil.copytree(source, destination, symlinks=True, copy_function=_link_or_copy)
+
+
+def copy_tree(source, destination, allow_hardlinks=None):
+    """Copy one directory tree as cheaply as is safe; returns 'reflink', 'hardlink' or 'copy'.
+
+    Reflinked and copied trees are independent of the source; a hardlinked one
+    (allow_hardlinks, default PACKUPDATE_SANDBOX_HARDLINKS=1) shares every file
+    with it.
+    """
+    allow_hardlinks = SANDBOX_HARDLINKS if allow_hardlinks is None else allow_hardlinks
+    if _reflink_tree(source, destination):
+        return 'reflink'
+    if allow_hardlinks:
+        link_tree(source, destination)
+        return 'hardlink'
+    shutil.copytree(source, destination, symlinks=True)
+    return 'copy'
+
+
+def clone_tree(source, destination, allow_hardlinks=None):
+    """Copy a project directory cheaply; returns how node_modules was cloned.
+
+    Project files are copied normally so package.json and the lockfile can be
+    edited freely. node_modules is reflinked where the filesystem supports it,
+    otherwise copied. Hardlinking instead (allow_hardlinks, default
+    PACKUPDATE_SANDBOX_HARDLINKS=1) is faster but only safe when nothing in
+    the trial rewrites installed files in place.
+    """
+    os.makedirs(destination)
+    method = 'none'
+    for entry in os.listdir(source):
+        if entry in CLONE_IGNORE:
+            continue
+        source_entry = os.path.join(source, entry)
+        destination_entry = os.path.join(destination, entry)
+        if entry == 'node_modules' and os.path.isdir(source_entry) and not os.path.islink(source_entry):
+            method = copy_tree(source_entry, destination_entry, allow_hardlinks)
+        elif os.path.isdir(source_entry) and not os.path.islink(source_entry):
+            shutil.copytree(source_entry, destination_entry, symlinks=True)
+        else:
+            shutil.copy2(source_entry, destination_entry, follow_symlinks=False)
+    return method
+
+
+def directory_size(path):
+    """Bytes used on disk by the files under path (hard links counted once)."""
+    total = 0
+    seen = set()
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.st_nlink > 1:
+                if (stat.st_dev, stat.st_ino) in seen:
+                    continue
+                seen.add((stat.st_dev, stat.st_ino))
+            total += stat.st_blocks * 512 if hasattr(stat, 'st_blocks') else stat.st_size
+    return total
+
+
+def lock_file(path, blocking=True):
+    """Take an exclusive lock on path (created if missing) that other processes respect too.
+
+    Returns the handle to pass to unlock_file, or None when blocking is False
+    and the lock is held elsewhere (by another process or another handle in
+    this one).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handle = open(path, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            handle.close()
+            return None
+    return handle
+
+
+def unlock_file(handle):
+    """Release a lock taken with lock_file."""
+    handle.close()
+
+
+@contextmanager
+def file_lock(path):
+    """Hold the lock on path for the duration of the block, waiting for other holders."""
+    handle = lock_file(path)
+    try:
+        yield
+    finally:
+        unlock_file(handle)
@@ -1,25 +1,237 @@
 """
 Logging utilities for PackUpdate Python version
+
+write_log hands lines to a background writer thread that keeps the log file
+open, flushes it periodically, rotates it by size and compresses the logs of
+earlier runs. Everything queued is flushed when the process exits, including
+after an uncaught exception, which is logged first. Lines written inside a
+repository_scope (a fleet run) are prefixed with the repository.
 """
+import atexit
+import contextvars
+import glob
+import gzip
 import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
 from datetime import datetime
 
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, f"packupdate-{datetime.now().isoformat().replace(':', '-').replace('.', '-')}.log")
 QUIET_MODE = False
 
+# Writes queued before callers have to wait for the writer thread
+LOG_QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0
+MAX_LOG_BYTES = int(float(os.getenv('PACKUPDATE_LOG_MAX_MB', '50')) * 1024 * 1024)
+# Logs of other runs are compressed once they have not been written for this long
+COMPRESS_AFTER = 3600
+
+_writer = None
+_writer_lock = threading.Lock()
+_current_repository = contextvars.ContextVar('packupdate_repository', default=None)
+
+
+def compress_file(path):
+    """Replace a file with a .gz copy; returns the new path."""
+    compressed = f"{path}.gz"
+    with open(path, 'rb') as source, gzip.open(compressed, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+    return compressed
+
+
+def compress_old_logs(log_dir, current, idle=COMPRESS_AFTER):
+    """gzip packupdate-*.log files left by earlier runs; returns how many were compressed."""
+    compressed = 0
+    now = time.time()
+    for path in glob.glob(os.path.join(log_dir, 'packupdate-*.log')):
+        if os.path.abspath(path) == os.path.abspath(current):
+            continue
+        try:
+            if now - os.path.getmtime(path) < idle:
+                continue  # possibly another run that is still writing
+            compress_file(path)
+            compressed += 1
+        except OSError:
+            pass
+    return compressed
+
+
+class LogWriter:
+    """Appends log lines to a file from a background thread."""
+
+    def __init__(self, path, max_bytes=MAX_LOG_BYTES, flush_interval=FLUSH_INTERVAL, queue_size=LOG_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.parts = 0
+        self._file = None
+        self._size = 0
+        self._dirty = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='packupdate-log', daemon=True)
+                self._thread.start()
+
+    def write(self, lines):
+        """Queue lines (each ending in a newline); blocks only while the queue is full."""
+        self.start()
+        self.queue.put(lines)
+
+    def flush(self, timeout=10):
+        """Wait until everything queued so far is written to the file."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=10):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            compress_old_logs(os.path.dirname(self.path) or '.', self.path)
+        except OSError:
+            pass
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._close_file()
+                return
+            if isinstance(item, threading.Event):
+                self._flush()
+                item.set()
+                continue
+            if item:
+                self._write(item)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a')
+        self._size = self._file.tell()
+
+    def _write(self, lines):
+        try:
+            if self._file is None:
+                self._open()
+            for line in lines:
+                self._file.write(line)
+                self._size += len(line)
+            self._dirty = True
+            if self.max_bytes and self._size > self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            print(f"PackUpdate could not write its log file {self.path}: {e}", file=sys.stderr)
+
+    def _flush(self):
+        if self._file is not None and self._dirty:
+            try:
+                self._file.flush()
+            except OSError:
+                pass
+            self._dirty = False
+
+    def _close_file(self):
+        if self._file is not None:
+            self._flush()
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """Move the full file aside as a compressed numbered part and start a new one."""
+        self._close_file()
+        self.parts += 1
+        base, extension = os.path.splitext(self.path)
+        part = f"{base}.{self.parts}{extension}"
+        os.replace(self.path, part)
+        compress_file(part)
+        self._open()
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter(LOG_FILE)
+            atexit.register(close_log)
+            _install_crash_hook()
+        return _writer
+
+
+def _install_crash_hook():
+    previous = sys.excepthook
+
+    def log_crash(exc_type, exc, tb):
+        reason = "Interrupted" if issubclass(exc_type, KeyboardInterrupt) else "CRASH: uncaught exception"
+        write_log(f"{reason}\n" + ''.join(traceback.format_exception(exc_type, exc, tb)).rstrip())
+        flush_log()
+        previous(exc_type, exc, tb)
+
+    sys.excepthook = log_crash
+
+
 def set_quiet_mode(quiet):
     """Set quiet mode for logging"""
     global QUIET_MODE
     QUIET_MODE = quiet
 
+def get_current_repository():
+    """The fleet repository being worked on in this context, or None."""
+    return _current_repository.get()
+
+@contextmanager
+def repository_scope(repository):
+    """Attribute log lines and commands inside the block (in this thread) to repository."""
+    token = _current_repository.set(repository)
+    try:
+        yield
+    finally:
+        _current_repository.reset(token)
+
+def _line_prefix():
+    repository = _current_repository.get()
+    return f"[{datetime.now().isoformat()}] [{repository}] " if repository else f"[{datetime.now().isoformat()}] "
+
 def write_log(message):
     """Write a message to the log file with timestamp."""
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR, exist_ok=True)
-    timestamp = datetime.now().isoformat()
-    with open(LOG_FILE, 'a') as f:
-        f.write(f"[{timestamp}] {message}\n")
+    _get_writer().write((f"{_line_prefix()}{message}\n",))
+
+def write_log_lines(messages):
+    """Write several lines to the log file at once (e.g. streamed command output)."""
+    prefix = _line_prefix()
+    _get_writer().write([f"{prefix}{message}\n" for message in messages])
+
+def flush_log():
+    """Block until every message written so far is in the log file."""
+    if _writer is not None:
+        _writer.flush()
+
+def close_log():
+    """Flush and close the log file (runs at exit)."""
+    if _writer is not None:
+        _writer.close()
 
 def log(message):
     """Print message only if not in quiet mode."""
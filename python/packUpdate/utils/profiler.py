@@ -0,0 +1,169 @@
+"""
+Built-in profiler (--profile)
+
+While a profiler is running, every phase span (see events.span) is timed, the
+main thread runs under cProfile, and a sampler records the Python stack of
+every thread at a fixed interval. At the end a phase table is printed and
+three files are written next to the log file:
+
+- <log>-profile.prof: cProfile data for the main thread (snakeviz, pstats)
+- <log>-profile.collapsed: sampled stacks of all threads in collapsed format
+  (flamegraph.pl, speedscope, inferno). Each stack starts with the thread
+  name and the open phases, so time spent waiting on npm or git shows up
+  under run_command, while Python overhead shows up in the caller.
+- <log>-profile-phases.json: count, total and longest duration per phase
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from .logger import get_log_file, log, write_log
+
+SAMPLE_INTERVAL = 0.01
+PHASE_DETAIL_FIELDS = ('section', 'step', 'target')
+
+_profiler = None
+
+
+def phase_label(event, fields):
+    """Phase name for a span, e.g. 'install', 'report:security', 'git:push'."""
+    detail = next((fields[name] for name in PHASE_DETAIL_FIELDS if fields.get(name)), None)
+    return f"{event}:{detail}" if detail else event
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    """Phase timings, a cProfile of the main thread and sampled stacks of all threads."""
+
+    def __init__(self, output_prefix, interval=SAMPLE_INTERVAL):
+        self.output_prefix = output_prefix
+        self.interval = interval
+        self.profile = cProfile.Profile()
+        self.phases = {}
+        self.samples = Counter()
+        self._open_phases = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self.profiling = False
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name='packupdate-profiler', daemon=True)
+        self._sampler.start()
+        try:
+            self.profile.enable()
+            self.profiling = True
+        except ValueError as e:
+            write_log(f"cProfile unavailable ({e}), collecting phase timings and samples only")
+
+    def stop(self):
+        """Stop profiling and write the output files; returns their paths."""
+        if self.profiling:
+            self.profile.disable()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        return self.write()
+
+    def enter(self, label):
+        with self._lock:
+            self._open_phases.setdefault(threading.get_ident(), []).append(label)
+
+    def exit(self, label, duration):
+        ident = threading.get_ident()
+        with self._lock:
+            stack = self._open_phases.get(ident, [])
+            if label in stack:
+                del stack[len(stack) - 1 - stack[::-1].index(label)]
+            if not stack:
+                self._open_phases.pop(ident, None)
+            entry = self.phases.setdefault(label, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += duration
+            entry['max_seconds'] = max(entry['max_seconds'], duration)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                open_phases = {ident: list(stack) for ident, stack in self._open_phases.items()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                prefix = [names.get(ident, f"thread-{ident}")] + [f"phase:{label}" for label in open_phases.get(ident, [])]
+                self.samples[';'.join(prefix + stack[::-1])] += 1
+
+    def phase_table(self):
+        row = "{:<34} {:>7} {:>11} {:>11}"
+        lines = [row.format("Phase", "Count", "Total (s)", "Max (s)"), "-" * 66]
+        for label, entry in sorted(self.phases.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            lines.append(row.format(label[:34], entry['count'], f"{entry['seconds']:.2f}", f"{entry['max_seconds']:.2f}"))
+        lines.append("-" * 66)
+        lines.append(row.format("Wall time", "", f"{time.perf_counter() - self.started:.2f}", ""))
+        return lines
+
+    def write(self):
+        paths = {
+            'prof': f"{self.output_prefix}-profile.prof",
+            'collapsed': f"{self.output_prefix}-profile.collapsed",
+            'phases': f"{self.output_prefix}-profile-phases.json"
+        }
+        try:
+            os.makedirs(os.path.dirname(self.output_prefix) or '.', exist_ok=True)
+            if self.profiling:
+                self.profile.dump_stats(paths['prof'])
+            else:
+                del paths['prof']
+            with open(paths['collapsed'], 'w') as f:
+                for stack, count in sorted(self.samples.items()):
+                    f.write(f"{stack} {count}\n")
+            with open(paths['phases'], 'w') as f:
+                json.dump({'wall_seconds': time.perf_counter() - self.started, 'sample_interval': self.interval,
+                           'phases': self.phases}, f, indent=2)
+        except OSError as e:
+            write_log(f"ERROR: Could not write profile output: {e}")
+            return {}
+        return paths
+
+
+def get_profiler():
+    return _profiler
+
+
+def start_profiler(output_prefix=None, interval=SAMPLE_INTERVAL):
+    """Start profiling the run; output goes next to the log file unless output_prefix is given."""
+    global _profiler
+    _profiler = Profiler(output_prefix or os.path.splitext(get_log_file())[0], interval)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiler():
+    """Stop profiling, print the phase table and report the files written."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return {}
+    paths = profiler.stop()
+    log("\nProfile (phase timings):")
+    for line in profiler.phase_table():
+        log(line)
+    for kind, path in paths.items():
+        log(f"Profile {kind} written to {path}")
+        write_log(f"Profile {kind} written to {path}")
+    return paths
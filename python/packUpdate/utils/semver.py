@@ -0,0 +1,231 @@
+"""
+Semantic version parsing and npm range matching
+"""
+import re
+from bisect import bisect_right
+
+VERSION_PATTERN = re.compile(
+    r'^\s*[v=]*\s*(\d+)\.(\d+)\.(\d+)'
+    r'(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?'
+    r'(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?\s*$'
+)
+PARTIAL_PATTERN = re.compile(
+    r'^[v=]*(\d+|[xX*])?(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?'
+    r'(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?'
+    r'(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?$'
+)
+COMPARATOR_PATTERN = re.compile(r'^(<=|>=|<|>|=|~>|~|\^)?\s*(.*)$')
+
+# Marks the lowest possible prerelease, so "<2.0.0-0" excludes every 2.0.0 prerelease
+MIN_PRERELEASE = ((0, 0),)
+
+
+def _prerelease_key(prerelease):
+    """Build a sortable prerelease key; releases sort after every prerelease."""
+    if not prerelease:
+        return ((2, ''),)
+    key = []
+    for identifier in prerelease.split('.'):
+        if identifier.isdigit():
+            key.append((0, int(identifier)))
+        else:
+            key.append((1, identifier))
+    return tuple(key)
+
+
+def parse_version(version):
+    """Parse a version string into a comparable tuple (None if not valid semver)."""
+    if not isinstance(version, str):
+        return None
+    match = VERSION_PATTERN.match(version)
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return (int(major), int(minor), int(patch), _prerelease_key(prerelease))
+
+
+def is_prerelease(parsed):
+    return parsed[3] != ((2, ''),)
+
+
+def compare_versions(a, b):
+    """Compare two version strings, returning -1, 0 or 1."""
+    parsed_a, parsed_b = parse_version(a), parse_version(b)
+    if parsed_a is None or parsed_b is None:
+        raise ValueError(f"Invalid version: {a if parsed_a is None else b}")
+    return (parsed_a > parsed_b) - (parsed_a < parsed_b)
+
+
+def _is_wildcard(part):
+    return part is None or part in ('x', 'X', '*')
+
+
+def _expand_comparator(comparator):
+    """Expand one npm comparator (caret, tilde, x-range, primitive) into primitives."""
+    match = COMPARATOR_PATTERN.match(comparator)
+    operator, version = match.group(1) or '', match.group(2).strip()
+    if version in ('', '*', 'x', 'X'):
+        if operator in ('<', '>'):
+            return [('<', (0, 0, 0, MIN_PRERELEASE))]
+        return [('>=', (0, 0, 0, MIN_PRERELEASE))]
+
+    partial = PARTIAL_PATTERN.match(version)
+    if not partial:
+        raise ValueError(f"Invalid comparator: {comparator}")
+    major, minor, patch, prerelease = partial.groups()
+    if _is_wildcard(major):
+        return [('>=', (0, 0, 0, MIN_PRERELEASE))]
+
+    major = int(major)
+    minor = None if _is_wildcard(minor) else int(minor)
+    patch = None if _is_wildcard(patch) else int(patch)
+    low = (major, minor or 0, patch or 0, _prerelease_key(prerelease))
+
+    if operator == '^':
+        if major > 0 or minor is None:
+            high = (major + 1, 0, 0)
+        elif minor > 0 or patch is None:
+            high = (0, minor + 1, 0)
+        else:
+            high = (0, 0, patch + 1)
+        return [('>=', low), ('<', high + (MIN_PRERELEASE,))]
+
+    if operator in ('~', '~>'):
+        high = (major + 1, 0, 0) if minor is None else (major, minor + 1, 0)
+        return [('>=', low), ('<', high + (MIN_PRERELEASE,))]
+
+    if minor is None or patch is None:
+        # x-range: 1.x, 1.2.x and their primitive forms
+        high = (major + 1, 0, 0) if minor is None else (major, minor + 1, 0)
+        floor = (major, minor or 0, 0, MIN_PRERELEASE)
+        if operator in ('', '='):
+            return [('>=', floor), ('<', high + (MIN_PRERELEASE,))]
+        if operator == '>':
+            return [('>=', high + (MIN_PRERELEASE,))]
+        if operator == '>=':
+            return [('>=', floor)]
+        if operator == '<':
+            return [('<', floor)]
+        return [('<', high + (MIN_PRERELEASE,))]
+
+    return [(operator or '=', low)]
+
+
+def _expand_hyphen(low, high):
+    comparators = [c for c in _expand_comparator('>=' + low) if c[0] == '>=']
+    partial = PARTIAL_PATTERN.match(high)
+    if partial and (_is_wildcard(partial.group(2)) or _is_wildcard(partial.group(3))):
+        comparators += [c for c in _expand_comparator(high) if c[0] == '<']
+    else:
+        comparators += _expand_comparator('<=' + high)
+    return comparators
+
+
+def parse_range(range_spec):
+    """Parse an npm range into a list of comparator sets (each a list of (op, version))."""
+    comparator_sets = []
+    for part in (range_spec or '*').split('||'):
+        part = re.sub(r'(<=|>=|<|>|=|~>|~|\^)\s+', r'\1', part.strip())
+        hyphen = re.match(r'^(\S+)\s+-\s+(\S+)$', part)
+        if hyphen:
+            comparator_sets.append(_expand_hyphen(*hyphen.groups()))
+            continue
+        comparators = []
+        for token in part.split() or ['*']:
+            comparators.extend(_expand_comparator(token))
+        comparator_sets.append(comparators)
+    return comparator_sets
+
+
+def _test_comparator(parsed, operator, bound):
+    if operator == '>=':
+        return parsed >= bound
+    if operator == '>':
+        return parsed > bound
+    if operator == '<=':
+        return parsed <= bound
+    if operator == '<':
+        return parsed < bound
+    return parsed == bound
+
+
+def _set_satisfied(parsed, comparators):
+    if not all(_test_comparator(parsed, op, bound) for op, bound in comparators):
+        return False
+    if not is_prerelease(parsed):
+        return True
+    # Prereleases only match when a comparator opts in on the same major.minor.patch
+    return any(is_prerelease(bound) and bound[3] != MIN_PRERELEASE and bound[:3] == parsed[:3]
+               for _, bound in comparators)
+
+
+def satisfies(version, range_spec):
+    """Check whether a version satisfies an npm range."""
+    parsed = parse_version(version)
+    if parsed is None:
+        return False
+    try:
+        comparator_sets = parse_range(range_spec)
+    except ValueError:
+        return False
+    return any(_set_satisfied(parsed, comparators) for comparators in comparator_sets)
+
+
+def is_valid_range(range_spec):
+    try:
+        parse_range(range_spec)
+        return True
+    except ValueError:
+        return False
+
+
+class VersionIndex:
+    """Sorted index of a package's published versions for fast range queries."""
+
+    def __init__(self, versions):
+        parsed = []
+        for version in versions:
+            key = parse_version(version)
+            if key is not None:
+                parsed.append((key, version))
+        parsed.sort()
+        self._keys = [key for key, _ in parsed]
+        self._versions = [version for _, version in parsed]
+
+    def __len__(self):
+        return len(self._versions)
+
+    def versions(self):
+        """All versions in ascending order."""
+        return list(self._versions)
+
+    def between(self, low, high, include_prerelease=False):
+        """Versions strictly above ``low`` and up to and including ``high``."""
+        low_key, high_key = parse_version(low), parse_version(high)
+        start = bisect_right(self._keys, low_key) if low_key else 0
+        end = bisect_right(self._keys, high_key) if high_key else len(self._keys)
+        return [self._versions[i] for i in range(start, end)
+                if include_prerelease or not is_prerelease(self._keys[i])]
+
+    def max_satisfying(self, range_spec):
+        """Highest indexed version satisfying the range, or None."""
+        try:
+            comparator_sets = parse_range(range_spec)
+        except ValueError:
+            return None
+
+        best = None
+        best_index = None
+        for comparators in comparator_sets:
+            # Start the downward scan at the tightest upper bound of the set
+            end = len(self._keys)
+            for operator, bound in comparators:
+                if operator in ('<', '<=', '='):
+                    end = min(end, bisect_right(self._keys, bound))
+            for i in range(end - 1, -1, -1):
+                if best is not None and self._keys[i] <= best:
+                    break
+                if _set_satisfied(self._keys[i], comparators):
+                    best, best_index = self._keys[i], i
+                    break
+        return None if best_index is None else self._versions[best_index]
@@ -0,0 +1,77 @@
+"""
+Local stand-in Bitbucket Server for tests
+"""
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def make_repository(project, slug, ssh_host='bitbucket.example.com', ssh_port=7999):
+    """Repository document with http and ssh clone links."""
+    path = f"{project.lower()}/{slug}.git"
+    return {
+        'slug': slug,
+        'project': {'key': project},
+        'links': {'clone': [
+            {'name': 'http', 'href': f"https://{ssh_host}/scm/{path}"},
+            {'name': 'ssh', 'href': f"ssh://git@{ssh_host}:{ssh_port}/{path}"}
+        ]}
+    }
+
+
+class StubBitbucket:
+    """Serve canned REST responses over HTTP/1.1 keep-alive on localhost.
+
+    routes maps (method, path) to a list of (status, body, headers) replies;
+    each request takes the next reply and the last one repeats. A reply
+    whose status is None closes the connection after reading the request,
+    without answering.
+    """
+
+    def __init__(self, routes):
+        self.routes = {key: list(replies) for key, replies in routes.items()}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                server.requests.append({'method': self.command, 'path': self.path, 'headers': dict(self.headers),
+                                        'body': body, 'client': self.client_address})
+                replies = server.routes.get((self.command, self.path)) or [(404, {'errors': [{'message': 'not found'}]}, {})]
+                status, document, headers = replies.pop(0) if len(replies) > 1 else replies[0]
+                if status is None:
+                    self.close_connection = True
+                    return
+                content = json.dumps(document).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = reply
+            do_POST = reply
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def calls(self, method, path):
+        return [request for request in self.requests if request['method'] == method and request['path'] == path]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
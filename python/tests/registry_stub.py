@@ -0,0 +1,69 @@
+"""
+Local stand-in npm registry for tests
+"""
+import hashlib
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+
+def make_packument(name, versions, latest=None, **fields):
+    """Build a minimal packument for the stand-in registry."""
+    document = {
+        'name': name,
+        'dist-tags': {'latest': latest or versions[-1]},
+        'versions': {version: {'name': name, 'version': version} for version in versions}
+    }
+    document.update(fields)
+    return document
+
+
+class StubRegistry:
+    """Serve packuments from a dict over HTTP on localhost."""
+
+    def __init__(self, packuments):
+        self.packuments = packuments
+        self.requests = []
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = unquote(self.path.lstrip('/'))
+                registry.requests.append((name, dict(self.headers)))
+                document = registry.packuments.get(name)
+                if document is None and '/' in name.lstrip('@'):
+                    # /<package>/<version>: one version's document
+                    package, version = name.rsplit('/', 1)
+                    document = registry.packuments.get(package, {}).get('versions', {}).get(version)
+                if document is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps(document).encode()
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
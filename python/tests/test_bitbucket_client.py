@@ -0,0 +1,154 @@
+"""
+Test the Bitbucket client against a local stand-in server
+"""
+import unittest
+import sys
+import os
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.bitbucket_client import BitbucketClient, reset_bitbucket_clients, retry_delay
+from packUpdate.services.automation_service import create_bitbucket_pr, get_bitbucket_clone_url
+from tests.bitbucket_stub import StubBitbucket, make_repository
+
+REPO_PATH = '/rest/api/1.0/projects/PROJ/repos/web'
+PR_PATH = f"{REPO_PATH}/pull-requests"
+
+
+class TestBitbucketClient(unittest.TestCase):
+    """Test pooling, retries and metadata caching"""
+
+    def client(self, stub, **kwargs):
+        kwargs.setdefault('backoff', 0.01)
+        return BitbucketClient(stub.url, 'secret', **kwargs)
+
+    def test_metadata_cached_and_connection_reused(self):
+        routes = {
+            ('GET', REPO_PATH): [(200, make_repository('PROJ', 'web'), {})],
+            ('GET', '/rest/api/1.0/projects/PROJ/repos/api'): [(200, make_repository('PROJ', 'api'), {})]
+        }
+        with StubBitbucket(routes) as stub:
+            client = self.client(stub)
+            client.get_repository('PROJ/web')
+            client.get_repository('PROJ/web')
+            client.get_repository('PROJ/api')
+            self.assertEqual(len(stub.calls('GET', REPO_PATH)), 1)
+            self.assertEqual(len({request['client'] for request in stub.requests}), 1)
+            self.assertEqual(stub.requests[0]['headers']['Authorization'], 'Bearer secret')
+            client.close()
+
+    def test_metadata_refetched_after_ttl(self):
+        with StubBitbucket({('GET', REPO_PATH): [(200, make_repository('PROJ', 'web'), {})]}) as stub:
+            client = self.client(stub, ttl=0)
+            client.get_repository('PROJ/web')
+            client.get_repository('PROJ/web')
+            self.assertEqual(len(stub.calls('GET', REPO_PATH)), 2)
+            client.close()
+
+    def test_ssh_info_discovered_once_per_server(self):
+        routes = {
+            ('GET', REPO_PATH): [(200, make_repository('PROJ', 'web', 'git.example.com', 7222), {})],
+            ('GET', '/rest/api/1.0/projects/PROJ/repos/api'): [(200, make_repository('PROJ', 'api'), {})]
+        }
+        with StubBitbucket(routes) as stub:
+            client = self.client(stub)
+            self.assertEqual(client.get_ssh_info('PROJ/web'), {'hostname': 'git.example.com', 'port': 7222})
+            self.assertEqual(client.get_ssh_info('PROJ/api'), {'hostname': 'git.example.com', 'port': 7222})
+            self.assertEqual(len(stub.requests), 1)
+            client.close()
+
+    def test_retries_rate_limits_and_server_errors(self):
+        replies = [(429, {}, {'Retry-After': '0'}), (502, {}, {}), (200, make_repository('PROJ', 'web'), {})]
+        with StubBitbucket({('GET', REPO_PATH): replies}) as stub:
+            client = self.client(stub)
+            self.assertEqual(client.get_repository('PROJ/web')['slug'], 'web')
+            self.assertEqual(client.stats['retries'], 2)
+            self.assertEqual(len(stub.calls('GET', REPO_PATH)), 3)
+            client.close()
+
+    def test_gives_up_after_max_retries(self):
+        with StubBitbucket({('GET', REPO_PATH): [(503, {}, {})]}) as stub:
+            client = self.client(stub, max_retries=2)
+            with self.assertRaises(requests.HTTPError):
+                client.get_repository('PROJ/web')
+            self.assertEqual(len(stub.calls('GET', REPO_PATH)), 3)
+            client.close()
+
+    def test_post_not_repeated_after_server_error(self):
+        with StubBitbucket({('POST', PR_PATH): [(500, {}, {}), (201, {'id': 1}, {})]}) as stub:
+            client = self.client(stub)
+            with self.assertRaises(requests.HTTPError):
+                client.create_pull_request('PROJ/web', {'title': 'Update'})
+            self.assertEqual(len(stub.calls('POST', PR_PATH)), 1)
+            client.close()
+
+    def test_post_not_repeated_after_connection_drop(self):
+        with StubBitbucket({('POST', PR_PATH): [(None, {}, {}), (201, {'id': 1}, {})]}) as stub:
+            client = self.client(stub)
+            with self.assertRaises(requests.ConnectionError):
+                client.create_pull_request('PROJ/web', {'title': 'Update'})
+            self.assertEqual(len(stub.calls('POST', PR_PATH)), 1)
+            self.assertEqual(stub.calls('POST', PR_PATH)[0]['body'], {'title': 'Update'})
+            client.close()
+
+    def test_get_retried_after_connection_drop(self):
+        replies = [(None, {}, {}), (200, make_repository('PROJ', 'web'), {})]
+        with StubBitbucket({('GET', REPO_PATH): replies}) as stub:
+            client = self.client(stub)
+            self.assertEqual(client.get_repository('PROJ/web')['slug'], 'web')
+            self.assertEqual(len(stub.calls('GET', REPO_PATH)), 2)
+            client.close()
+
+    def test_post_retried_when_connection_refused(self):
+        with StubBitbucket({}) as stub:
+            url = stub.url
+        client = BitbucketClient(url, 'secret', backoff=0.01, max_retries=1)
+        with self.assertRaises(requests.ConnectionError):
+            client.create_pull_request('PROJ/web', {'title': 'Update'})
+        self.assertEqual(client.stats['retries'], 1)
+        client.close()
+
+    def test_retry_delay(self):
+        self.assertEqual(retry_delay(0, backoff=0.5), 0.5)
+        self.assertEqual(retry_delay(3, backoff=0.5), 4)
+        self.assertEqual(retry_delay(20, backoff=0.5), 30)
+
+
+class TestAutomationBitbucket(unittest.TestCase):
+    """Test the automation helpers that go through the shared client"""
+
+    def setUp(self):
+        reset_bitbucket_clients()
+
+    def tearDown(self):
+        reset_bitbucket_clients()
+
+    def test_clone_url_from_discovered_ssh_port(self):
+        routes = {('GET', REPO_PATH): [(200, make_repository('PROJ', 'web', 'git.example.com', 7222), {})]}
+        with StubBitbucket(routes) as stub:
+            for _ in range(2):
+                self.assertEqual(get_bitbucket_clone_url(stub.url, 'PROJ/web', 'secret'),
+                                 'ssh://git@git.example.com:7222/proj/web.git')
+            self.assertEqual(len(stub.requests), 1)
+
+    def test_clone_url_falls_back_to_default_port(self):
+        with StubBitbucket({}) as stub:
+            self.assertEqual(get_bitbucket_clone_url(stub.url, 'PROJ/web', 'secret'),
+                             'ssh://git@127.0.0.1:7999/proj/web.git')
+
+    def test_create_pr(self):
+        with StubBitbucket({('POST', PR_PATH): [(429, {}, {'Retry-After': '0'}), (201, {'id': 42}, {})]}) as stub:
+            config = {'repository': 'PROJ/web', 'endpoint': stub.url, 'token': 'secret'}
+            pr_data = {'title': 'Update packages', 'description': 'Updated react', 'source_branch': 'feature/x',
+                       'target_branch': 'develop', 'reviewers': ['alice']}
+            result = create_bitbucket_pr(config, pr_data)
+            self.assertTrue(result['success'])
+            self.assertEqual(result['pr_url'], f"{stub.url}/projects/PROJ/repos/web/pull-requests/42")
+            body = stub.calls('POST', PR_PATH)[-1]['body']
+            self.assertEqual(body['fromRef']['id'], 'refs/heads/feature/x')
+            self.assertEqual(body['reviewers'], [{'user': {'name': 'alice'}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
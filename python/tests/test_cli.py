@@ -130,6 +130,55 @@ class TestCLIParsing(unittest.TestCase):
         
         self.assertEqual(args['update_version'], '2.5.1')
 
+    def test_analysis_workers_argument(self):
+        """Test --analysis-workers argument"""
+        sys.argv = ['packUpdate', '--analysis-workers=16']
+        args = parse_cli_args()
+        
+        self.assertEqual(args['analysis_workers'], 16)
+
+    def test_trial_workers_argument(self):
+        """Test --trial-workers argument"""
+        sys.argv = ['packUpdate', '--safe', '--safe-strategy=parallel', '--trial-workers=4']
+        args = parse_cli_args()
+        
+        self.assertEqual(args['safe_strategy'], 'parallel')
+        self.assertEqual(args['trial_workers'], 4)
+
+    def test_events_argument(self):
+        """Test --events argument"""
+        sys.argv = ['packUpdate', '--events=fd:3']
+        self.assertEqual(parse_cli_args()['events'], 'fd:3')
+        
+        sys.argv = ['packUpdate', '--events=/tmp/run=1/events.jsonl']
+        self.assertEqual(parse_cli_args()['events'], '/tmp/run=1/events.jsonl')
+
+    def test_profile_flag(self):
+        """Test --profile flag"""
+        sys.argv = ['packUpdate', '--profile']
+        self.assertTrue(parse_cli_args()['profile'])
+        
+        sys.argv = ['packUpdate']
+        self.assertFalse(parse_cli_args()['profile'])
+
+    def test_workspace_arguments(self):
+        """Test --clone-mode, --reuse-workspaces and --workspace-budget"""
+        sys.argv = ['packUpdate', '--automate', '--clone-mode=blobless', '--reuse-workspaces', '--workspace-budget=2048']
+        args = parse_cli_args()
+        
+        self.assertEqual(args['clone_mode'], 'blobless')
+        self.assertTrue(args['reuse_workspaces'])
+        self.assertEqual(args['workspace_budget'], 2048)
+
+    def test_fleet_arguments(self):
+        """Test --fleet arguments"""
+        sys.argv = ['packUpdate', '--fleet=repos.json', '--fleet-workers=8', '--fleet-host-limit=3', '--platform=github']
+        args = parse_cli_args()
+        
+        self.assertEqual(args['fleet'], 'repos.json')
+        self.assertEqual(args['fleet_workers'], 8)
+        self.assertEqual(args['fleet_host_limit'], 3)
+
     def test_automate_flag(self):
         """Test --automate flag"""
         sys.argv = ['packUpdate', '--automate', '--platform=github', '--repository=org/repo']
@@ -0,0 +1,149 @@
+"""
+Test streaming command execution
+"""
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils.command_runner import (
+    run_command, command_kind, get_command_timeout, CommandError, OutputTail
+)
+
+
+class TestRunCommand(unittest.TestCase):
+    """Test output streaming and early termination"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir)
+
+    def test_success_and_output(self):
+        result = run_command('echo one; echo two >&2', self.test_dir)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.output, 'one\ntwo\n')
+
+    def test_failure_exit_code(self):
+        result = run_command(['sh', '-c', 'exit 3'], self.test_dir)
+        self.assertEqual((result.status, result.returncode), ('failed', 3))
+
+    def test_failure_pattern_stops_process_tree(self):
+        marker = os.path.join(self.test_dir, 'finished')
+        started = time.perf_counter()
+        result = run_command(f'echo "src/app.ts(3,1): error TS2304: Cannot find name"; sleep 5; touch {marker}',
+                             self.test_dir, failure_patterns=[r'error TS\d+:'])
+        self.assertLess(time.perf_counter() - started, 3)
+        self.assertEqual(result.status, 'matched')
+        self.assertIn('TS2304', result.matched)
+        self.assertFalse(result.ok)
+        time.sleep(0.2)
+        self.assertFalse(os.path.exists(marker))
+
+    def test_cancel_event(self):
+        cancelled = threading.Event()
+        threading.Timer(0.2, cancelled.set).start()
+        started = time.perf_counter()
+        result = run_command('sleep 5', self.test_dir, cancel_event=cancelled)
+        self.assertEqual(result.status, 'cancelled')
+        self.assertLess(time.perf_counter() - started, 3)
+
+    def test_timeout_kills_process_tree(self):
+        marker = os.path.join(self.test_dir, 'finished')
+        started = time.perf_counter()
+        result = run_command(f'(sleep 3; touch {marker}) & wait', self.test_dir, timeout=0.5)
+        self.assertLess(time.perf_counter() - started, 2.5)
+        self.assertEqual(result.status, 'timeout')
+        self.assertIn('timed out', result.describe())
+        time.sleep(3)
+        self.assertFalse(os.path.exists(marker))
+
+    def test_capture_stdout_keeps_streams_apart(self):
+        result = run_command(['sh', '-c', 'echo \'{"a": 1}\'; echo warning >&2'], self.test_dir, capture_stdout=True)
+        self.assertEqual(result.stdout, '{"a": 1}\n')
+        self.assertEqual(result.output, 'warning\n')
+
+    def test_check_raises_called_process_error(self):
+        import subprocess
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            run_command(['sh', '-c', 'exit 2'], self.test_dir).check()
+        self.assertIsInstance(context.exception, CommandError)
+        self.assertEqual(context.exception.returncode, 2)
+
+    def test_missing_program(self):
+        result = run_command(['packupdate-no-such-program'], self.test_dir)
+        self.assertEqual((result.status, result.returncode), ('failed', 127))
+
+    def test_output_kept_to_a_bounded_tail(self):
+        with patch('packUpdate.utils.command_runner.OUTPUT_TAIL_CHARS', 1024):
+            result = run_command('for i in $(seq 1 5000); do echo "output line $i"; done', self.test_dir)
+        self.assertTrue(result.ok)
+        self.assertLessEqual(len(result.output), 1024)
+        self.assertTrue(result.output.endswith('output line 5000\n'))
+        self.assertEqual(result.tail(2), 'output line 4999\noutput line 5000')
+
+    @patch('packUpdate.utils.command_runner.write_log_lines')
+    def test_output_teed_to_log(self, mock_write_lines):
+        run_command('echo one; echo two', self.test_dir, label='test')
+        logged = [line for call in mock_write_lines.call_args_list for line in call.args[0]]
+        self.assertEqual(logged, ['[test] one', '[test] two'])
+
+    @patch('packUpdate.utils.command_runner.write_log_lines')
+    def test_captured_stdout_not_teed_to_log(self, mock_write_lines):
+        result = run_command(['sh', '-c', 'echo \'{"a": 1}\''], self.test_dir, capture_stdout=True)
+        self.assertEqual(result.stdout, '{"a": 1}\n')
+        mock_write_lines.assert_not_called()
+
+    @patch('packUpdate.utils.command_runner.log')
+    def test_lines_echoed_with_label_when_not_quiet(self, mock_log):
+        run_command('echo hello', self.test_dir, quiet_mode=False, label='build')
+        mock_log.assert_called_with('[build] hello')
+
+
+
+class TestCommandClasses(unittest.TestCase):
+    """Test command kinds and their timeouts"""
+
+    def test_command_kind(self):
+        self.assertEqual(command_kind(['npm', 'install', 'a@1.0.0']), 'npm install')
+        self.assertEqual(command_kind(['npm', 'run', 'build']), 'npm run build')
+        self.assertEqual(command_kind(['npm', 'audit', 'fix']), 'npm audit fix')
+        self.assertEqual(command_kind(['npm', 'ls', '--json', '--all']), 'npm ls')
+        self.assertEqual(command_kind(['git', 'push', 'origin', 'b']), 'git push')
+        self.assertEqual(command_kind('npx playwright test'), 'shell')
+
+    def test_timeouts_by_class(self):
+        self.assertEqual(get_command_timeout('npm install'), 900)
+        self.assertEqual(get_command_timeout('npm outdated'), 300)
+        self.assertEqual(get_command_timeout('npm run test'), 1800)
+        self.assertEqual(get_command_timeout('git clone'), 600)
+        with patch.dict(os.environ, {'PACKUPDATE_TIMEOUT_INSTALL': '60'}):
+            self.assertEqual(get_command_timeout('npm ci'), 60)
+
+
+class TestOutputTail(unittest.TestCase):
+    """Test the output ring buffer"""
+
+    def test_drops_oldest_lines(self):
+        tail = OutputTail(max_chars=10)
+        for line in ('aaaa\n', 'bbbb\n', 'cccc\n'):
+            tail.append(line)
+        self.assertEqual(tail.text(), 'bbbb\ncccc\n')
+        self.assertEqual(tail.dropped, 1)
+
+    def test_long_line_truncated(self):
+        tail = OutputTail(max_chars=4)
+        tail.append('x' * 100 + '\n')
+        self.assertEqual(tail.text(), 'xxx\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Test external command accounting
+"""
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils.command_runner import run_command
+from packUpdate.utils.command_stats import (
+    CommandStats, PROJECT, format_bytes, get_command_stats, package_scope, reset_command_stats
+)
+from packUpdate.utils.logger import repository_scope
+
+
+class TestCommandStats(unittest.TestCase):
+    """Test aggregation by kind and package"""
+
+    def test_totals_by_kind_and_package(self):
+        stats = CommandStats()
+        stats.record('npm install', 10.0, 'passed', 2048, 'react')
+        stats.record('npm install', 5.0, 'failed', 1024, 'vue')
+        stats.record('npm run test', 30.0, 'passed', 4096, 'react')
+        stats.record('npm outdated', 2.0, 'passed', 100)
+
+        data = stats.to_dict()
+        self.assertEqual(data['by_kind']['npm install']['count'], 2)
+        self.assertEqual(data['by_kind']['npm install']['seconds'], 15.0)
+        self.assertEqual(data['by_kind']['npm install']['statuses'], {'passed': 1, 'failed': 1})
+        self.assertEqual(data['by_package']['react']['bytes'], 6144)
+        self.assertEqual(data['by_package'][PROJECT]['count'], 1)
+        self.assertEqual(data['by_package_kind']['react']['npm run test']['seconds'], 30.0)
+        self.assertEqual(data['total']['count'], 4)
+        self.assertEqual(data['total']['statuses'], {'passed': 3, 'failed': 1})
+
+    def test_totals_by_repository(self):
+        stats = CommandStats()
+        stats.record('npm install', 10.0, 'passed', 2048, 'react', 'org/web')
+        stats.record('npm install', 5.0, 'passed', 1024, 'react', 'org/api')
+        stats.record('git push', 1.0, 'passed', 10, None, 'org/api')
+
+        data = stats.to_dict()
+        self.assertEqual(data['by_repository']['org/api']['count'], 2)
+        self.assertEqual(data['by_package']['org/web: react']['seconds'], 10.0)
+        self.assertEqual(data['by_package'][f'org/api: {PROJECT}']['count'], 1)
+        self.assertNotIn('react', data['by_package'])
+        self.assertIn('Repository', '\n'.join(stats.format_table()))
+
+    def test_format_table(self):
+        stats = CommandStats()
+        self.assertEqual(stats.format_table(), [])
+        stats.record('npm install', 10.0, 'failed', 2048, 'react')
+        stats.record('npm run test', 30.0, 'passed', 4096, 'react')
+        lines = stats.format_table()
+        # Slowest command kind first
+        self.assertTrue(lines[2].startswith('npm run test'))
+        self.assertIn('2.0 KB', lines[3])
+        total = next(line for line in lines if line.startswith('Total'))
+        self.assertEqual(total.split()[1:4], ['2', '40.0', '1'])
+        self.assertTrue(any(line.startswith('react') for line in lines))
+
+    def test_save(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            stats = CommandStats()
+            stats.record('git push', 1.5, 'passed', 10)
+            path = stats.save(os.path.join(test_dir, 'logs', 'run-commands.json'))
+            with open(path) as f:
+                self.assertEqual(json.load(f)['by_kind']['git push']['count'], 1)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['run-commands.json'])
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), '512 B')
+        self.assertEqual(format_bytes(1536), '1.5 KB')
+        self.assertEqual(format_bytes(3 * 1024 * 1024), '3.0 MB')
+
+
+class TestCommandRecording(unittest.TestCase):
+    """Test that run_command records into the run's stats"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        reset_command_stats()
+
+    def tearDown(self):
+        reset_command_stats()
+        shutil.rmtree(self.test_dir)
+
+    def test_commands_attributed_to_package_scope(self):
+        run_command('echo hello', self.test_dir)
+        with package_scope('lodash'):
+            run_command('exit 3', self.test_dir)
+
+        data = get_command_stats().to_dict()
+        self.assertEqual(data['by_kind']['shell']['count'], 2)
+        self.assertEqual(data['by_package'][PROJECT]['bytes'], len('hello\n'))
+        self.assertEqual(data['by_package']['lodash']['statuses'], {'failed': 1})
+
+    def test_commands_attributed_to_repository_scope(self):
+        with repository_scope('org/web'), package_scope('lodash'):
+            run_command('true', self.test_dir)
+        run_command('true', self.test_dir)
+
+        data = get_command_stats().to_dict()
+        self.assertEqual(data['by_repository'], {'org/web': data['by_package']['org/web: lodash']})
+        self.assertEqual(data['by_package'][PROJECT]['count'], 1)
+
+    def test_scope_is_per_thread(self):
+        def worker():
+            with package_scope('express'):
+                run_command('true', self.test_dir)
+
+        with package_scope('react'):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            run_command('true', self.test_dir)
+
+        by_package = get_command_stats().to_dict()['by_package']
+        self.assertEqual(by_package['express']['count'], 1)
+        self.assertEqual(by_package['react']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
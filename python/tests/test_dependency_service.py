@@ -0,0 +1,104 @@
+"""
+Test the level-grouped update planner
+"""
+import unittest
+import sys
+import os
+import time
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.dependency_service import plan_update_levels, strongly_connected_components
+
+
+def graph_of(edges):
+    """Build a dependency graph from {package: [dependencies]}"""
+    return {'dependencies': {name: {'requires': {dep: '*' for dep in deps}} for name, deps in edges.items()}}
+
+
+def outdated_of(names):
+    return {name: {'current': '1.0.0', 'latest': '2.0.0'} for name in names}
+
+
+class TestPlanUpdateLevels(unittest.TestCase):
+    """Test grouping outdated packages into ordered levels"""
+
+    def test_independent_packages_share_a_level(self):
+        levels = plan_update_levels(outdated_of(['a', 'b', 'c']), graph_of({}))
+        self.assertEqual(levels, [['a', 'b', 'c']])
+
+    def test_dependencies_come_first(self):
+        graph = graph_of({'d': ['b', 'c'], 'c': ['a'], 'b': ['a'], 'a': []})
+        levels = plan_update_levels(outdated_of(['d', 'c', 'b', 'a']), graph)
+        self.assertEqual(levels, [['a'], ['c', 'b'], ['d']])
+
+    def test_transitive_dependency_through_unchanged_package(self):
+        """Test that ordering follows paths through packages that aren't updated"""
+        graph = graph_of({'app-lib': ['middle'], 'middle': ['core'], 'core': []})
+        levels = plan_update_levels(outdated_of(['app-lib', 'core']), graph)
+        self.assertEqual(levels, [['core'], ['app-lib']])
+
+    def test_unchanged_intermediates_add_no_levels(self):
+        """Test that long chains of non-outdated packages don't spread levels apart"""
+        graph = graph_of({'a': ['x1'], 'x1': ['x2'], 'x2': ['x3'], 'x3': [], 'b': []})
+        levels = plan_update_levels(outdated_of(['a', 'b']), graph)
+        self.assertEqual(levels, [['a', 'b']])
+
+    def test_cycle_collapses_into_one_level(self):
+        graph = graph_of({'a': ['b'], 'b': ['a'], 'c': ['a']})
+        levels = plan_update_levels(outdated_of(['c', 'a', 'b']), graph)
+        self.assertEqual(levels, [['a', 'b'], ['c']])
+
+    def test_empty(self):
+        self.assertEqual(plan_update_levels({}, graph_of({'a': []})), [])
+        self.assertEqual(plan_update_levels(outdated_of(['a']), {}), [['a']])
+
+
+class TestStronglyConnectedComponents(unittest.TestCase):
+    """Test the iterative SCC decomposition"""
+
+    def test_components_are_dependencies_first(self):
+        adjacency = {'a': ['b'], 'b': ['c'], 'c': ['b', 'd'], 'd': []}
+        components = strongly_connected_components(adjacency, ['a'])
+        self.assertEqual([sorted(c) for c in components], [['d'], ['b', 'c'], ['a']])
+
+
+class TestPlannerBenchmark(unittest.TestCase):
+    """Benchmark the planner on synthetic 10k-node graphs"""
+
+    def test_random_10k_graph(self):
+        rng = random.Random(42)
+        size = 10000
+        names = [f'pkg-{i}' for i in range(size)]
+        # Mostly forward edges plus a few back edges to create cycles
+        edges = {name: [names[rng.randrange(i + 1, size)] for _ in range(4) if i + 1 < size]
+                 for i, name in enumerate(names)}
+        for _ in range(50):
+            i = rng.randrange(1, size)
+            edges[names[i]].append(names[rng.randrange(0, i)])
+        outdated = outdated_of(rng.sample(names, 2000))
+
+        started = time.perf_counter()
+        levels = plan_update_levels(outdated, graph_of(edges))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(sum(len(level) for level in levels), len(outdated))
+        self.assertLess(elapsed, 5.0)
+
+    def test_deep_chain_10k(self):
+        """Test a 10k-deep chain, far past the recursion limit"""
+        size = 10000
+        edges = {f'pkg-{i}': [f'pkg-{i + 1}'] if i + 1 < size else [] for i in range(size)}
+
+        started = time.perf_counter()
+        levels = plan_update_levels(outdated_of(edges), graph_of(edges))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(levels), size)
+        self.assertEqual(levels[0], [f'pkg-{size - 1}'])
+        self.assertLess(elapsed, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
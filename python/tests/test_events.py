@@ -0,0 +1,139 @@
+"""
+Test the JSONL event stream
+"""
+import unittest
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.verification_cache import reset_verification_cache
+from packUpdate.services.verification_service import reset_verification_results, verify_project
+from packUpdate.utils import events
+from packUpdate.utils.events import EventStream, close_event_stream, emit, open_event_stream, span
+
+
+class TestEventStream(unittest.TestCase):
+    """Test event records and spans"""
+
+    def setUp(self):
+        self.output = io.StringIO()
+        events._stream = EventStream(self.output, close_target=False)
+
+    def tearDown(self):
+        close_event_stream()
+
+    def records(self):
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def test_emit_drops_empty_fields(self):
+        emit('package', package='react', version=None)
+        record = self.records()[0]
+        self.assertEqual(record['event'], 'package')
+        self.assertEqual(record['phase'], 'point')
+        self.assertEqual(record['package'], 'react')
+        self.assertNotIn('version', record)
+        self.assertGreaterEqual(record['t'], 0)
+
+    def test_span_start_and_end(self):
+        with span('install', package='react', version='19.0.0') as install_event:
+            install_event['cached'] = False
+        start, end = self.records()
+        self.assertEqual((start['event'], start['phase'], start['package']), ('install', 'start', 'react'))
+        self.assertEqual((end['phase'], end['status'], end['version']), ('end', 'ok', '19.0.0'))
+        self.assertFalse(end['cached'])
+        self.assertGreaterEqual(end['duration'], 0)
+        self.assertGreaterEqual(end['t'], start['t'])
+
+    def test_span_status_set_by_block(self):
+        with span('verify') as verify_event:
+            verify_event['status'] = 'failed'
+        self.assertEqual(self.records()[1]['status'], 'failed')
+
+    def test_span_records_error_and_reraises(self):
+        with self.assertRaises(ValueError):
+            with span('trial', package='vue'):
+                raise ValueError("Tests failed: build failed, last output:\n    error TS2304")
+        end = self.records()[1]
+        self.assertEqual(end['status'], 'error')
+        self.assertEqual(end['error'], 'Tests failed: build failed, last output:')
+
+    def test_nothing_written_without_stream(self):
+        close_event_stream()
+        emit('package', package='react')
+        with span('install') as install_event:
+            install_event['status'] = 'ok'
+        self.assertEqual(self.output.getvalue(), '')
+
+
+class TestVerificationEvents(unittest.TestCase):
+    """Test the events emitted while verifying a project"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, 'package.json'), 'w') as f:
+            json.dump({'name': 'app', 'scripts': {'build': 'tsc', 'test': 'jest'}}, f)
+        self.env = patch.dict(os.environ, {'PACKUPDATE_CACHE_DIR': os.path.join(self.test_dir, '.cache')})
+        self.env.start()
+        reset_verification_cache()
+        reset_verification_results()
+        self.output = io.StringIO()
+        events._stream = EventStream(self.output, close_target=False)
+
+    def tearDown(self):
+        close_event_stream()
+        self.env.stop()
+        reset_verification_cache()
+        reset_verification_results()
+        shutil.rmtree(self.test_dir)
+
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_stage_and_verify_events(self, mock_stage):
+        mock_stage.side_effect = lambda stage, *args: ('passed', '') if stage.name == 'build' else ('failed', 'FAIL')
+        verify_project(self.test_dir, True)
+        verify_project(self.test_dir, True)
+
+        records = [json.loads(line) for line in self.output.getvalue().splitlines()]
+        stages = [(r['name'], r['status']) for r in records if r['event'] == 'stage']
+        self.assertEqual(stages, [('build', 'passed'), ('test', 'failed')])
+        ends = [r for r in records if r['event'] == 'verify' and r['phase'] == 'end']
+        self.assertEqual([(r['status'], r['cached'], r['failed_stage']) for r in ends],
+                         [('failed', False, 'test'), ('failed', True, 'test')])
+
+
+class TestOpenEventStream(unittest.TestCase):
+    """Test event targets"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        close_event_stream()
+        shutil.rmtree(self.test_dir)
+
+    def test_path_target(self):
+        path = os.path.join(self.test_dir, 'out', 'events.jsonl')
+        open_event_stream(path)
+        emit('pass', number=1)
+        close_event_stream()
+        with open(path) as f:
+            names = [json.loads(line)['event'] for line in f]
+        self.assertEqual(names, ['stream', 'pass'])
+
+    def test_descriptor_target(self):
+        read_fd, write_fd = os.pipe()
+        open_event_stream(f"fd:{write_fd}")
+        emit('pass', number=1)
+        close_event_stream()
+        with os.fdopen(read_fd) as reader:
+            names = [json.loads(line)['event'] for line in reader]
+        self.assertEqual(names, ['stream', 'pass'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Test fleet automation scheduling
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.fleet_service import (
+    load_fleet_manifest, repository_args, repository_host, run_bounded, run_fleet
+)
+from packUpdate.utils.logger import get_current_repository
+
+
+class TestFleetManifest(unittest.TestCase):
+    """Test manifest loading and per-repository arguments"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, content):
+        path = os.path.join(self.test_dir, 'fleet')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_json_manifest(self):
+        path = self.write(json.dumps([
+            'PROJ/web',
+            {'repository': 'PROJ/api', 'base_branch': 'main', 'reviewers': ['alice', 'bob']}
+        ]))
+        self.assertEqual(load_fleet_manifest(path), [
+            {'repository': 'PROJ/web'},
+            {'repository': 'PROJ/api', 'base_branch': 'main', 'reviewers': 'alice,bob'}
+        ])
+
+    def test_json_object_manifest(self):
+        path = self.write(json.dumps({'repositories': ['PROJ/web']}))
+        self.assertEqual(load_fleet_manifest(path), [{'repository': 'PROJ/web'}])
+
+    def test_text_manifest(self):
+        path = self.write("# payments team\nPROJ/web\n\n  PROJ/api  \n")
+        self.assertEqual(load_fleet_manifest(path), [{'repository': 'PROJ/web'}, {'repository': 'PROJ/api'}])
+
+    def test_entry_without_repository(self):
+        path = self.write(json.dumps([{'base_branch': 'main'}]))
+        with self.assertRaises(ValueError):
+            load_fleet_manifest(path)
+
+    def test_repository_args_override_shared_options(self):
+        cli_args = {'repository': None, 'platform': 'bitbucket-server', 'base_branch': 'develop', 'passes': 2}
+        args = repository_args(cli_args, {'repository': 'PROJ/api', 'base_branch': 'main', 'ignored': 1})
+        self.assertEqual(args['repository'], 'PROJ/api')
+        self.assertEqual(args['base_branch'], 'main')
+        self.assertEqual(args['passes'], 2)
+        self.assertNotIn('ignored', args)
+        self.assertEqual(cli_args['base_branch'], 'develop')
+
+    def test_repository_host(self):
+        self.assertEqual(repository_host({'endpoint': 'https://git.example.com:8443/bitbucket'}), 'git.example.com')
+        self.assertEqual(repository_host({'platform': 'github'}), 'github.com')
+
+
+class TestRunBounded(unittest.TestCase):
+    """Test global and per-host concurrency limits"""
+
+    def test_limits_respected(self):
+        lock = threading.Lock()
+        active = {'total': 0, 'a': 0, 'b': 0}
+        peaks = {'total': 0, 'a': 0, 'b': 0}
+
+        def work(job):
+            host = job[0]
+            with lock:
+                active['total'] += 1
+                active[host] += 1
+                peaks['total'] = max(peaks['total'], active['total'])
+                peaks[host] = max(peaks[host], active[host])
+            time.sleep(0.05)
+            with lock:
+                active['total'] -= 1
+                active[host] -= 1
+            return job
+
+        jobs = [('a', i) for i in range(6)] + [('b', i) for i in range(6)]
+        results = run_bounded(jobs, lambda job: job[0], work, max_workers=3, per_host=2)
+        self.assertEqual(results, jobs)
+        self.assertLessEqual(peaks['total'], 3)
+        self.assertEqual(peaks['a'], 2)
+        self.assertEqual(peaks['b'], 2)
+
+    def test_busy_host_does_not_block_others(self):
+        order = []
+
+        def work(job):
+            order.append(job)
+            time.sleep(0.1 if job[0] == 'slow' else 0.01)
+            return job
+
+        jobs = [('slow', 1), ('slow', 2), ('fast', 1), ('fast', 2)]
+        run_bounded(jobs, lambda job: job[0], work, max_workers=2, per_host=1)
+        # The second slow job waits for its host; both fast jobs run in the meantime
+        self.assertEqual(order[-1], ('slow', 2))
+
+
+class TestRunFleet(unittest.TestCase):
+    """Test that one repository's failure does not stop the rest"""
+
+    def test_failures_isolated_and_aggregated(self):
+        cli_args = {'repository': None, 'platform': 'github', 'endpoint': None}
+        entries = [{'repository': 'org/ok'}, {'repository': 'org/broken'}, {'repository': 'org/done'}]
+        finished = []
+
+        def run_repository(args):
+            if args['repository'] == 'org/broken':
+                raise Exception("Workspace setup failed: clone refused")
+            return {'status': 'pr-created', 'updated': [('react', '18.0.0', '19.0.0')], 'pr_url': 'https://pr/1'}
+
+        results = run_fleet(cli_args, entries, run_repository, max_workers=2, per_host=2,
+                            on_done=lambda result: finished.append(result['repository']))
+        self.assertEqual([result['repository'] for result in results], ['org/ok', 'org/broken', 'org/done'])
+        self.assertEqual([result['success'] for result in results], [True, False, True])
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertIn('clone refused', results[1]['message'])
+        self.assertEqual(results[2]['updated'], [('react', '18.0.0', '19.0.0')])
+        self.assertEqual(results[0]['host'], 'github.com')
+        self.assertEqual(sorted(finished), ['org/broken', 'org/done', 'org/ok'])
+
+    def test_repositories_run_in_their_scope(self):
+        cli_args = {'repository': None, 'platform': 'github', 'endpoint': None}
+        entries = [{'repository': 'org/web'}, {'repository': 'org/api'}]
+
+        results = run_fleet(cli_args, entries, lambda args: {'message': get_current_repository()},
+                            max_workers=2, per_host=2)
+        self.assertEqual([result['message'] for result in results], ['org/web', 'org/api'])
+        self.assertIsNone(get_current_repository())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Test lockfile dependency graph loading
+"""
+import unittest
+import sys
+import os
+import tempfile
+import json
+import shutil
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.lockfile_service import (
+    load_dependency_graph,
+    graph_from_npm_ls,
+    package_name_from_location
+)
+from packUpdate.services.report_service import find_circular_dependencies
+
+
+class TestLoadDependencyGraph(unittest.TestCase):
+    """Test reading package-lock.json into the dependency graph"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_json(self, name, data):
+        with open(os.path.join(self.test_dir, name), 'w') as f:
+            json.dump(data, f)
+
+    def test_no_lockfile(self):
+        """Test that a project without a lockfile yields None"""
+        self.assertIsNone(load_dependency_graph(self.test_dir))
+
+    def test_lockfile_v3_packages_section(self):
+        """Test lockfile v2/v3 packages section with nested duplicates"""
+        self.write_json('package-lock.json', {
+            'name': 'app',
+            'version': '1.0.0',
+            'lockfileVersion': 3,
+            'packages': {
+                '': {'name': 'app', 'version': '1.0.0', 'dependencies': {'express': '^4.0.0', '@scope/util': '^1.0.0'}},
+                'node_modules/express': {'version': '4.18.2', 'dependencies': {'debug': '2.6.9'}},
+                'node_modules/debug': {'version': '4.3.4', 'dependencies': {'ms': '2.1.2'}},
+                'node_modules/express/node_modules/debug': {'version': '2.6.9', 'dependencies': {'ms': '2.0.0'}},
+                'node_modules/ms': {'version': '2.1.2'},
+                'node_modules/@scope/util': {'version': '1.2.0', 'peerDependencies': {'express': '*'}}
+            }
+        })
+
+        graph = load_dependency_graph(self.test_dir)
+
+        self.assertEqual(graph['source'], 'lockfile')
+        self.assertEqual(graph['requires'], {'express': '^4.0.0', '@scope/util': '^1.0.0'})
+        self.assertEqual(graph['dependencies']['debug']['version'], '4.3.4')
+        self.assertEqual(graph['dependencies']['express']['requires'], {'debug': '2.6.9'})
+        self.assertEqual(graph['dependencies']['@scope/util']['requires'], {'express': '*'})
+        self.assertEqual(len(graph['dependencies']), 4)
+
+    def test_lockfile_v1_dependencies_section(self):
+        """Test legacy lockfile v1 dependencies section"""
+        self.write_json('package.json', {'name': 'app', 'dependencies': {'express': '^4.0.0'}})
+        self.write_json('package-lock.json', {
+            'name': 'app',
+            'lockfileVersion': 1,
+            'dependencies': {
+                'express': {
+                    'version': '4.18.2',
+                    'requires': {'debug': '2.6.9'},
+                    'dependencies': {'debug': {'version': '2.6.9'}}
+                },
+                'debug': {'version': '4.3.4'}
+            }
+        })
+
+        graph = load_dependency_graph(self.test_dir)
+
+        self.assertEqual(graph['requires'], {'express': '^4.0.0'})
+        self.assertEqual(graph['dependencies']['debug']['version'], '4.3.4')
+        self.assertEqual(graph['dependencies']['express']['requires'], {'debug': '2.6.9'})
+
+    def test_invalid_lockfile(self):
+        """Test that an unreadable lockfile yields None"""
+        with open(os.path.join(self.test_dir, 'package-lock.json'), 'w') as f:
+            f.write('not json')
+        self.assertIsNone(load_dependency_graph(self.test_dir))
+
+    @patch('packUpdate.services.package_service.run_command')
+    def test_get_dependency_tree_prefers_lockfile(self, mock_run):
+        """Test that npm ls is not spawned when a lockfile exists"""
+        from packUpdate.services.package_service import get_dependency_tree
+
+        self.write_json('package-lock.json', {
+            'lockfileVersion': 3,
+            'packages': {'': {}, 'node_modules/a': {'version': '1.0.0'}}
+        })
+
+        graph = get_dependency_tree(self.test_dir)
+
+        mock_run.assert_not_called()
+        self.assertIn('a', graph['dependencies'])
+
+    def test_package_name_from_location(self):
+        """Test deriving package names from lockfile locations"""
+        self.assertEqual(package_name_from_location('node_modules/a'), 'a')
+        self.assertEqual(package_name_from_location('node_modules/a/node_modules/@s/b'), '@s/b')
+        self.assertIsNone(package_name_from_location('packages/workspace-a'))
+
+
+class TestNpmLsFallback(unittest.TestCase):
+    """Test flattening npm ls output"""
+
+    def test_flatten_nested_tree(self):
+        """Test that nested npm ls dependencies become requires edges"""
+        tree = {
+            'name': 'app',
+            'dependencies': {
+                'a': {'version': '1.0.0', 'dependencies': {'b': {'version': '2.0.0'}}},
+                'b': {'version': '2.0.0', 'dependencies': {'c': {'version': '3.0.0'}}}
+            }
+        }
+
+        graph = graph_from_npm_ls(tree)
+
+        self.assertEqual(graph['source'], 'npm-ls')
+        self.assertEqual(set(graph['dependencies']), {'a', 'b', 'c'})
+        self.assertIn('b', graph['dependencies']['a']['requires'])
+        self.assertIn('c', graph['dependencies']['b']['requires'])
+
+
+class TestFindCircularDependencies(unittest.TestCase):
+    """Test cycle detection over the dependency graph"""
+
+    def test_no_cycles(self):
+        graph = {'dependencies': {'a': {'requires': {'b': '1'}}, 'b': {'requires': {}}}}
+        self.assertEqual(find_circular_dependencies(graph), [])
+
+    def test_cycle_detected(self):
+        graph = {'dependencies': {
+            'a': {'requires': {'b': '1'}},
+            'b': {'requires': {'c': '1'}},
+            'c': {'requires': {'a': '1'}}
+        }}
+        self.assertEqual(find_circular_dependencies(graph), ['a → b → c → a'])
+
+    def test_deep_chain_does_not_recurse(self):
+        """Test that long chains don't hit the recursion limit"""
+        size = sys.getrecursionlimit() * 2
+        graph = {'dependencies': {f'p{i}': {'requires': {f'p{i + 1}': '1'}} for i in range(size)}}
+        self.assertEqual(find_circular_dependencies(graph), [])
+
+    def test_empty_graph(self):
+        self.assertEqual(find_circular_dependencies({}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
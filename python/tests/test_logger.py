@@ -0,0 +1,121 @@
+"""
+Test the background log writer
+"""
+import unittest
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils import logger
+from packUpdate.utils.logger import LogWriter, compress_old_logs, repository_scope
+
+
+class TestLogWriter(unittest.TestCase):
+    """Test buffered writes, flushing and rotation"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'logs', 'packupdate-run.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def read(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            return f.read()
+
+    def test_lines_written_in_order_after_flush(self):
+        writer = LogWriter(self.path)
+        for i in range(100):
+            writer.write([f"line {i}\n"])
+        writer.flush()
+        self.assertEqual(self.read(self.path).splitlines(), [f"line {i}" for i in range(100)])
+        writer.close()
+
+    def test_lines_prefixed_with_repository(self):
+        writer = LogWriter(self.path)
+        with patch.object(logger, '_get_writer', return_value=writer):
+            with repository_scope('org/web'):
+                logger.write_log("Installing")
+                logger.write_log_lines(["npm output"])
+            logger.write_log("Done")
+        writer.flush()
+        lines = self.read(self.path).splitlines()
+        self.assertTrue(lines[0].endswith("] [org/web] Installing"))
+        self.assertTrue(lines[1].endswith("] [org/web] npm output"))
+        self.assertNotIn('org/web', lines[2])
+        writer.close()
+
+    def test_periodic_flush_without_explicit_flush(self):
+        writer = LogWriter(self.path, flush_interval=0.05)
+        writer.write(["hello\n"])
+        deadline = time.time() + 2
+        while time.time() < deadline and not (os.path.exists(self.path) and self.read(self.path)):
+            time.sleep(0.05)
+        self.assertEqual(self.read(self.path), "hello\n")
+        writer.close()
+
+    def test_close_flushes_and_writer_restarts(self):
+        writer = LogWriter(self.path)
+        writer.write(["before close\n"])
+        writer.close()
+        self.assertEqual(self.read(self.path), "before close\n")
+        writer.write(["after close\n"])
+        writer.close()
+        self.assertEqual(self.read(self.path), "before close\nafter close\n")
+
+    def test_rotation_compresses_full_parts(self):
+        writer = LogWriter(self.path, max_bytes=100)
+        for i in range(30):
+            writer.write([f"message number {i:03d}\n"])
+        writer.close()
+
+        log_dir = os.path.dirname(self.path)
+        parts = sorted(name for name in os.listdir(log_dir) if name.endswith('.gz'))
+        self.assertEqual(parts[0], 'packupdate-run.1.log.gz')
+        self.assertGreater(writer.parts, 1)
+        content = ''.join(self.read(os.path.join(log_dir, f"packupdate-run.{n}.log.gz"))
+                          for n in range(1, writer.parts + 1)) + self.read(self.path)
+        self.assertEqual(content.splitlines(), [f"message number {i:03d}" for i in range(30)])
+
+
+class TestCompressOldLogs(unittest.TestCase):
+    """Test compression of logs from earlier runs"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, age):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w') as f:
+            f.write(f"{name}\n")
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_only_idle_logs_of_other_runs_compressed(self):
+        current = self.write('packupdate-current.log', 7200)
+        self.write('packupdate-old.log', 7200)
+        self.write('packupdate-active.log', 10)
+        self.write('security-report.json', 7200)
+
+        self.assertEqual(compress_old_logs(self.test_dir, current), 1)
+        self.assertEqual(sorted(os.listdir(self.test_dir)), [
+            'packupdate-active.log', 'packupdate-current.log', 'packupdate-old.log.gz', 'security-report.json'
+        ])
+        with gzip.open(os.path.join(self.test_dir, 'packupdate-old.log.gz'), 'rt') as f:
+            self.assertEqual(f.read(), 'packupdate-old.log\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
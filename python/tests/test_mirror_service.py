@@ -0,0 +1,142 @@
+"""
+Test workspace cloning through local mirrors
+"""
+import unittest
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.mirror_service import clone_workspace, mirror_path, update_mirror
+from packUpdate.utils.command_runner import CommandError
+
+
+def git(cwd, *args):
+    return subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                          cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class TestMirrorPath(unittest.TestCase):
+    """Test mirror naming"""
+
+    @patch.dict(os.environ, {'PACKUPDATE_MIRROR_DIR': '/mirrors'})
+    def test_urls_map_to_readable_names(self):
+        self.assertEqual(mirror_path('ssh://git@bitbucket.example.com:7999/proj/app.git'),
+                         '/mirrors/bitbucket.example.com_7999_proj_app.git')
+        self.assertEqual(mirror_path('git@github.com:org/tool.git'), '/mirrors/github.com_org_tool.git')
+
+
+class TestCloneWorkspace(unittest.TestCase):
+    """Test each clone mode against a local repository"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.origin = os.path.join(self.test_dir, 'origin')
+        os.makedirs(self.origin)
+        git(self.origin, 'init', '-q', '-b', 'master')
+        self.commit('package.json', '{"name": "app"}')
+        git(self.origin, 'branch', 'develop')
+        self.url = f"file://{self.origin}"
+        self.env = patch.dict(os.environ, {'PACKUPDATE_MIRROR_DIR': os.path.join(self.test_dir, 'mirrors')})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.test_dir)
+
+    def commit(self, name, content, branch='master'):
+        if git(self.origin, 'symbolic-ref', '--short', 'HEAD') != branch:
+            git(self.origin, 'checkout', '-q', branch)
+        with open(os.path.join(self.origin, name), 'w') as f:
+            f.write(content)
+        git(self.origin, 'add', name)
+        git(self.origin, 'commit', '-q', '-m', f"Add {name}")
+        return git(self.origin, 'rev-parse', 'HEAD')
+
+    def workspace(self, name):
+        path = os.path.join(self.test_dir, name)
+        os.makedirs(path)
+        return path
+
+    def test_mirror_clone_tracks_origin_and_refreshes(self):
+        first = self.workspace('first')
+        self.assertEqual(clone_workspace(self.url, first, 'develop', 'mirror'), 'mirror')
+        self.assertTrue(os.path.isdir(os.path.join(mirror_path(self.url), 'objects')))
+        self.assertEqual(git(first, 'remote', 'get-url', 'origin'), self.url)
+
+        head = self.commit('index.js', 'module.exports = 1', branch='develop')
+        second = self.workspace('second')
+        clone_workspace(self.url, second, 'develop', 'mirror')
+        self.assertEqual(git(second, 'rev-parse', 'origin/develop'), head)
+
+    def test_broken_mirror_recreated(self):
+        os.makedirs(os.path.join(mirror_path(self.url), 'objects'))
+        workspace = self.workspace('ws')
+        self.assertEqual(clone_workspace(self.url, workspace, 'develop', 'mirror'), 'mirror')
+        self.assertTrue(os.path.isfile(os.path.join(mirror_path(self.url), 'HEAD')))
+
+    def test_failed_fetch_keeps_mirror(self):
+        update_mirror(self.url)
+        moved = os.path.join(self.test_dir, 'moved')
+        os.rename(self.origin, moved)
+        with self.assertRaises(CommandError):
+            update_mirror(self.url)
+        self.assertTrue(os.path.isfile(os.path.join(mirror_path(self.url), 'HEAD')))
+
+        # The workspace falls back to a full clone, which fails here as the remote is gone
+        with self.assertRaises(CommandError):
+            clone_workspace(self.url, self.workspace('ws'), 'develop', 'mirror')
+        self.assertTrue(os.path.isdir(mirror_path(self.url)))
+
+    def test_failed_creation_discards_mirror(self):
+        url = f"file://{os.path.join(self.test_dir, 'missing')}"
+        with self.assertRaises(CommandError):
+            update_mirror(url)
+        self.assertFalse(os.path.exists(mirror_path(url)))
+
+    def test_failed_workspace_clone_keeps_mirror(self):
+        clone_workspace(self.url, self.workspace('first'), 'develop', 'mirror')
+        workspace = self.workspace('ws')
+        # git refuses to clone into a non-empty directory
+        with open(os.path.join(workspace, 'leftover'), 'w') as f:
+            f.write('')
+        self.assertEqual(clone_workspace(self.url, workspace, 'develop', 'mirror'), 'full')
+        self.assertTrue(os.path.isdir(os.path.join(mirror_path(self.url), 'objects')))
+
+    def test_refresh_waits_for_another_process(self):
+        clone_workspace(self.url, self.workspace('first'), 'develop', 'mirror')
+        holder = subprocess.Popen(
+            [sys.executable, '-c', 'import fcntl, sys; f = open(sys.argv[1], "a"); '
+             'fcntl.flock(f, fcntl.LOCK_EX); print("locked", flush=True); sys.stdin.read()',
+             f"{mirror_path(self.url)}.lock"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        holder.stdout.readline()
+        refresh = threading.Thread(target=update_mirror, args=(self.url,))
+        refresh.start()
+        refresh.join(0.5)
+        self.assertTrue(refresh.is_alive())
+        holder.communicate('')
+        refresh.join(10)
+        self.assertFalse(refresh.is_alive())
+
+    def test_shallow_clone_of_base_branch(self):
+        self.commit('index.js', 'module.exports = 1', branch='develop')
+        workspace = self.workspace('ws')
+        clone_workspace(self.url, workspace, 'develop', 'shallow')
+        self.assertEqual(git(workspace, 'rev-list', '--count', 'HEAD'), '1')
+        self.assertNotIn('origin/master', git(workspace, 'branch', '-r'))
+
+    def test_blobless_clone_falls_back_to_master(self):
+        workspace = self.workspace('ws')
+        clone_workspace(self.url, workspace, 'release', 'blobless')
+        self.assertEqual(git(workspace, 'rev-parse', '--abbrev-ref', 'HEAD'), 'master')
+        self.assertEqual(git(workspace, 'config', 'remote.origin.partialclonefilter'), 'blob:none')
+
+
+if __name__ == '__main__':
+    unittest.main()
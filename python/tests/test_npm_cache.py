@@ -0,0 +1,167 @@
+"""
+Test the shared npm cache used by automation workspaces
+"""
+import unittest
+import sys
+import os
+import base64
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services import npm_cache
+from packUpdate.services.npm_cache import (
+    finish_npm_cache, install_command, install_dependencies, prune_npm_cache, use_shared_npm_cache
+)
+from packUpdate.utils.command_runner import CommandResult
+
+
+def npm_result(command, returncode=0, output=''):
+    return CommandResult(command, ' '.join(command[:2]), 'passed' if returncode == 0 else 'failed',
+                         returncode, 0.1, output)
+
+
+class TestInstall(unittest.TestCase):
+    """Test the workspace install command"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, 'package.json'), 'w') as f:
+            f.write('{"name": "app"}')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def add(self, name):
+        path = os.path.join(self.test_dir, name)
+        if name == 'node_modules':
+            os.makedirs(path)
+        else:
+            with open(path, 'w') as f:
+                f.write('{}')
+
+    def test_command_selection(self):
+        self.assertEqual(install_command(self.test_dir)[:2], ['npm', 'install'])
+        self.add('package-lock.json')
+        self.assertEqual(install_command(self.test_dir), ['npm', 'ci', '--prefer-offline', '--no-audit', '--no-fund'])
+        self.add('node_modules')
+        self.assertEqual(install_command(self.test_dir)[:2], ['npm', 'install'])
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_ci_failure_falls_back_to_install(self, mock_run):
+        self.add('package-lock.json')
+        mock_run.side_effect = lambda command, cwd: npm_result(command, 1 if command[1] == 'ci' else 0,
+                                                               'npm ERR! `npm ci` can only install packages when '
+                                                               'your package.json and package-lock.json are in sync')
+        self.assertEqual(install_dependencies(self.test_dir), 'install')
+        self.assertEqual([call.args[0][1] for call in mock_run.call_args_list], ['ci', 'install'])
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_install_failure_raises(self, mock_run):
+        mock_run.side_effect = lambda command, cwd: npm_result(command, 1)
+        with self.assertRaises(Exception):
+            install_dependencies(self.test_dir)
+        self.assertEqual(mock_run.call_count, 1)
+
+
+class TestSharedCache(unittest.TestCase):
+    """Test cache selection and pruning"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, 'npm')
+        npm_cache._active_cache = None
+
+    def tearDown(self):
+        npm_cache._active_cache = None
+        shutil.rmtree(self.test_dir)
+
+    def test_existing_npm_cache_setting_respected(self):
+        with patch.dict(os.environ, {'npm_config_cache': '/custom/cache'}):
+            self.assertEqual(use_shared_npm_cache(), '/custom/cache')
+        with patch.dict(os.environ, {'PACKUPDATE_NPM_CACHE_DIR': self.cache_dir}):
+            os.environ.pop('npm_config_cache', None)
+            os.environ.pop('NPM_CONFIG_CACHE', None)
+            self.assertEqual(use_shared_npm_cache(), self.cache_dir)
+            self.assertEqual(os.environ['npm_config_cache'], self.cache_dir)
+
+    def write_content(self, key, age, size=32 * 1024):
+        """Store content the way cacache does and index it as last stored age seconds ago."""
+        data = os.urandom(size)
+        digest = hashlib.sha512(data).digest()
+        hex_digest = digest.hex()
+        directory = os.path.join(self.cache_dir, '_cacache', 'content-v2', 'sha512', hex_digest[:2], hex_digest[2:4])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, hex_digest[4:])
+        with open(path, 'wb') as f:
+            f.write(data)
+        # Downloaded long ago whatever the index says, so only the index can order them
+        os.utime(path, (0, 0))
+
+        entry = {'key': key, 'integrity': f"sha512-{base64.b64encode(digest).decode()}",
+                 'time': int((time.time() - age) * 1000), 'size': size}
+        index_key = hashlib.sha256(key.encode()).hexdigest()
+        index_dir = os.path.join(self.cache_dir, '_cacache', 'index-v5', index_key[:2], index_key[2:4])
+        os.makedirs(index_dir, exist_ok=True)
+        line = json.dumps(entry)
+        with open(os.path.join(index_dir, index_key[4:]), 'a') as f:
+            f.write(f"\n{hashlib.sha1(line.encode()).hexdigest()}\t{line}")
+        return path
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_under_budget_untouched(self, mock_run):
+        self.write_content('aa01', 100)
+        size, after = prune_npm_cache(self.cache_dir, 1024 * 1024)
+        self.assertEqual(size, after)
+        mock_run.assert_not_called()
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_oldest_content_pruned_then_verified(self, mock_run):
+        newest = self.write_content('make-fetch-happen:request-cache:react-19.0.0.tgz', 100)
+        oldest = self.write_content('make-fetch-happen:request-cache:lodash-4.17.21.tgz', 300)
+        middle = self.write_content('make-fetch-happen:request-cache:vue-3.5.0.tgz', 200)
+
+        size, after = prune_npm_cache(self.cache_dir, 60 * 1024)
+        self.assertLess(after, size)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertFalse(os.path.exists(middle))
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual(mock_run.call_args.args[0][:3], ['npm', 'cache', 'verify'])
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_configured_cache_reported_not_pruned(self, mock_run):
+        content = self.write_content('make-fetch-happen:request-cache:react-19.0.0.tgz', 100)
+        with patch.dict(os.environ, {'npm_config_cache': self.cache_dir}):
+            use_shared_npm_cache()
+        with patch.object(npm_cache, 'NPM_CACHE_BUDGET_MB', 0):
+            size, after = finish_npm_cache()
+
+        self.assertGreater(size, 0)
+        self.assertEqual(size, after)
+        self.assertTrue(os.path.exists(content))
+        mock_run.assert_not_called()
+
+    @patch('packUpdate.services.npm_cache.run_command')
+    def test_shared_cache_in_use_pruned(self, mock_run):
+        content = self.write_content('make-fetch-happen:request-cache:react-19.0.0.tgz', 100)
+        with patch.dict(os.environ, {'PACKUPDATE_NPM_CACHE_DIR': self.cache_dir}):
+            os.environ.pop('npm_config_cache', None)
+            os.environ.pop('NPM_CONFIG_CACHE', None)
+            use_shared_npm_cache()
+            with patch.object(npm_cache, 'NPM_CACHE_BUDGET_MB', 0):
+                finish_npm_cache()
+
+        self.assertFalse(os.path.exists(content))
+        mock_run.assert_called_once()
+
+    def test_nothing_reported_without_shared_cache(self):
+        self.assertIsNone(finish_npm_cache())
+
+
+if __name__ == '__main__':
+    unittest.main()
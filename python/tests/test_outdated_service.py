@@ -0,0 +1,111 @@
+"""
+Test native outdated-package resolution against a local stand-in registry
+"""
+import unittest
+import sys
+import os
+import tempfile
+import json
+import shutil
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.outdated_service import resolve_outdated_packages, registry_target
+from packUpdate.services.registry_service import reset_registry_clients
+from tests.registry_stub import StubRegistry, make_packument
+
+
+class TestResolveOutdatedPackages(unittest.TestCase):
+    """Test computing current/wanted/latest without npm outdated"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.write_json('package.json', {
+            'name': 'app',
+            'dependencies': {'express': '^4.17.0', 'lodash': '^4.17.0', 'local-lib': 'file:../lib'},
+            'devDependencies': {'jest': '~29.1.0'}
+        })
+        self.write_json('package-lock.json', {
+            'lockfileVersion': 3,
+            'packages': {
+                '': {'name': 'app'},
+                'node_modules/express': {'version': '4.17.1'},
+                'node_modules/lodash': {'version': '4.17.21'},
+                'node_modules/jest': {'version': '29.1.0'}
+            }
+        })
+        self.packuments = {
+            'express': make_packument('express', ['4.17.1', '4.18.2', '5.0.0']),
+            'lodash': make_packument('lodash', ['4.17.20', '4.17.21']),
+            'jest': make_packument('jest', ['29.1.0', '29.1.2', '29.2.0', '30.0.0'])
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_json(self, name, data):
+        with open(os.path.join(self.test_dir, name), 'w') as f:
+            json.dump(data, f)
+
+    def resolve(self, registry):
+        reset_registry_clients()
+        cache_dir = os.path.join(self.test_dir, '.cache')
+        with patch.dict(os.environ, {'npm_config_registry': registry.url, 'PACKUPDATE_CACHE_DIR': cache_dir}):
+            return resolve_outdated_packages(self.test_dir, max_workers=4)
+
+    def test_outdated_shape_matches_npm(self):
+        """Test that the result keeps the npm outdated --json shape"""
+        with StubRegistry(self.packuments) as registry:
+            outdated = self.resolve(registry)
+
+        self.assertEqual(sorted(outdated), ['express', 'jest'])
+        self.assertEqual(outdated['express']['current'], '4.17.1')
+        self.assertEqual(outdated['express']['wanted'], '4.18.2')
+        self.assertEqual(outdated['express']['latest'], '5.0.0')
+        self.assertEqual(outdated['express']['dependent'], 'app')
+        self.assertEqual(outdated['jest']['wanted'], '29.1.2')
+        self.assertEqual(outdated['jest']['latest'], '30.0.0')
+
+    def test_non_registry_specs_are_not_looked_up(self):
+        """Test that file: dependencies never hit the registry"""
+        with StubRegistry(self.packuments) as registry:
+            self.resolve(registry)
+            requested = {name for name, _ in registry.requests}
+
+        self.assertEqual(requested, {'express', 'lodash', 'jest'})
+
+    def test_registry_failure_falls_back(self):
+        """Test that a failed lookup signals the npm outdated fallback"""
+        del self.packuments['lodash']
+        with StubRegistry(self.packuments) as registry:
+            self.assertIsNone(self.resolve(registry))
+
+    def test_no_lockfile_falls_back(self):
+        """Test that projects without a lockfile use npm outdated"""
+        os.remove(os.path.join(self.test_dir, 'package-lock.json'))
+        self.assertIsNone(resolve_outdated_packages(self.test_dir))
+
+    def test_abbreviated_metadata_requested(self):
+        """Test that lookups ask for abbreviated packuments"""
+        with StubRegistry(self.packuments) as registry:
+            self.resolve(registry)
+            accept_headers = [headers.get('Accept', '') for _, headers in registry.requests]
+
+        self.assertTrue(all('application/vnd.npm.install-v1+json' in accept for accept in accept_headers))
+
+
+class TestRegistryTarget(unittest.TestCase):
+    """Test classification of declared dependency specs"""
+
+    def test_targets(self):
+        self.assertEqual(registry_target('^1.0.0'), (None, '^1.0.0'))
+        self.assertEqual(registry_target('npm:other@^2.0.0'), ('other', '^2.0.0'))
+        self.assertEqual(registry_target('npm:@scope/other@1.x'), ('@scope/other', '1.x'))
+        self.assertIsNone(registry_target('github:user/repo'))
+        self.assertIsNone(registry_target('user/repo'))
+        self.assertIsNone(registry_target('file:../lib'))
+
+
+if __name__ == '__main__':
+    unittest.main()
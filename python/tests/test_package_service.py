@@ -0,0 +1,98 @@
+"""
+Test package installation in the package service
+"""
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.package_service import install_packages
+from packUpdate.utils.command_runner import CommandResult
+
+
+def npm_result(returncode=0, output=''):
+    return CommandResult(['npm', 'install'], 'npm install', 'passed' if returncode == 0 else 'failed',
+                         returncode, 0.1, output)
+
+
+class TestInstallPackages(unittest.TestCase):
+    """Test batched npm installs"""
+
+    @patch('packUpdate.services.package_service.run_command')
+    def test_single_invocation_for_batch(self, mock_run):
+        """Test that a whole batch is installed with one npm install"""
+        mock_run.return_value = npm_result()
+
+        installed, failures = install_packages([('a', '2.0.0'), ('b', '3.1.0')], '/fake/path', True)
+
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args[0][0], ['npm', 'install', 'a@2.0.0', 'b@3.1.0'])
+        self.assertEqual(installed, ['a', 'b'])
+        self.assertEqual(failures, {})
+
+    @patch('packUpdate.services.package_service.run_command')
+    def test_named_failure_is_dropped_and_rest_retried(self, mock_run):
+        """Test that a spec npm reports as unresolvable fails alone"""
+        mock_run.side_effect = [
+            npm_result(1, output='npm ERR! notarget No matching version found for b@9.9.9.'),
+            npm_result()
+        ]
+
+        installed, failures = install_packages([('a', '2.0.0'), ('b', '9.9.9'), ('c', '1.0.0')], '/fake/path', True)
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(mock_run.call_args[0][0], ['npm', 'install', 'a@2.0.0', 'c@1.0.0'])
+        self.assertEqual(installed, ['a', 'c'])
+        self.assertEqual(list(failures), ['b'])
+
+    @patch('packUpdate.services.package_service.run_command')
+    def test_unattributed_failure_installs_individually(self, mock_run):
+        """Test falling back to per-package installs when npm doesn't name the culprit"""
+        mock_run.side_effect = [
+            npm_result(1, output='npm ERR! ERESOLVE could not resolve'),
+            npm_result(),
+            npm_result(1, output='npm ERR! ERESOLVE could not resolve')
+        ]
+
+        installed, failures = install_packages([('a', '2.0.0'), ('b', '3.0.0')], '/fake/path', True)
+
+        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(installed, ['a'])
+        self.assertEqual(list(failures), ['b'])
+
+    def test_empty_batch(self):
+        self.assertEqual(install_packages([], '/fake/path', True), ([], {}))
+
+
+class TestUpdatePackagesInBatches(unittest.TestCase):
+    """Test level-by-level batch updates"""
+
+    @patch('packUpdate.updatePackages.install_packages')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_one_install_per_level(self, mock_safe_packages, mock_install):
+        """Test that each planner level is installed as one batch with per-package results"""
+        from packUpdate.updatePackages import update_packages_in_order
+
+        mock_safe_packages.return_value = ['a']
+        mock_install.side_effect = [(['a', 'b'], {}), ([], {'c': 'boom'})]
+
+        outdated = {
+            'c': {'current': '1.0.0', 'wanted': '1.0.0', 'latest': '2.0.0'},
+            'b': {'current': '1.0.0', 'wanted': '1.1.0', 'latest': '1.1.0'},
+            'a': {'current': '1.0.0', 'wanted': '1.2.0', 'latest': '1.2.0'}
+        }
+        tree = {'dependencies': {'c': {'requires': {'a': '*'}}}}
+
+        updated, failed = update_packages_in_order(outdated, tree, '/fake/path', False, True, batch_install=True)
+
+        self.assertEqual(mock_install.call_count, 2)
+        self.assertEqual(mock_install.call_args_list[0][0][0], [('a', '1.2.0'), ('b', '1.1.0')])
+        self.assertEqual(mock_install.call_args_list[1][0][0], [('c', '2.0.0')])
+        self.assertEqual(updated, [('a', '1.0.0', '1.2.0'), ('b', '1.0.0', '1.1.0'), ('c', '1.0.0', '1.0.0')])
+        self.assertEqual(failed, ['c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
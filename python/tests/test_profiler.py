@@ -0,0 +1,78 @@
+"""
+Test the built-in profiler
+"""
+import unittest
+import sys
+import os
+import json
+import pstats
+import shutil
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils.events import span
+from packUpdate.utils.profiler import get_profiler, phase_label, start_profiler, stop_profiler
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestProfiler(unittest.TestCase):
+    """Test phase timing and profile output"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.test_dir, 'logs', 'packupdate-run')
+
+    def tearDown(self):
+        stop_profiler()
+        shutil.rmtree(self.test_dir)
+
+    def test_phase_label(self):
+        self.assertEqual(phase_label('install', {'package': 'react'}), 'install')
+        self.assertEqual(phase_label('report', {'section': 'security'}), 'report:security')
+        self.assertEqual(phase_label('git', {'step': 'push', 'branch': 'x'}), 'git:push')
+
+    def test_spans_timed_and_files_written(self):
+        start_profiler(self.prefix, interval=0.002)
+        with span('install', package='react'):
+            busy_wait(0.05)
+        with self.assertRaises(RuntimeError):
+            with span('install', package='vue'):
+                raise RuntimeError("npm failed")
+        with span('report', section='security'):
+            busy_wait(0.05)
+        paths = stop_profiler()
+        self.assertIsNone(get_profiler())
+
+        with open(paths['phases']) as f:
+            phases = json.load(f)['phases']
+        self.assertEqual(phases['install']['count'], 2)
+        self.assertGreaterEqual(phases['install']['seconds'], 0.05)
+        self.assertIn('report:security', phases)
+
+        with open(paths['collapsed']) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any(';phase:install;' in line and 'busy_wait' in line for line in lines))
+
+        if 'prof' in paths:
+            stats = pstats.Stats(paths['prof'])
+            self.assertTrue(any(name == 'busy_wait' for _, _, name in stats.stats))
+
+    def test_span_without_profiler_is_untimed(self):
+        with span('install', package='react') as install_event:
+            install_event['status'] = 'ok'
+        self.assertEqual(stop_profiler(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Test per-run project snapshot memoization
+"""
+import unittest
+import sys
+import os
+import tempfile
+import json
+import shutil
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.project_snapshot import get_snapshot, reset_snapshots
+
+
+class TestProjectSnapshot(unittest.TestCase):
+    """Test memoization and lockfile-driven invalidation"""
+
+    def setUp(self):
+        reset_snapshots()
+        self.test_dir = tempfile.mkdtemp()
+        self.write_json('package.json', {'name': 'app', 'scripts': {'test': 'jest'}})
+        self.write_json('package-lock.json', {'lockfileVersion': 3, 'packages': {'': {}}})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_json(self, name, data):
+        with open(os.path.join(self.test_dir, name), 'w') as f:
+            json.dump(data, f)
+
+    def test_memoize_computes_once(self):
+        """Test that values are computed once while the project is unchanged"""
+        compute = MagicMock(return_value={'a': 1})
+        snapshot = get_snapshot(self.test_dir)
+
+        snapshot.memoize('outdated', compute)
+        snapshot.memoize('outdated', compute)
+
+        compute.assert_called_once()
+
+    def test_failures_not_memoized(self):
+        """Test that a None (failed) result is computed again on the next call"""
+        compute = MagicMock(return_value=None)
+        snapshot = get_snapshot(self.test_dir)
+
+        snapshot.memoize('dependency_graph', compute)
+        snapshot.memoize('dependency_graph', compute)
+
+        self.assertEqual(compute.call_count, 2)
+
+    def test_lockfile_change_invalidates(self):
+        """Test that an install rewriting the lockfile drops cached values"""
+        compute = MagicMock(return_value={'a': 1})
+        snapshot = get_snapshot(self.test_dir)
+
+        snapshot.memoize('outdated', compute)
+        self.write_json('package-lock.json', {'lockfileVersion': 3, 'packages': {'': {}, 'node_modules/a': {}}})
+        snapshot.memoize('outdated', compute)
+
+        self.assertEqual(compute.call_count, 2)
+
+    def test_identical_rewrite_keeps_cache(self):
+        """Test that rewriting the lockfile with the same content keeps cached values"""
+        compute = MagicMock(return_value={'a': 1})
+        snapshot = get_snapshot(self.test_dir)
+
+        snapshot.memoize('outdated', compute)
+        os.utime(os.path.join(self.test_dir, 'package-lock.json'), ns=(0, 0))
+        snapshot.memoize('outdated', compute)
+
+        compute.assert_called_once()
+
+    def test_scripts_follow_package_json(self):
+        """Test that scripts are re-read after package.json changes"""
+        snapshot = get_snapshot(self.test_dir)
+        self.assertEqual(snapshot.scripts(), {'test': 'jest'})
+
+        self.write_json('package.json', {'name': 'app', 'scripts': {'build': 'tsc', 'test': 'jest'}})
+        self.assertIn('build', snapshot.scripts())
+
+    def test_missing_project(self):
+        """Test that a missing project yields empty scripts"""
+        self.assertEqual(get_snapshot('/nonexistent/project').scripts(), {})
+
+    @patch('packUpdate.services.package_service.resolve_all_outdated_packages')
+    def test_outdated_packages_reused_within_pass(self, mock_resolve):
+        """Test that get_outdated_packages resolves once per project state"""
+        from packUpdate.services.package_service import get_outdated_packages
+
+        mock_resolve.return_value = {'a': {'current': '1.0.0', 'wanted': '1.1.0', 'latest': '2.0.0'}}
+
+        get_outdated_packages(self.test_dir)
+        result = get_outdated_packages(self.test_dir, minor_only=True)
+
+        mock_resolve.assert_called_once()
+        self.assertEqual(result, {})
+
+    @patch('packUpdate.services.package_service.resolve_all_outdated_packages')
+    def test_failed_outdated_lookup_not_reused(self, mock_resolve):
+        """Test that a failed outdated lookup is retried instead of cached as empty"""
+        from packUpdate.services.package_service import get_outdated_packages
+
+        mock_resolve.side_effect = [None, {'a': {'current': '1.0.0', 'wanted': '1.1.0', 'latest': '2.0.0'}}]
+
+        self.assertEqual(get_outdated_packages(self.test_dir), {})
+        result = get_outdated_packages(self.test_dir)
+
+        self.assertEqual(mock_resolve.call_count, 2)
+        self.assertIn('a', result)
+
+    @patch('packUpdate.services.report_service.run_breaking_change_analysis')
+    @patch('packUpdate.services.report_service.get_outdated_packages')
+    def test_safe_packages_use_given_outdated_set(self, mock_outdated, mock_analysis):
+        """Test that update ordering doesn't re-run outdated discovery or analysis"""
+        from packUpdate.services.report_service import get_safe_packages_for_update
+
+        mock_analysis.return_value = {'safeUpdates': ['a'], 'riskyUpdates': []}
+        outdated = {'a': {'current': '1.0.0', 'latest': '1.1.0'}}
+
+        get_safe_packages_for_update(self.test_dir, outdated)
+        safe = get_safe_packages_for_update(self.test_dir, outdated)
+
+        mock_outdated.assert_not_called()
+        mock_analysis.assert_called_once()
+        self.assertEqual(safe, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
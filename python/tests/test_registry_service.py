@@ -0,0 +1,120 @@
+"""
+Test the pooled, caching registry client against a local stand-in registry
+"""
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.registry_service import RegistryClient, get_registry_url, packument_url
+from tests.registry_stub import StubRegistry, make_packument
+
+
+class TestRegistryClient(unittest.TestCase):
+    """Test request reuse, disk caching and revalidation"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, 'cache')
+        self.packuments = {
+            'express': make_packument('express', ['4.18.2', '5.0.0'], homepage='https://expressjs.com'),
+            '@types/node': make_packument('@types/node', ['20.0.0'])
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def client(self, registry, ttl=300):
+        with patch.dict(os.environ, {'npm_config_registry': registry.url}):
+            client = RegistryClient(self.test_dir, cache_dir=self.cache_dir, ttl=ttl)
+            client.settings['registry'] = registry.url
+            return client
+
+    def test_one_request_per_run(self):
+        """Test that repeated lookups in one run reuse the fetched document"""
+        with StubRegistry(self.packuments) as registry:
+            client = self.client(registry)
+            for _ in range(3):
+                client.get_packument('express')
+            self.assertEqual(len(registry.requests), 1)
+
+    def test_full_document_serves_abbreviated_lookups(self):
+        """Test that a full packument satisfies later abbreviated lookups"""
+        with StubRegistry(self.packuments) as registry:
+            client = self.client(registry)
+            full = client.get_packument('express', full=True)
+            client.get_packument('express')
+            self.assertEqual(full['homepage'], 'https://expressjs.com')
+            self.assertEqual(len(registry.requests), 1)
+
+    def test_disk_cache_within_ttl(self):
+        """Test that a fresh on-disk entry avoids the network entirely"""
+        with StubRegistry(self.packuments) as registry:
+            self.client(registry).get_packument('express')
+            self.client(registry).get_packument('express')
+            self.assertEqual(len(registry.requests), 1)
+
+    def test_expired_cache_revalidates_with_etag(self):
+        """Test that an expired entry is revalidated and reused on 304"""
+        with StubRegistry(self.packuments) as registry:
+            self.client(registry, ttl=0).get_packument('express')
+            client = self.client(registry, ttl=0)
+            packument = client.get_packument('express')
+            self.assertEqual(len(registry.requests), 2)
+            self.assertIn('If-None-Match', registry.requests[1][1])
+            self.assertEqual(client.stats['not_modified'], 1)
+            self.assertEqual(packument['name'], 'express')
+
+    def test_scoped_package_url(self):
+        """Test that scoped package names are escaped for the registry"""
+        with StubRegistry(self.packuments) as registry:
+            packument = self.client(registry).get_packument('@types/node')
+            self.assertEqual(packument['name'], '@types/node')
+        self.assertEqual(packument_url('https://r/', '@types/node'), 'https://r/@types%2Fnode')
+
+    def test_version_document(self):
+        """Test that one version's document is fetched by itself, once"""
+        self.packuments['express']['versions']['5.0.0']['homepage'] = 'https://expressjs.com'
+        with StubRegistry(self.packuments) as registry:
+            client = self.client(registry)
+            for _ in range(2):
+                version = client.get_version('express', '5.0.0')
+            self.assertEqual(version['homepage'], 'https://expressjs.com')
+            self.assertEqual([name for name, _ in registry.requests], ['express/5.0.0'])
+            self.assertEqual(client.get_version('@types/node', '20.0.0')['version'], '20.0.0')
+
+    def test_full_document_serves_version_lookups(self):
+        """Test that a full packument already fetched answers version lookups"""
+        with StubRegistry(self.packuments) as registry:
+            client = self.client(registry)
+            client.get_packument('express', full=True)
+            self.assertEqual(client.get_version('express', '4.18.2')['version'], '4.18.2')
+            self.assertEqual(len(registry.requests), 1)
+
+    def test_auth_token_from_npmrc(self):
+        """Test that registry auth tokens are sent for matching hosts"""
+        with StubRegistry(self.packuments) as registry:
+            client = self.client(registry)
+            host = registry.url.split('//')[1]
+            client.settings[f'//{host}:_authToken'] = 'secret'
+            client.get_packument('express')
+            self.assertEqual(registry.requests[0][1].get('Authorization'), 'Bearer secret')
+
+
+class TestRegistryUrl(unittest.TestCase):
+    """Test registry URL resolution"""
+
+    def test_scoped_registry(self):
+        settings = {'registry': 'https://main.example/', '@corp:registry': 'https://corp.example'}
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('npm_config_registry', None)
+            self.assertEqual(get_registry_url('.', '@corp/lib', settings), 'https://corp.example/')
+            self.assertEqual(get_registry_url('.', 'lodash', settings), 'https://main.example/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Test breaking-change analysis in the report service
+"""
+import unittest
+import sys
+import os
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.report_service import analyze_breaking_changes, check_breaking_changes, check_peer_dependencies
+from packUpdate.services.project_snapshot import reset_snapshots
+from packUpdate.services.registry_service import ABBREVIATED_ACCEPT, reset_registry_clients
+from tests.registry_stub import StubRegistry, make_packument
+
+
+def fake_package_info(package_name, project_path):
+    """Registry stand-in: later packages answer faster, so completion order is reversed"""
+    time.sleep(0.02 * (5 - int(package_name[-1])))
+    peers = {'react': '*'} if package_name == 'pkg-3' else {}
+    return {'dist-tags': {'latest': '2.0.0'}, 'versions': {'2.0.0': {'peerDependencies': peers}}}
+
+
+class TestAnalyzeBreakingChanges(unittest.TestCase):
+    """Test concurrent per-package analysis"""
+
+    def setUp(self):
+        reset_snapshots()
+        self.outdated = {
+            f'pkg-{i}': {'current': '1.0.0' if i % 2 else '2.0.0', 'latest': '2.0.0'}
+            for i in range(5)
+        }
+
+    @patch('packUpdate.services.report_service.get_version_info', return_value={})
+    @patch('packUpdate.services.report_service.get_package_info', side_effect=fake_package_info)
+    def test_results_merge_in_input_order(self, *_):
+        """Test that safe/risky lists follow input order regardless of completion order"""
+        analysis = analyze_breaking_changes(self.outdated, '/fake/path', max_workers=5)
+
+        self.assertEqual(analysis['safeUpdates'], ['pkg-0', 'pkg-2', 'pkg-4'])
+        self.assertEqual(analysis['riskyUpdates'], ['pkg-1', 'pkg-3'])
+        self.assertEqual(list(analysis['breakingChanges']), list(self.outdated))
+
+    @patch('packUpdate.services.report_service.get_version_info', return_value={})
+    @patch('packUpdate.services.report_service.get_package_info', side_effect=fake_package_info)
+    def test_latency_recorded_per_package(self, *_):
+        """Test that per-package analysis latency is recorded"""
+        analysis = analyze_breaking_changes(self.outdated, '/fake/path', max_workers=2)
+
+        self.assertEqual(set(analysis['latencyMs']), set(self.outdated))
+        self.assertGreater(analysis['latencyMs']['pkg-0'], analysis['latencyMs']['pkg-4'])
+
+    def test_no_outdated_packages(self):
+        analysis = analyze_breaking_changes({}, '/fake/path')
+        self.assertEqual(analysis['safeUpdates'], [])
+        self.assertEqual(analysis['latencyMs'], {})
+
+
+class TestRegistryLookups(unittest.TestCase):
+    """Test that analysis avoids downloading full packuments"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        reset_registry_clients()
+        packument = make_packument('react-dom', ['18.0.0', '19.0.0'])
+        packument['versions']['19.0.0'].update(homepage='https://react.dev',
+                                               repository={'type': 'git', 'url': 'git+https://github.com/facebook/react.git'},
+                                               peerDependencies={'react': '^19.0.0'})
+        self.packuments = {'react-dom': packument}
+
+    def tearDown(self):
+        reset_registry_clients()
+        shutil.rmtree(self.test_dir)
+
+    def test_abbreviated_and_version_documents(self):
+        with StubRegistry(self.packuments) as registry:
+            with patch.dict(os.environ, {'npm_config_registry': registry.url,
+                                         'PACKUPDATE_CACHE_DIR': os.path.join(self.test_dir, '.cache')}):
+                breaking = check_breaking_changes('react-dom', '18.0.0', '19.0.0', self.test_dir)
+                peers = check_peer_dependencies('react-dom', self.test_dir)
+
+        self.assertEqual(breaking['changelog'], 'https://react.dev')
+        self.assertEqual(breaking['repository'], 'git+https://github.com/facebook/react.git')
+        self.assertEqual(peers['peerDependencies'], {'react': '^19.0.0'})
+        requests = {name: headers['Accept'] for name, headers in registry.requests}
+        self.assertEqual(requests, {'react-dom/19.0.0': 'application/json', 'react-dom': ABBREVIATED_ACCEPT})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Test restore points for safe-mode reverts
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.restore_service import create_restore_point
+
+
+class RestoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.project = os.path.join(self.test_dir, 'app')
+        os.makedirs(os.path.join(self.project, 'node_modules', 'lodash'))
+        self.write('package.json', '{\n  "name": "app",\n  "dependencies": {"lodash": "^4.17.0"}\n}\n')
+        self.write('package-lock.json', '{"lockfileVersion": 3, "packages": {}}')
+        self.write('node_modules/lodash/package.json', '{"version": "4.17.0"}')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.project, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def read(self, relative_path):
+        with open(os.path.join(self.project, relative_path)) as f:
+            return f.read()
+
+    def simulate_install(self):
+        """Mimic npm: rewrite manifests and replace package files"""
+        self.write('package.json', '{"name": "app", "dependencies": {"lodash": "^5.0.0"}}')
+        self.write('npm-shrinkwrap.json', '{}')
+        lodash_manifest = os.path.join(self.project, 'node_modules', 'lodash', 'package.json')
+        if os.path.exists(lodash_manifest):
+            os.remove(lodash_manifest)
+        self.write('node_modules/lodash/package.json', '{"version": "5.0.0"}')
+        self.write('node_modules/new-dep/index.js', '')
+
+
+class TestRestorePoint(RestoreTestCase):
+    """Test capturing and restoring install state"""
+
+    def test_restore_is_byte_for_byte(self):
+        before = {name: self.read(name) for name in ('package.json', 'package-lock.json',
+                                                     'node_modules/lodash/package.json')}
+        with create_restore_point(self.project) as restore_point:
+            self.simulate_install()
+            restore_point.restore()
+
+        for name, content in before.items():
+            self.assertEqual(self.read(name), content)
+        self.assertFalse(os.path.exists(os.path.join(self.project, 'npm-shrinkwrap.json')))
+        self.assertFalse(os.path.exists(os.path.join(self.project, 'node_modules', 'new-dep')))
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['app'])
+        self.assertEqual(sorted(os.listdir(self.project)), ['node_modules', 'package-lock.json', 'package.json'])
+
+    def test_restore_can_be_repeated(self):
+        restore_point = create_restore_point(self.project)
+        try:
+            for _ in range(2):
+                self.simulate_install()
+                restore_point.restore()
+                self.assertEqual(self.read('node_modules/lodash/package.json'), '{"version": "4.17.0"}')
+        finally:
+            restore_point.discard()
+
+    def test_in_place_rewrites_do_not_reach_restore_point(self):
+        """Test that a postinstall-style in-place edit of an installed file is rolled back"""
+        with create_restore_point(self.project) as restore_point:
+            with open(os.path.join(self.project, 'node_modules', 'lodash', 'package.json'), 'r+') as f:
+                f.write('{"version": "patched"}')
+            restore_point.restore()
+            self.assertEqual(self.read('node_modules/lodash/package.json'), '{"version": "4.17.0"}')
+            # Still usable after the restored tree is modified again
+            self.write('node_modules/lodash/package.json', 'changed')
+            restore_point.restore()
+        self.assertEqual(self.read('node_modules/lodash/package.json'), '{"version": "4.17.0"}')
+
+    def test_project_without_node_modules(self):
+        shutil.rmtree(os.path.join(self.project, 'node_modules'))
+        with create_restore_point(self.project) as restore_point:
+            self.simulate_install()
+            restore_point.restore()
+        self.assertFalse(os.path.exists(os.path.join(self.project, 'node_modules')))
+
+    def test_no_restore_point_without_package_json(self):
+        self.assertIsNone(create_restore_point(os.path.join(self.test_dir, 'missing')))
+
+
+class TestSafeModeRevert(RestoreTestCase):
+    """Test that sequential safe mode restores instead of reinstalling"""
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_package')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_failed_candidates_restored_without_retest(self, mock_safe_packages, mock_install, mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        mock_safe_packages.return_value = []
+        mock_install.side_effect = lambda *args, **kwargs: self.simulate_install()
+        mock_run_tests.side_effect = Exception("Tests failed.")
+        before = self.read('package.json')
+
+        outdated = {'lodash': {'current': '4.17.0', 'wanted': '4.17.21', 'latest': '5.0.0'}}
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, self.project, True, True)
+
+        self.assertEqual(updated, [('lodash', '4.17.0', '4.17.0')])
+        self.assertEqual(failed, [])
+        self.assertEqual(self.read('package.json'), before)
+        # latest and wanted were tried; the revert neither reinstalls nor re-runs tests
+        self.assertEqual([call.args[1] for call in mock_install.call_args_list], ['5.0.0', '4.17.21'])
+        self.assertEqual(mock_run_tests.call_count, 2)
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['app'])
+        # Both trials roll back to the pass's restore point instead of taking their own
+        restore_points = {id(call.kwargs['restore_point']) for call in mock_install.call_args_list}
+        self.assertEqual(len(restore_points), 1)
+        self.assertIsNotNone(mock_install.call_args.kwargs['restore_point'])
+
+    @patch('packUpdate.services.package_service.verify_project')
+    @patch('packUpdate.services.package_service.run_command')
+    @patch('packUpdate.services.package_service.create_restore_point')
+    def test_install_uses_callers_restore_point(self, mock_create, mock_run, mock_verify):
+        from packUpdate.services.package_service import install_package
+        from packUpdate.utils.command_runner import CommandResult
+
+        mock_run.side_effect = lambda *args, **kwargs: (self.simulate_install(),
+                                                        CommandResult(args[0], 'npm install', 'passed', 0, 0.1, ''))[1]
+        mock_verify.return_value = {'passed': False, 'failed_stage': 'test', 'output_tail': ''}
+        before = self.read('package.json')
+
+        with create_restore_point(self.project) as restore_point:
+            with self.assertRaises(Exception):
+                install_package('lodash', '5.0.0', self.project, True, True, restore_point=restore_point)
+            self.assertTrue(os.path.isdir(restore_point.storage_dir))
+
+        mock_create.assert_not_called()
+        mock_verify.assert_called_once()
+        self.assertEqual(self.read('package.json'), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
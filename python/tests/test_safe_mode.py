@@ -38,7 +38,7 @@ class TestSafeModeRevert(unittest.TestCase):
         )
         
         # Should have tried latest version
-        mock_install.assert_called_with('express', '5.0.0', '/fake/path', True, True)
+        mock_install.assert_called_with('express', '5.0.0', '/fake/path', True, True, restore_point=None)
         
         # Should succeed with latest
         self.assertEqual(len(updated), 1)
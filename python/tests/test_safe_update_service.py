@@ -0,0 +1,247 @@
+"""
+Test safe-mode update strategies
+"""
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.safe_update_service import (
+    group_test, find_highest_passing_version, get_candidate_versions, reset_version_trials
+)
+from packUpdate.services.registry_service import reset_registry_clients
+from tests.registry_stub import StubRegistry, make_packument
+
+
+class FakeProject:
+    """Tracks applied candidates; verification fails while any bad candidate is applied"""
+
+    def __init__(self, bad):
+        self.bad = set(bad)
+        self.applied = set()
+        self.verifications = 0
+
+    def apply(self, batch):
+        self.applied.update(batch)
+
+    def revert(self, batch):
+        self.applied.difference_update(batch)
+
+    def verify(self):
+        self.verifications += 1
+        return not (self.applied & self.bad)
+
+
+class TestGroupTest(unittest.TestCase):
+    """Test batch verification with bisection on failure"""
+
+    def run_group_test(self, candidates, bad):
+        project = FakeProject(bad)
+        passed, failed = group_test(candidates, project.apply, project.revert, project.verify)
+        return project, passed, failed
+
+    def test_clean_batch_verified_once(self):
+        project, passed, failed = self.run_group_test(list(range(16)), bad=[])
+        self.assertEqual(project.verifications, 1)
+        self.assertEqual(passed, list(range(16)))
+        self.assertEqual(failed, [])
+
+    def test_single_offender_isolated_in_log_steps(self):
+        project, passed, failed = self.run_group_test(list(range(16)), bad=[11])
+        self.assertEqual(failed, [11])
+        self.assertEqual(passed, [i for i in range(16) if i != 11])
+        self.assertEqual(project.applied, set(passed))
+        self.assertLessEqual(project.verifications, 1 + 2 * 4)
+
+    def test_multiple_offenders(self):
+        project, passed, failed = self.run_group_test(list(range(10)), bad=[0, 7, 8])
+        self.assertEqual(failed, [0, 7, 8])
+        self.assertEqual(project.applied, set(range(10)) - {0, 7, 8})
+
+    def test_all_bad(self):
+        project, passed, failed = self.run_group_test(['a', 'b', 'c'], bad=['a', 'b', 'c'])
+        self.assertEqual(passed, [])
+        self.assertEqual(failed, ['a', 'b', 'c'])
+        self.assertEqual(project.applied, set())
+
+    def test_empty(self):
+        project, passed, failed = self.run_group_test([], bad=[])
+        self.assertEqual((passed, failed, project.verifications), ([], [], 0))
+
+
+class TestGroupTestingSafeMode(unittest.TestCase):
+    """Test the bisect strategy wired into update_packages_in_order"""
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_packages')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_bad_latest_falls_back_to_wanted(self, mock_safe_packages, mock_install, mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        installed = {}
+
+        def install(pairs, project_path, quiet_mode):
+            installed.update(pairs)
+            return [package for package, _ in pairs], {}
+
+        def run_tests(project_path, quiet_mode):
+            if installed.get('express') == '5.0.0':
+                raise Exception("Tests failed.")
+
+        mock_safe_packages.return_value = []
+        mock_install.side_effect = install
+        mock_run_tests.side_effect = run_tests
+
+        outdated = {
+            'express': {'current': '4.0.0', 'wanted': '4.21.0', 'latest': '5.0.0'},
+            'lodash': {'current': '4.0.0', 'wanted': '4.17.21', 'latest': '4.17.21'}
+        }
+
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, '/fake/path',
+                                                   True, True, safe_strategy='bisect')
+
+        self.assertEqual(updated, [('express', '4.0.0', '4.21.0'), ('lodash', '4.0.0', '4.17.21')])
+        self.assertEqual(failed, [])
+        self.assertEqual(installed, {'express': '4.21.0', 'lodash': '4.17.21'})
+
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_packages')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_package_failing_at_latest_and_wanted_reported(self, mock_safe_packages, mock_install, mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        installed = {}
+
+        def install(pairs, project_path, quiet_mode):
+            installed.update(pairs)
+            return [package for package, _ in pairs], {}
+
+        def run_tests(project_path, quiet_mode):
+            if installed.get('express', '4.0.0') != '4.0.0':
+                raise Exception("Tests failed.")
+
+        mock_safe_packages.return_value = []
+        mock_install.side_effect = install
+        mock_run_tests.side_effect = run_tests
+
+        outdated = {
+            'express': {'current': '4.0.0', 'wanted': '4.21.0', 'latest': '5.0.0'},
+            'lodash': {'current': '4.0.0', 'wanted': '4.17.21', 'latest': '4.17.21'}
+        }
+
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, '/fake/path',
+                                                   True, True, safe_strategy='bisect')
+
+        self.assertEqual(updated, [('express', '4.0.0', '4.0.0'), ('lodash', '4.0.0', '4.17.21')])
+        self.assertEqual(failed, ['express'])
+
+
+class TestFindHighestPassingVersion(unittest.TestCase):
+    """Test binary search for the highest passing version"""
+
+    def search(self, versions, last_good, tested=None):
+        trials = []
+
+        def try_version(version):
+            trials.append(version)
+            return versions.index(version) <= versions.index(last_good) if last_good else False
+
+        return find_highest_passing_version(versions, try_version, tested), trials
+
+    def test_latest_passing_costs_one_trial(self):
+        versions = [f"1.{minor}.0" for minor in range(1, 33)]
+        best, trials = self.search(versions, versions[-1])
+        self.assertEqual(best, versions[-1])
+        self.assertEqual(trials, [versions[-1]])
+
+    def test_finds_boundary_in_log_trials(self):
+        versions = [f"1.{minor}.0" for minor in range(1, 33)]
+        for last_good in (versions[0], versions[9], versions[-2]):
+            best, trials = self.search(versions, last_good)
+            self.assertEqual(best, last_good)
+            self.assertLessEqual(len(trials), 1 + 5)
+            self.assertEqual(len(trials), len(set(trials)))
+
+    def test_nothing_passes(self):
+        best, trials = self.search(['1.1.0', '1.2.0', '1.3.0'], None)
+        self.assertIsNone(best)
+        self.assertEqual(self.search([], None), (None, []))
+
+    def test_tested_versions_are_not_retried(self):
+        versions = ['1.1.0', '1.2.0', '1.3.0', '1.4.0', '1.5.0']
+        tested = {}
+        first, first_trials = self.search(versions, '1.2.0', tested)
+        second, second_trials = self.search(versions, '1.2.0', tested)
+        self.assertEqual((first, second), ('1.2.0', '1.2.0'))
+        self.assertTrue(first_trials)
+        self.assertEqual(second_trials, [])
+
+
+class TestGetCandidateVersions(unittest.TestCase):
+    """Test listing published versions between current and latest"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        reset_registry_clients()
+
+    def tearDown(self):
+        reset_registry_clients()
+        shutil.rmtree(self.test_dir)
+
+    def test_skips_prereleases_and_deprecated(self):
+        packument = make_packument('pkg', ['1.0.0', '1.1.0', '1.2.0', '2.0.0-beta.1', '2.0.0', '2.1.0'],
+                                   latest='2.0.0')
+        packument['versions']['1.2.0']['deprecated'] = 'broken release'
+        with StubRegistry({'pkg': packument}) as registry:
+            with patch.dict(os.environ, {'npm_config_registry': registry.url,
+                                         'PACKUPDATE_CACHE_DIR': os.path.join(self.test_dir, '.cache')}):
+                versions = get_candidate_versions('pkg', '1.0.0', '2.0.0', self.test_dir)
+        self.assertEqual(versions, ['1.1.0', '2.0.0'])
+
+
+class TestVersionSearchSafeMode(unittest.TestCase):
+    """Test the search strategy wired into update_packages_in_order"""
+
+    def setUp(self):
+        reset_version_trials()
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_package')
+    @patch('packUpdate.updatePackages.get_candidate_versions')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_installs_highest_passing_version(self, mock_safe_packages, mock_versions, mock_install, mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        installed = {}
+
+        def install(package, version, project_path, safe_mode, quiet_mode, restore_point=None):
+            installed[package] = version
+
+        def run_tests(project_path, quiet_mode):
+            if installed.get('express') >= '4.20.0':
+                raise Exception("Tests failed.")
+
+        mock_safe_packages.return_value = []
+        mock_versions.return_value = ['4.17.0', '4.18.0', '4.19.0', '4.20.0', '4.21.0']
+        mock_install.side_effect = install
+        mock_run_tests.side_effect = run_tests
+
+        outdated = {'express': {'current': '4.16.0', 'wanted': '4.21.0', 'latest': '4.21.0'}}
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, '/fake/path',
+                                                   True, True, safe_strategy='search')
+
+        self.assertEqual(updated, [('express', '4.16.0', '4.19.0')])
+        self.assertEqual(failed, [])
+        self.assertEqual(installed['express'], '4.19.0')
+        tried = [call.args[1] for call in mock_install.call_args_list]
+        # latest first, then the search, then the winner is reinstalled after the failing 4.20.0 trial
+        self.assertEqual(tried, ['4.21.0', '4.18.0', '4.19.0', '4.20.0', '4.19.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Test sandbox project copies and parallel trials
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils.fs import clone_tree
+from packUpdate.services.sandbox_service import project_sandbox, run_trials
+
+
+class SandboxTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.project = os.path.join(self.test_dir, 'app')
+        self.sandbox_root = os.path.join(self.test_dir, 'sandboxes')
+        os.makedirs(os.path.join(self.project, 'node_modules', 'lodash'))
+        os.makedirs(os.path.join(self.project, 'src'))
+        os.makedirs(os.path.join(self.project, '.git'))
+        os.makedirs(self.sandbox_root)
+        self.write('package.json', json.dumps({'name': 'app', 'dependencies': {'lodash': '^4.0.0'}}))
+        self.write('src/index.js', 'module.exports = 1;\n')
+        self.write('node_modules/lodash/index.js', '// lodash\n')
+        self.write('.git/HEAD', 'ref: refs/heads/main\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, relative_path, content, root=None):
+        with open(os.path.join(root or self.project, relative_path), 'w') as f:
+            f.write(content)
+
+    def read(self, relative_path, root=None):
+        with open(os.path.join(root or self.project, relative_path)) as f:
+            return f.read()
+
+
+class TestCloneTree(SandboxTestCase):
+    """Test cheap project copies"""
+
+    def test_clone_contents(self):
+        destination = os.path.join(self.sandbox_root, 'app')
+        method = clone_tree(self.project, destination)
+        self.assertIn(method, ('reflink', 'copy'))
+        self.assertEqual(self.read('src/index.js', destination), 'module.exports = 1;\n')
+        self.assertEqual(self.read('node_modules/lodash/index.js', destination), '// lodash\n')
+        self.assertFalse(os.path.exists(os.path.join(destination, '.git')))
+
+    def test_project_files_are_independent_copies(self):
+        destination = os.path.join(self.sandbox_root, 'app')
+        clone_tree(self.project, destination)
+        self.write('package.json', '{}', destination)
+        self.assertIn('lodash', self.read('package.json'))
+
+    @patch('packUpdate.utils.fs._reflink_tree', return_value=False)
+    def test_node_modules_copied_without_reflink(self, _):
+        destination = os.path.join(self.sandbox_root, 'app')
+        self.assertEqual(clone_tree(self.project, destination), 'copy')
+        self.write('node_modules/lodash/index.js', '// patched in the sandbox\n', destination)
+        self.assertEqual(self.read('node_modules/lodash/index.js'), '// lodash\n')
+
+    @patch('packUpdate.utils.fs._reflink_tree', return_value=False)
+    def test_node_modules_hardlinked_when_allowed(self, _):
+        destination = os.path.join(self.sandbox_root, 'app')
+        self.assertEqual(clone_tree(self.project, destination, allow_hardlinks=True), 'hardlink')
+        original = os.stat(os.path.join(self.project, 'node_modules', 'lodash', 'index.js'))
+        cloned = os.stat(os.path.join(destination, 'node_modules', 'lodash', 'index.js'))
+        self.assertEqual(original.st_ino, cloned.st_ino)
+
+
+class TestRunTrials(SandboxTestCase):
+    """Test running candidates concurrently in sandboxes"""
+
+    def test_sandbox_removed_after_use(self):
+        with project_sandbox(self.project, self.sandbox_root) as sandbox_path:
+            self.assertTrue(os.path.isfile(os.path.join(sandbox_path, 'package.json')))
+        self.assertEqual(os.listdir(self.sandbox_root), [])
+
+    def test_trials_are_isolated_and_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+        seen = {}
+
+        def trial(sandbox_path, candidate):
+            barrier.wait()  # all three trials must be running at once
+            self.write('package.json', json.dumps({'candidate': candidate}), sandbox_path)
+            seen[candidate] = sandbox_path
+            if candidate == 'bad':
+                raise Exception("Tests failed.")
+            return candidate != 'fails'
+
+        passed, failed = run_trials(self.project, ['ok', 'bad', 'fails'], trial,
+                                    max_workers=3, root=self.sandbox_root)
+
+        self.assertEqual(passed, ['ok'])
+        self.assertEqual(failed, ['bad', 'fails'])
+        self.assertEqual(len(set(seen.values())), 3)
+        self.assertIn('lodash', self.read('package.json'))
+        self.assertEqual(os.listdir(self.sandbox_root), [])
+
+
+class TestParallelSafeMode(unittest.TestCase):
+    """Test the parallel strategy wired into update_packages_in_order"""
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_packages')
+    @patch('packUpdate.updatePackages.run_trials')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_winners_applied_to_project(self, mock_safe_packages, mock_run_trials, mock_install, mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        def run_trials(project_path, candidates, trial):
+            passed = [candidate for candidate in candidates if candidate != ('express', '5.0.0')]
+            return passed, [candidate for candidate in candidates if candidate not in passed]
+
+        installed = {}
+
+        def install(pairs, project_path, quiet_mode):
+            installed.update(pairs)
+            return [package for package, _ in pairs], {}
+
+        mock_safe_packages.return_value = []
+        mock_run_trials.side_effect = run_trials
+        mock_install.side_effect = install
+
+        outdated = {
+            'express': {'current': '4.0.0', 'wanted': '4.21.0', 'latest': '5.0.0'},
+            'lodash': {'current': '4.0.0', 'wanted': '4.17.21', 'latest': '4.17.21'}
+        }
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, '/fake/path',
+                                                   True, True, safe_strategy='parallel')
+
+        self.assertEqual(updated, [('express', '4.0.0', '4.21.0'), ('lodash', '4.0.0', '4.17.21')])
+        self.assertEqual(failed, [])
+        # Winners from both rounds go to the real project in one install and one verification
+        mock_install.assert_called_once_with([('express', '4.21.0'), ('lodash', '4.17.21')], '/fake/path', True)
+        mock_run_tests.assert_called_once_with('/fake/path', True)
+
+
+    @patch('packUpdate.updatePackages.run_tests')
+    @patch('packUpdate.updatePackages.install_packages')
+    @patch('packUpdate.updatePackages.run_trials')
+    @patch('packUpdate.services.report_service.get_safe_packages_for_update')
+    def test_losers_and_rejected_winners_reported(self, mock_safe_packages, mock_run_trials, mock_install,
+                                                  mock_run_tests):
+        from packUpdate.updatePackages import update_packages_in_order
+
+        def run_trials(project_path, candidates, trial):
+            passed = [candidate for candidate in candidates if candidate[0] != 'express']
+            return passed, [candidate for candidate in candidates if candidate not in passed]
+
+        installed = {}
+
+        def install(pairs, project_path, quiet_mode):
+            installed.update(pairs)
+            return [package for package, _ in pairs], {}
+
+        def run_tests(project_path, quiet_mode):
+            # react and vue pass on their own but break when applied together
+            if installed.get('react') == '19.0.0' and installed.get('vue') == '3.5.0':
+                raise Exception("Tests failed.")
+
+        mock_safe_packages.return_value = []
+        mock_run_trials.side_effect = run_trials
+        mock_install.side_effect = install
+        mock_run_tests.side_effect = run_tests
+
+        outdated = {
+            'express': {'current': '4.0.0', 'wanted': '4.21.0', 'latest': '5.0.0'},
+            'react': {'current': '18.0.0', 'wanted': '18.3.1', 'latest': '19.0.0'},
+            'vue': {'current': '3.0.0', 'wanted': '3.5.0', 'latest': '3.5.0'}
+        }
+        updated, failed = update_packages_in_order(outdated, {'dependencies': {}}, '/fake/path',
+                                                   True, True, safe_strategy='parallel')
+
+        self.assertEqual(dict((package, final) for package, _, final in updated),
+                         {'express': '4.0.0', 'react': '19.0.0', 'vue': '3.0.0'})
+        self.assertEqual(sorted(failed), ['express', 'vue'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Test semver parsing and npm range matching
+"""
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.utils.semver import satisfies, compare_versions, VersionIndex
+
+
+class TestSatisfies(unittest.TestCase):
+    """Test npm range semantics"""
+
+    def test_caret_ranges(self):
+        self.assertTrue(satisfies('1.9.0', '^1.2.3'))
+        self.assertFalse(satisfies('2.0.0', '^1.2.3'))
+        self.assertTrue(satisfies('0.2.9', '^0.2.3'))
+        self.assertFalse(satisfies('0.3.0', '^0.2.3'))
+        self.assertFalse(satisfies('0.0.4', '^0.0.3'))
+
+    def test_tilde_and_x_ranges(self):
+        self.assertTrue(satisfies('1.2.9', '~1.2.3'))
+        self.assertFalse(satisfies('1.3.0', '~1.2.3'))
+        self.assertTrue(satisfies('1.8.0', '1.x'))
+        self.assertFalse(satisfies('2.0.0', '1.x'))
+        self.assertTrue(satisfies('3.0.0', '*'))
+
+    def test_comparators_hyphens_and_unions(self):
+        self.assertTrue(satisfies('2.5.0', '>=2.0.0 <3.0.0'))
+        self.assertTrue(satisfies('2.6.9', '1.2.3 - 2.6'))
+        self.assertFalse(satisfies('2.7.0', '1.2.3 - 2.6'))
+        self.assertTrue(satisfies('5.1.0', '^4.0.0 || ^5.0.0'))
+
+    def test_prereleases(self):
+        self.assertFalse(satisfies('2.0.0-beta.1', '^1.0.0'))
+        self.assertTrue(satisfies('1.2.4-beta.2', '^1.2.4-beta.1'))
+        self.assertFalse(satisfies('1.3.0-beta.1', '^1.2.4-beta.1'))
+
+    def test_compare_versions(self):
+        self.assertEqual(compare_versions('1.10.0', '1.9.0'), 1)
+        self.assertEqual(compare_versions('1.0.0-rc.1', '1.0.0'), -1)
+        self.assertEqual(compare_versions('1.0.0-alpha.2', '1.0.0-alpha.10'), -1)
+
+
+class TestVersionIndex(unittest.TestCase):
+    """Test the sorted version index"""
+
+    def setUp(self):
+        self.index = VersionIndex(['2.0.0', '1.0.0', '1.10.0', '1.2.0', '2.0.0-rc.1', '2.1.0', '3.0.0-beta'])
+
+    def test_max_satisfying(self):
+        self.assertEqual(self.index.max_satisfying('^1.0.0'), '1.10.0')
+        self.assertEqual(self.index.max_satisfying('^2.0.0'), '2.1.0')
+        self.assertEqual(self.index.max_satisfying('*'), '2.1.0')
+        self.assertIsNone(self.index.max_satisfying('^9.0.0'))
+
+    def test_between(self):
+        self.assertEqual(self.index.between('1.0.0', '2.1.0'), ['1.2.0', '1.10.0', '2.0.0', '2.1.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
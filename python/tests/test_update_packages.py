@@ -6,6 +6,7 @@ import os
 import sys
 import tempfile
 import json
+import shutil
 from unittest.mock import patch, MagicMock, call
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -16,6 +17,8 @@ from packUpdate.updatePackages import (
     execute_script_if_exist,
     run_tests
 )
+from packUpdate.services.verification_cache import reset_verification_cache
+from packUpdate.services.verification_service import reset_verification_results
 
 
 class TestValidateProjectPath(unittest.TestCase):
@@ -192,43 +195,69 @@ class TestExecuteScriptIfExist(unittest.TestCase):
 class TestRunTests(unittest.TestCase):
     """Test the run_tests function"""
 
-    @patch('packUpdate.updatePackages.execute_script_if_exist')
-    def test_both_scripts_succeed(self, mock_execute):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, 'package.json'), 'w') as f:
+            json.dump({'name': 'app', 'scripts': {'build': 'tsc', 'test': 'jest'}}, f)
+        self.env = patch.dict(os.environ, {'PACKUPDATE_CACHE_DIR': os.path.join(self.test_dir, '.cache')})
+        self.env.start()
+        reset_verification_cache()
+        reset_verification_results()
+
+    def tearDown(self):
+        self.env.stop()
+        reset_verification_cache()
+        reset_verification_results()
+        shutil.rmtree(self.test_dir)
+
+    def stage_results(self, **statuses):
+        return lambda stage, *args: (statuses[stage.name], '')
+
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_both_scripts_succeed(self, mock_stage):
         """Test when both build and test scripts succeed"""
-        mock_execute.return_value = True
+        mock_stage.side_effect = self.stage_results(build='passed', test='passed')
         
         try:
-            run_tests('/fake/path', quiet_mode=True)
+            run_tests(self.test_dir, quiet_mode=True)
         except Exception:
             self.fail("run_tests raised exception when scripts succeed")
+        self.assertEqual([c.args[0].name for c in mock_stage.call_args_list], ['build', 'test'])
 
-    @patch('packUpdate.updatePackages.execute_script_if_exist')
-    def test_build_fails(self, mock_execute):
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_build_fails(self, mock_stage):
         """Test when build script fails"""
-        mock_execute.side_effect = [False, True]  # build fails, test succeeds
+        mock_stage.side_effect = self.stage_results(build='failed', test='passed')
         
         with self.assertRaises(Exception) as context:
-            run_tests('/fake/path', quiet_mode=True)
+            run_tests(self.test_dir, quiet_mode=True)
         self.assertIn("Tests failed", str(context.exception))
+        # Tests wait for the build, so a broken build stops the pipeline
+        self.assertEqual(mock_stage.call_count, 1)
 
-    @patch('packUpdate.updatePackages.execute_script_if_exist')
-    def test_test_fails(self, mock_execute):
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_test_fails(self, mock_stage):
         """Test when test script fails"""
-        mock_execute.side_effect = [True, False]  # build succeeds, test fails
+        mock_stage.side_effect = self.stage_results(build='passed', test='failed')
         
         with self.assertRaises(Exception) as context:
-            run_tests('/fake/path', quiet_mode=True)
+            run_tests(self.test_dir, quiet_mode=True)
         self.assertIn("Tests failed", str(context.exception))
 
-    @patch('packUpdate.updatePackages.execute_script_if_exist')
-    def test_both_scripts_fail(self, mock_execute):
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_both_scripts_fail(self, mock_stage):
         """Test when both scripts fail"""
-        mock_execute.return_value = False
+        mock_stage.side_effect = self.stage_results(build='failed', test='failed')
         
         with self.assertRaises(Exception) as context:
-            run_tests('/fake/path', quiet_mode=True)
+            run_tests(self.test_dir, quiet_mode=True)
         self.assertIn("Tests failed", str(context.exception))
 
+    def test_missing_package_json_fails(self):
+        """Test that a project without package.json does not verify"""
+        with self.assertRaises(Exception):
+            run_tests(os.path.join(self.test_dir, 'missing'), quiet_mode=True)
+
 
 if __name__ == '__main__':
     unittest.main()
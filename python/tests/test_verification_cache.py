@@ -0,0 +1,155 @@
+"""
+Test the persistent verification result cache
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.verification_cache import (
+    VerificationCache, verification_key, reset_verification_cache
+)
+from packUpdate.services.verification_service import reset_verification_results
+
+
+class VerificationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.project = os.path.join(self.test_dir, 'app')
+        os.makedirs(os.path.join(self.project, 'src'))
+        os.makedirs(os.path.join(self.project, 'node_modules', 'lodash'))
+        self.write('package.json', json.dumps({'name': 'app', 'scripts': {'test': 'jest'}}))
+        self.write('package-lock.json', json.dumps({'lockfileVersion': 3}))
+        self.write('src/index.js', 'module.exports = 1;\n')
+        self.write('node_modules/lodash/index.js', '')
+        self.cache_dir = os.path.join(self.test_dir, '.cache')
+        self.env = patch.dict(os.environ, {'PACKUPDATE_CACHE_DIR': self.cache_dir})
+        self.env.start()
+        reset_verification_cache()
+
+    def tearDown(self):
+        self.env.stop()
+        reset_verification_cache()
+        shutil.rmtree(self.test_dir)
+
+    def write(self, relative_path, content):
+        with open(os.path.join(self.project, relative_path), 'w') as f:
+            f.write(content)
+
+
+class TestVerificationKey(VerificationTestCase):
+    """Test fingerprinting of the verified project state"""
+
+    def test_key_is_stable(self):
+        self.assertEqual(verification_key(self.project), verification_key(self.project))
+
+    def test_key_follows_lockfile_manifest_and_sources(self):
+        seen = {verification_key(self.project)}
+        for name, content in (('package-lock.json', '{"lockfileVersion": 2}'),
+                              ('package.json', '{"name": "app"}'),
+                              ('src/index.js', 'module.exports = 2;\n')):
+            self.write(name, content)
+            seen.add(verification_key(self.project))
+        self.assertEqual(len(seen), 4)
+
+    def test_installed_packages_ignored(self):
+        key = verification_key(self.project)
+        self.write('node_modules/lodash/index.js', 'changed')
+        self.assertEqual(verification_key(self.project), key)
+
+    def test_no_key_without_package_json(self):
+        self.assertIsNone(verification_key(os.path.join(self.test_dir, 'missing')))
+
+
+class TestVerificationCache(VerificationTestCase):
+    """Test storing, expiring and clearing results"""
+
+    def test_round_trip(self):
+        cache = VerificationCache(self.cache_dir)
+        key = verification_key(self.project)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, False, 12.5)
+        entry = VerificationCache(self.cache_dir).get(key)
+        self.assertFalse(entry['passed'])
+        self.assertEqual(entry['duration'], 12.5)
+
+    def test_expired_entries_ignored(self):
+        cache = VerificationCache(self.cache_dir, max_age=60)
+        cache.put('abc', True, 1.0)
+        with patch('packUpdate.services.verification_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get('abc'))
+
+    def test_eviction_keeps_newest(self):
+        cache = VerificationCache(self.cache_dir, max_entries=2)
+        for index, key in enumerate(('a', 'b', 'c')):
+            cache.put(key, True, 1.0)
+            stamp = time.time() - 10 + index
+            os.utime(os.path.join(self.cache_dir, f"{key}.json"), (stamp, stamp))
+        cache.evict()
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_clear(self):
+        cache = VerificationCache(self.cache_dir)
+        cache.put('a', True, 1.0)
+        cache.put('b', False, 1.0)
+        self.assertEqual(cache.clear(), 2)
+        self.assertIsNone(cache.get('a'))
+
+
+class TestRunTestsCaching(VerificationTestCase):
+    """Test that run_tests reuses results for an already verified state"""
+
+    def setUp(self):
+        super().setUp()
+        reset_verification_results()
+
+    def tearDown(self):
+        reset_verification_results()
+        super().tearDown()
+
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_results_reused_across_runs(self, mock_stage):
+        from packUpdate.updatePackages import run_tests
+
+        mock_stage.return_value = ('passed', '')
+        run_tests(self.project, True)
+        run_tests(self.project, True)
+        self.assertEqual(mock_stage.call_count, 1)
+
+        # A new run (fresh in-memory results) still finds it on disk
+        reset_verification_results()
+        run_tests(self.project, True)
+        self.assertEqual(mock_stage.call_count, 1)
+
+        self.write('src/index.js', 'module.exports = 2;\n')
+        mock_stage.return_value = ('failed', 'FAIL src/index.test.js')
+        with self.assertRaises(Exception):
+            run_tests(self.project, True)
+        with self.assertRaises(Exception):
+            run_tests(self.project, True)
+        self.assertEqual(mock_stage.call_count, 2)
+
+    @patch('packUpdate.services.verification_service.run_stage')
+    def test_failures_not_persisted(self, mock_stage):
+        from packUpdate.updatePackages import run_tests
+
+        mock_stage.return_value = ('timeout', '')
+        with self.assertRaises(Exception):
+            run_tests(self.project, True)
+
+        # The next run verifies the same state again
+        reset_verification_results()
+        mock_stage.return_value = ('passed', '')
+        run_tests(self.project, True)
+        self.assertEqual(mock_stage.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
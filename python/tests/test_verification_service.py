@@ -0,0 +1,177 @@
+"""
+Test the verification pipeline
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.project_snapshot import reset_snapshots
+from packUpdate.utils.command_stats import get_command_stats, package_scope, reset_command_stats
+from packUpdate.services.verification_service import (
+    DEFAULT_FAILURE_PATTERNS, Stage, describe_failure, load_stages, run_pipeline, set_verify_stages
+)
+
+
+class TestLoadStages(unittest.TestCase):
+    """Test resolving declared stages"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        reset_snapshots()
+
+    def tearDown(self):
+        set_verify_stages(None)
+        reset_snapshots()
+        shutil.rmtree(self.test_dir)
+
+    def write_package_json(self, data):
+        with open(os.path.join(self.test_dir, 'package.json'), 'w') as f:
+            json.dump(data, f)
+
+    def describe(self, stages):
+        return [(stage.name, stage.command, stage.after) for stage in stages]
+
+    def test_defaults_to_build_then_test(self):
+        self.write_package_json({'scripts': {'build': 'tsc', 'test': 'jest', 'lint': 'eslint .'}})
+        self.assertEqual(self.describe(load_stages(self.test_dir)), [
+            ('build', ['npm', 'run', 'build'], ()),
+            ('test', ['npm', 'run', 'test'], ('build',))
+        ])
+
+    def test_missing_scripts_skipped(self):
+        self.write_package_json({'scripts': {'test': 'jest'}})
+        self.assertEqual(self.describe(load_stages(self.test_dir)), [('test', ['npm', 'run', 'test'], ())])
+
+    def test_declared_stages_and_custom_commands(self):
+        self.write_package_json({
+            'scripts': {'build': 'tsc', 'test': 'jest', 'lint': 'eslint .'},
+            'packUpdate': {'verify': ['lint', 'build', {'name': 'e2e', 'command': 'npx playwright test',
+                                                        'after': ['build']}]}
+        })
+        self.assertEqual(self.describe(load_stages(self.test_dir)), [
+            ('lint', ['npm', 'run', 'lint'], ()),
+            ('build', ['npm', 'run', 'build'], ()),
+            ('e2e', 'npx playwright test', ('build',))
+        ])
+
+    def test_failure_patterns(self):
+        self.write_package_json({
+            'scripts': {'build': 'tsc', 'test': 'jest'},
+            'packUpdate': {'verify': ['build', {'name': 'test', 'failOn': ['FAIL ']}],
+                           'failurePatterns': {'build': ['error']}}
+        })
+        stages = load_stages(self.test_dir)
+        self.assertEqual([stage.failure_patterns for stage in stages], [('error',), ('FAIL ',)])
+
+    def test_no_failure_patterns_unless_configured(self):
+        self.write_package_json({'scripts': {'build': 'tsc', 'test': 'jest'}})
+        self.assertEqual([stage.failure_patterns for stage in load_stages(self.test_dir)], [(), ()])
+
+    def test_builtin_failure_patterns_opt_in(self):
+        self.write_package_json({
+            'scripts': {'build': 'tsc', 'test': 'jest', 'lint': 'eslint .'},
+            'packUpdate': {'verify': ['lint', 'build', {'name': 'test', 'failOn': True}],
+                           'failurePatterns': {'build': True}}
+        })
+        stages = load_stages(self.test_dir)
+        self.assertEqual([stage.failure_patterns for stage in stages],
+                         [(), DEFAULT_FAILURE_PATTERNS['build'], DEFAULT_FAILURE_PATTERNS['test']])
+
+        self.write_package_json({'scripts': {'build': 'tsc'}, 'packUpdate': {'failurePatterns': True}})
+        self.assertEqual(load_stages(self.test_dir)[0].failure_patterns, DEFAULT_FAILURE_PATTERNS['build'])
+
+    def test_override(self):
+        self.write_package_json({'scripts': {'build': 'tsc', 'test': 'jest', 'lint': 'eslint .'}})
+        set_verify_stages(['lint', 'test'])
+        self.assertEqual([stage.name for stage in load_stages(self.test_dir)], ['lint', 'test'])
+
+    def test_unreadable_package_json(self):
+        self.assertIsNone(load_stages(self.test_dir))
+
+
+class TestRunPipeline(unittest.TestCase):
+    """Test running stages with real commands"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_independent_stages_run_concurrently(self):
+        stages = [Stage('lint', 'sleep 0.5'), Stage('typecheck', 'sleep 0.5'), Stage('build', 'sleep 0.5')]
+        started = time.perf_counter()
+        result = run_pipeline(stages, self.test_dir, True)
+        self.assertTrue(result['passed'])
+        self.assertLess(time.perf_counter() - started, 1.2)
+        self.assertEqual([stage['status'] for stage in result['stages']], ['passed'] * 3)
+
+    def test_ordering_respected(self):
+        marker = os.path.join(self.test_dir, 'built')
+        stages = [Stage('test', f'test -f {marker}', after=['build']), Stage('build', f'sleep 0.2 && touch {marker}')]
+        self.assertTrue(run_pipeline(stages, self.test_dir, True)['passed'])
+
+    def test_first_failure_stops_the_rest(self):
+        stages = [Stage('lint', 'exit 1'), Stage('build', 'sleep 30'), Stage('test', 'true', after=['build'])]
+        started = time.perf_counter()
+        result = run_pipeline(stages, self.test_dir, True)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertFalse(result['passed'])
+        self.assertEqual(result['failed_stage'], 'lint')
+        self.assertEqual([stage['status'] for stage in result['stages']], ['failed', 'cancelled', 'skipped'])
+
+    def test_failure_output_stops_stage(self):
+        stages = [Stage('build', 'echo "ERROR in ./src/index.js"; sleep 30', failure_patterns=[r'^ERROR in '])]
+        started = time.perf_counter()
+        result = run_pipeline(stages, self.test_dir, True)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(result['failed_stage'], 'build')
+        self.assertIn('ERROR in ./src/index.js', result['output_tail'])
+
+    @patch('packUpdate.utils.command_runner.get_command_timeout', return_value=0.5)
+    def test_timed_out_stage_named_with_output(self, _):
+        stages = [Stage('build', 'echo "compiling src/index.ts"; sleep 30'), Stage('test', 'true', after=['build'])]
+        result = run_pipeline(stages, self.test_dir, True)
+        self.assertFalse(result['passed'])
+        self.assertEqual(result['failed_stage'], 'build')
+        self.assertEqual([stage['status'] for stage in result['stages']], ['timeout', 'skipped'])
+        self.assertIn('compiling src/index.ts', result['output_tail'])
+        self.assertTrue(describe_failure(result).startswith('build failed'))
+
+    def test_stage_durations_kept_apart_from_statuses(self):
+        stages = [Stage('build', 'sleep 0.2'), Stage('build:duration', 'true')]
+        result = run_pipeline(stages, self.test_dir, True)
+        self.assertTrue(result['passed'])
+        self.assertEqual([stage['status'] for stage in result['stages']], ['passed', 'passed'])
+        self.assertGreaterEqual(result['stages'][0]['duration'], 0.2)
+
+    def test_failure_message_includes_output_tail(self):
+        stages = [Stage('test', 'for i in $(seq 1 50); do echo "line $i"; done; exit 1')]
+        result = run_pipeline(stages, self.test_dir, True)
+        message = describe_failure(result)
+        self.assertTrue(message.startswith('test failed, last output:'))
+        self.assertIn('    line 50', message)
+        self.assertNotIn('line 30\n', message)
+
+    def test_stage_commands_attributed_to_current_package(self):
+        reset_command_stats()
+        try:
+            with package_scope('react'):
+                run_pipeline([Stage('lint', 'true'), Stage('build', 'true')], self.test_dir, True)
+            self.assertEqual(get_command_stats().to_dict()['by_package']['react']['count'], 2)
+        finally:
+            reset_command_stats()
+
+    def test_no_stages_passes(self):
+        self.assertTrue(run_pipeline([], self.test_dir, True)['passed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Test reusable automation workspaces
+"""
+import unittest
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from packUpdate.services.workspace_cache import (
+    acquire_workspace, evict_workspaces, install_is_current, is_reusable, read_stamp, refresh_workspace,
+    release_workspace, workspace_lock_path, write_stamp
+)
+
+
+def git(cwd, *args):
+    return subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                          cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class TestWorkspaceReuse(unittest.TestCase):
+    """Test refreshing a kept workspace and the install fingerprint"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.origin = os.path.join(self.test_dir, 'origin')
+        os.makedirs(self.origin)
+        git(self.origin, 'init', '-q', '-b', 'develop')
+        self.commit('package.json', '{"name": "app", "dependencies": {"react": "^18.0.0"}}')
+        self.workspace = os.path.join(self.test_dir, 'ws')
+        git(self.test_dir, 'clone', '-q', self.origin, self.workspace)
+        os.makedirs(os.path.join(self.workspace, 'node_modules', 'react'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def commit(self, name, content):
+        with open(os.path.join(self.origin, name), 'w') as f:
+            f.write(content)
+        git(self.origin, 'add', name)
+        git(self.origin, 'commit', '-q', '-m', f"Update {name}")
+        return git(self.origin, 'rev-parse', 'HEAD')
+
+    def test_refresh_resets_and_keeps_node_modules(self):
+        with open(os.path.join(self.workspace, 'package.json'), 'w') as f:
+            f.write('{"name": "app", "dependencies": {"react": "^19.0.0"}}')
+        with open(os.path.join(self.workspace, 'report.html'), 'w') as f:
+            f.write('leftover')
+        head = self.commit('index.js', 'module.exports = 1')
+
+        refresh_workspace(self.workspace, self.origin)
+        self.assertEqual(git(self.workspace, 'status', '--porcelain'), '')
+        self.assertFalse(os.path.exists(os.path.join(self.workspace, 'report.html')))
+        self.assertTrue(os.path.isdir(os.path.join(self.workspace, 'node_modules', 'react')))
+        self.assertEqual(git(self.workspace, 'rev-parse', 'origin/develop'), head)
+
+    def test_install_current_until_lockfile_changes(self):
+        self.assertFalse(is_reusable(self.workspace))
+        release_workspace(self.workspace, installed=True)
+        self.assertTrue(is_reusable(self.workspace))
+        self.assertTrue(install_is_current(self.workspace))
+
+        self.commit('package-lock.json', '{"lockfileVersion": 3}')
+        refresh_workspace(self.workspace, self.origin)
+        git(self.workspace, 'checkout', '-q', '-B', 'feature', 'origin/develop')
+        self.assertFalse(install_is_current(self.workspace))
+
+    def test_release_records_size(self):
+        release_workspace(self.workspace, installed=True)
+        self.assertGreater(read_stamp(self.workspace)['size'], 0)
+
+    def test_unfinished_run_forces_install(self):
+        release_workspace(self.workspace, installed=False)
+        self.assertTrue(is_reusable(self.workspace))
+        self.assertFalse(install_is_current(self.workspace))
+
+
+class TestEvictWorkspaces(unittest.TestCase):
+    """Test LRU eviction under the disk budget"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_workspace(self, name, last_used, size=64 * 1024):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.join(path, '.git'))
+        write_stamp(path, size=size)
+        stamp = read_stamp(path)
+        stamp['last_used'] = last_used
+        with open(os.path.join(path, '.git', 'packupdate-workspace.json'), 'w') as f:
+            json.dump(stamp, f)
+        return path
+
+    def test_least_recently_used_evicted_first(self):
+        now = time.time()
+        oldest = self.make_workspace('oldest', now - 300)
+        middle = self.make_workspace('middle', now - 200)
+        newest = self.make_workspace('newest', now - 100)
+        os.makedirs(os.path.join(self.root, 'not-a-workspace'))
+
+        removed = evict_workspaces(self.root, 150 * 1024)
+        self.assertEqual(removed, [oldest])
+        self.assertTrue(os.path.isdir(middle))
+        self.assertTrue(os.path.isdir(newest))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, 'not-a-workspace')))
+
+    def test_workspace_in_use_is_kept(self):
+        now = time.time()
+        oldest = self.make_workspace('oldest', now - 300)
+        newer = self.make_workspace('newer', now - 100)
+        acquire_workspace(oldest)
+        try:
+            self.assertEqual(evict_workspaces(self.root, 0), [newer])
+        finally:
+            release_workspace(oldest)
+        self.assertTrue(os.path.isdir(oldest))
+
+    def test_workspace_locked_by_another_process_is_kept(self):
+        now = time.time()
+        oldest = self.make_workspace('oldest', now - 300)
+        newer = self.make_workspace('newer', now - 100)
+        holder = subprocess.Popen(
+            [sys.executable, '-c', 'import fcntl, sys; f = open(sys.argv[1], "a"); '
+             'fcntl.flock(f, fcntl.LOCK_EX); print("locked", flush=True); sys.stdin.read()',
+             workspace_lock_path(oldest)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            holder.stdout.readline()
+            self.assertEqual(evict_workspaces(self.root, 0), [newer])
+        finally:
+            holder.communicate('')
+        self.assertTrue(os.path.isdir(oldest))
+
+    def test_stamped_size_used_without_walking(self):
+        now = time.time()
+        large = self.make_workspace('large', now - 100, size=10 * 1024 * 1024)
+        small = self.make_workspace('small', now - 300, size=1024)
+
+        with patch('packUpdate.services.workspace_cache.directory_size') as mock_size:
+            self.assertEqual(evict_workspaces(self.root, 5 * 1024 * 1024), [small, large])
+        mock_size.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()